@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from pytas.http import TASClient, JobsClient
+from benchmarks.stub import StubServer
+
+"""
+Micro-benchmarks for every TASClient and JobsClient method against the
+in-process stub server. Run with::
+
+    python -m benchmarks.bench_client --latency 5 --items 100
+
+Each method is timed in three modes:
+
+* sequential: a new client (and connection) per call, as before pooling
+* pooled: one client reused for every call
+* concurrent: one client shared by `--concurrency` threads
+
+and the throughput and p50/p99 latency of each are reported.
+"""
+
+CREDENTIALS = {'username': 'bench', 'password': 'bench'}
+
+TAS_CALLS = [
+    ('authenticate', lambda c: c.authenticate('user1', 'password')),
+    ('get_user', lambda c: c.get_user(username='user1')),
+    ('get_users', lambda c: c.get_users(usernames=['user%d' % i for i in range(10)])),
+    ('save_user', lambda c: c.save_user(1, {'firstName': 'First'})),
+    ('verify_user', lambda c: c.verify_user(1, 'code')),
+    ('request_password_reset', lambda c: c.request_password_reset('user1')),
+    ('confirm_password_reset', lambda c: c.confirm_password_reset('user1', 'code', 'password')),
+    ('change_password', lambda c: c.change_password('user1', 'old', 'new')),
+    ('institutions', lambda c: c.institutions()),
+    ('get_institution', lambda c: c.get_institution(1)),
+    ('get_departments', lambda c: c.get_departments(1)),
+    ('get_department', lambda c: c.get_department(1, 2)),
+    ('countries', lambda c: c.countries()),
+    ('fields', lambda c: c.fields()),
+    ('projects_for_group', lambda c: c.projects_for_group('group')),
+    ('project', lambda c: c.project(1)),
+    ('projects_for_user', lambda c: c.projects_for_user('user1')),
+    ('create_project', lambda c: c.create_project({'title': 'Project'})),
+    ('edit_project', lambda c: c.edit_project({'id': 1, 'title': 'Project'})),
+    ('edit_allocation', lambda c: c.edit_allocation({'id': 1})),
+    ('create_allocation', lambda c: c.create_allocation({'projectId': 1})),
+    ('get_project_users', lambda c: c.get_project_users(1)),
+    ('add_project_user', lambda c: c.add_project_user(1, 'user1')),
+    ('del_project_user', lambda c: c.del_project_user(1, 'user1')),
+    ('allocation_approval', lambda c: c.allocation_approval(1, {'status': 'Approved'})),
+]
+
+JOBS_CALLS = [
+    ('get_jobs', lambda c: c.get_jobs('chameleon', '2016-01-01', '2016-01-31')),
+    ('iter_jobs', lambda c: list(c.iter_jobs('chameleon', '2016-01-01', '2016-01-31'))),
+    ('get_jobs_sharded', lambda c: c.get_jobs_sharded('chameleon', '2016-01-01', '2016-01-31',
+                                                      window=timedelta(days=7))),
+]
+
+MODES = ('sequential', 'pooled', 'concurrent')
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[int(round(q * (len(ordered) - 1)))]
+
+
+def run_mode(mode, make_client, call, iterations, concurrency):
+    def timed(client):
+        start = time.perf_counter()
+        call(client)
+        return time.perf_counter() - start
+
+    begin = time.perf_counter()
+    if mode == 'sequential':
+        latencies = []
+        for _ in range(iterations):
+            with make_client() as client:
+                latencies.append(timed(client))
+    elif mode == 'pooled':
+        with make_client() as client:
+            latencies = [timed(client) for _ in range(iterations)]
+    else:
+        with make_client(pool_maxsize=concurrency) as client:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                latencies = list(executor.map(lambda _: timed(client), range(iterations)))
+    elapsed = time.perf_counter() - begin
+    return {
+        'ops': iterations / elapsed,
+        'p50': percentile(latencies, 0.50),
+        'p99': percentile(latencies, 0.99),
+    }
+
+
+def run(latency=0.0, jitter=0.0, items=10, iterations=200, concurrency=8, methods=None, modes=MODES,
+        out=sys.stdout):
+    """
+    Runs the benchmarks and writes a table to `out`. Returns
+    `{(method, mode): {'ops', 'p50', 'p99'}}` with latencies in seconds.
+    """
+    results = {}
+    with StubServer(latency=latency, jitter=jitter, items=items) as server:
+        calls = [(name, TASClient, call) for name, call in TAS_CALLS]
+        calls += [(name, JobsClient, call) for name, call in JOBS_CALLS]
+        out.write('{0:<24} {1:<11} {2:>10} {3:>10} {4:>10}\n'.format(
+            'method', 'mode', 'ops/s', 'p50 ms', 'p99 ms'))
+        for name, cls, call in calls:
+            if methods and name not in methods:
+                continue
+            make_client = lambda **options: cls(baseURL=server.url, credentials=CREDENTIALS, **options)
+            for mode in modes:
+                stats = run_mode(mode, make_client, call, iterations, concurrency)
+                results[(name, mode)] = stats
+                out.write('{0:<24} {1:<11} {2:>10.1f} {3:>10.2f} {4:>10.2f}\n'.format(
+                    name, mode, stats['ops'], stats['p50'] * 1000, stats['p99'] * 1000))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the pytas clients against a local stub server.')
+    parser.add_argument('--latency', type=float, default=0.0, help='server latency per request, in ms')
+    parser.add_argument('--jitter', type=float, default=0.0, help='extra random latency up to this many ms')
+    parser.add_argument('--items', type=int, default=10, help='records returned by list endpoints')
+    parser.add_argument('--iterations', type=int, default=200, help='calls per method and mode')
+    parser.add_argument('--concurrency', type=int, default=8, help='threads in concurrent mode')
+    parser.add_argument('--mode', action='append', choices=MODES, help='modes to run (default: all)')
+    parser.add_argument('methods', nargs='*', help='methods to run (default: all)')
+    args = parser.parse_args(argv)
+    run(latency=args.latency / 1000.0, jitter=args.jitter / 1000.0, items=args.items,
+        iterations=args.iterations, concurrency=args.concurrency, methods=args.methods,
+        modes=args.mode or MODES)
+
+
+if __name__ == '__main__':
+    main()
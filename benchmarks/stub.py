@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import json
+import re
+
+from pytas.fakeserver import FakeTASServer
+
+"""
+A minimal in-process HTTP stub of the TAS and Jobs APIs for benchmarking
+the clients, served by `pytas.fakeserver.FakeTASServer`. Every endpoint
+answers with a canned payload of the shape the client expects; list
+endpoints return `items` records.
+"""
+
+def _user(i):
+    return {'id': i, 'username': 'user%d' % i, 'firstName': 'First', 'lastName': 'Last',
+            'email': 'user%d@example.com' % i, 'institution': 'University College',
+            'institutionId': 999, 'country': 'United States', 'countryId': 230}
+
+def _allocation(i):
+    return {'id': i, 'status': 'Active', 'resource': 'Chameleon', 'resourceId': 39,
+            'computeAllocated': 50000, 'computeRequested': 50000, 'computeUsed': 1234.5,
+            'start': '2016-01-01T06:00:00Z', 'end': '2017-01-01T06:00:00Z',
+            'dateRequested': '2015-12-01T00:00:00Z', 'dateReviewed': '2015-12-02T00:00:00Z',
+            'justification': 'Justification.', 'projectId': 1, 'project': 'CH-000001'}
+
+def _project(i):
+    return {'id': i, 'title': 'Project %d' % i, 'chargeCode': 'CH-%06d' % i, 'typeId': 0,
+            'description': 'Lorem ipsum dolor sit amet. ' * 4, 'source': 'Chameleon',
+            'fieldId': 100, 'piId': 1, 'pi': _user(1), 'allocations': [_allocation(i)]}
+
+def _job(i):
+    return {'jobId': i, 'username': 'user%d' % (i % 50), 'allocationId': i % 20,
+            'queueName': 'batch', 'su': 12.5, 'start': '2016-01-01T00:00:00',
+            'end': '2016-01-01T01:00:00'}
+
+def _institution(i):
+    return {'id': i, 'name': 'Institution %d' % i, 'departments': []}
+
+def _named(i):
+    return {'id': i, 'name': 'Name %d' % i}
+
+
+def _routes(items):
+    ok = lambda result: {'status': 'success', 'result': result, 'message': ''}
+    many = lambda make: [make(i) for i in range(1, items + 1)]
+    return [
+        ('POST', r'/auth/login$', ok(True)),
+        ('GET', r'/v1/users/username/[^/]+$', ok(_user(1))),
+        ('GET', r'/tup/users/email/[^/]+$', ok(_user(1))),
+        ('GET', r'/v1/users/\d+$', ok(_user(1))),
+        ('(PUT|POST)', r'/v1/users(/\d+)?$', ok(_user(1))),
+        ('(PUT|POST)', r'/v1/users/[^/]+/passwordResets(/[^/]+)?$', ok(True)),
+        ('POST', r'/v1/users/[^/]+/passwordChanges$', ok(True)),
+        ('(PUT|POST)', r'/v1/users/\d+/[^/]+$', ok(True)),
+        ('GET', r'/v1/institutions/$', ok(many(_institution))),
+        ('GET', r'/v1/institutions/\d+/departments$', ok(many(_named))),
+        ('GET', r'/v1/institutions/\d+$', ok(dict(_institution(1), departments=many(_named)))),
+        ('GET', r'/v1/countries/$', ok(many(_named))),
+        ('GET', r'/tup/projects/fields$', ok(many(_named))),
+        ('GET', r'/v1/projects/(group|username)/[^/]+$', ok(many(_project))),
+        ('GET', r'/v1/projects/\d+/users$', ok(many(_user))),
+        ('(POST|DELETE)', r'/v1/projects/\d+/users/[^/]+$', ok(True)),
+        ('GET', r'/v1/projects/\d+$', ok(_project(1))),
+        ('(PUT|POST)', r'/v1/projects(/\d+)?$', ok(_project(1))),
+        ('(PUT|POST)', r'/v1/allocations(/\d+)?$', ok(_allocation(1))),
+        ('GET', r'/v1/Jobs$', {'jobs': many(_job)}),
+    ]
+
+
+class StubAPI(object):
+
+    """
+    Answers every request with a canned payload, encoded once up front so
+    that the benchmark measures the clients rather than the server.
+    """
+    def __init__(self, items=10):
+        self.routes = [(re.compile(m + '$'), re.compile(p), json.dumps(body).encode('utf-8'))
+                       for m, p, body in _routes(items)]
+
+    def handle(self, method, path, query, body):
+        for method_re, pattern, payload in self.routes:
+            if method_re.match(method) and pattern.search(path):
+                return 200, {}, payload
+        return 404, {}, b'{"status": "error", "message": "Not found"}'
+
+
+class StubServer(FakeTASServer):
+
+    """
+    Serves the stub API on localhost in a background thread. Use as a
+    context manager; `url` is the base URL to give the clients.
+    """
+    def __init__(self, latency=0.0, jitter=0.0, items=10):
+        super(StubServer, self).__init__(StubAPI(items), latency=latency, jitter=jitter)
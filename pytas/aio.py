@@ -0,0 +1,633 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import asyncio
+import os
+import time
+import logging
+import requests
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from pytas.http import TASClient, JobsClient
+from pytas.cache import saved_user, verified_user, changed_password
+from pytas import retry as retry_util
+from pytas import metrics as metrics_util
+from pytas import codec as codec_util
+from pytas.bulk import async_bulk_map, user_lookups, DEFAULT_MAX_WORKERS
+
+logger = logging.getLogger(__name__)
+
+"""
+asyncio clients for the TAS REST APIs.
+
+These mirror `pytas.http.TASClient` and `pytas.http.JobsClient` method for
+method, with the same arguments, return values and exceptions, but every
+method is a coroutine. They require `aiohttp` (``pip install pytas[async]``).
+"""
+
+def _require_aiohttp():
+    if aiohttp is None:
+        raise ImportError('The async clients require aiohttp; install it with `pip install pytas[async]`')
+
+
+class AsyncResponse(object):
+
+    """
+    A fully read aiohttp response exposing the parts of the
+    `requests.Response` interface the client methods rely on.
+    """
+    def __init__(self, method, url, status_code, reason, headers, content):
+        self.method = method
+        self.url = url
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+        self.content = content
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8')
+
+    def json(self):
+        return codec_util.get_codec().loads(self.content)
+
+    def raise_for_status(self):
+        if 400 <= self.status_code < 500:
+            kind = 'Client Error'
+        elif 500 <= self.status_code < 600:
+            kind = 'Server Error'
+        else:
+            return
+        raise requests.HTTPError('%s %s: %s for url: %s' % (self.status_code, kind, self.reason, self.url),
+                                 response=self)
+
+
+class AsyncSessionPool(object):
+
+    """
+    A pool of keep-alive connections backed by `aiohttp.ClientSession`.
+
+    `limit` caps the total number of open connections and `limit_per_host`
+    the number per host (0 means unlimited). `keep_alive=False` closes each
+    connection after its response. The session is created lazily on first
+    use so the pool can be constructed outside a running event loop.
+    """
+    def __init__(self, limit=100, limit_per_host=0, keep_alive=True, timeout=None):
+        _require_aiohttp()
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        self._session = None
+        self.closed = False
+
+    def session(self):
+        if self.closed:
+            raise Exception('Session pool is closed')
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self.limit,
+                                             limit_per_host=self.limit_per_host,
+                                             force_close=not self.keep_alive)
+            self._session = aiohttp.ClientSession(connector=connector,
+                                                  timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self._session
+
+    async def close(self):
+        self.closed = True
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+class _AsyncPooledClient(object):
+
+    """
+    Base class for async clients that send every request through an
+    `AsyncSessionPool`. As with the sync clients, a pool passed in with
+    `pool` is shared and is not closed by `close()`.
+    """
+    cache = None
+    retry = None
+    breaker = None
+    metrics = None
+    codec = None
+    user_cache = None
+
+    def _init_pool(self, credentials, pool=None, **pool_options):
+        _require_aiohttp()
+        if pool is None:
+            self.pool = AsyncSessionPool(**pool_options)
+            self._owns_pool = True
+        else:
+            self.pool = pool
+            self._owns_pool = False
+        # aiohttp refuses None credentials where requests sends them as-is
+        self.auth = aiohttp.BasicAuth(credentials['username'] or '', credentials['password'] or '')
+
+    async def _read(self, method, url, **kwargs):
+        async with self.pool.session().request(method, url, **kwargs) as r:
+            content = await r.read()
+            return AsyncResponse(method, str(r.url), r.status, r.reason, r.headers, content)
+
+    async def _send(self, method, url, **kwargs):
+        if self.metrics is None:
+            return await self._read(method, url, **kwargs)
+
+        endpoint = metrics_util.current_endpoint() or method
+        start = time.perf_counter()
+        try:
+            r = await self._read(method, url, **kwargs)
+        except Exception as e:
+            self.metrics.observe_request(endpoint, method, url, None, time.perf_counter() - start, 0, e)
+            raise
+        self.metrics.observe_request(endpoint, method, url, r.status_code, time.perf_counter() - start,
+                                     len(r.content))
+        return r
+
+    async def _request(self, method, url, **kwargs):
+        kwargs.setdefault('auth', self.auth)
+        if self.retry is None and self.breaker is None:
+            return await self._send(method, url, **kwargs)
+        return await retry_util.async_send(lambda: self._send(method, url, **kwargs),
+                                           method, self.retry, self.breaker,
+                                           (aiohttp.ClientConnectionError, asyncio.TimeoutError))
+
+    async def _cached_get(self, endpoint, url, headers=None, **kwargs):
+        """
+        Coroutine version of `TASClient._cached_get`.
+        """
+        cache = self.cache
+        if cache is None:
+            return await self._request('GET', url, headers=headers, **kwargs)
+
+        entry = cache.get(url)
+        if entry is not None:
+            if cache.is_fresh(entry):
+                return entry.response
+            headers = dict(headers or {}, **entry.conditional_headers())
+
+        r = await self._request('GET', url, headers=headers, **kwargs)
+        if r.status_code == 304 and entry is not None:
+            cache.revalidated(entry)
+            return entry.response
+        if self._cacheable(r):
+            cache.put(endpoint, url, r)
+        return r
+
+    _cacheable = TASClient._cacheable
+    _dumps = TASClient._dumps
+    _json = TASClient._json
+    invalidate_cache = TASClient.invalidate_cache
+
+    async def close(self):
+        if self._owns_pool:
+            await self.pool.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+"""
+Async client class for the TAS REST APIs.
+"""
+@metrics_util.instrument
+class AsyncTASClient(_AsyncPooledClient):
+
+    """
+    Instantiate the API Object with a base URI and service account credentials.
+    The credentials should be a hash with keys `username` and `password` for
+    BASIC Auth.
+
+    Additional keyword arguments (`limit`, `limit_per_host`, `keep_alive`,
+    `timeout`) configure the client's `AsyncSessionPool`; pass `pool` to
+    share an existing pool instead. `cache` takes a
+    `pytas.cache.ResponseCache`, and `retry` and `breaker` take a
+    `pytas.retry.RetryPolicy` and `CircuitBreaker`, `metrics` a
+    `pytas.metrics.Metrics`, `codec` a `pytas.codec` codec, and
+    `user_cache` a `pytas.cache.UserCache`, as for `TASClient`.
+    """
+    def __init__(self, baseURL = None, credentials = None, pool = None, cache = None,
+                 retry = None, breaker = None, metrics = None, codec = None, user_cache = None,
+                 **pool_options):
+        if (baseURL == None):
+            baseURL = os.environ.get('TAS_URL', 'https://example.com/api')
+
+        if (credentials == None):
+            key = os.environ.get('TAS_CLIENT_KEY')
+            secret = os.environ.get('TAS_CLIENT_SECRET')
+            credentials = {'username':key, 'password':secret}
+
+        self.baseURL = baseURL
+        self.credentials = credentials
+        self.cache = cache
+        self.retry = retry
+        self.breaker = breaker
+        self.metrics = metrics
+        self.user_cache = user_cache
+        self.codec = codec_util.get_codec(codec) if codec is not None else None
+        self._init_pool(credentials, pool, **pool_options)
+
+    _get_departments = TASClient._get_departments
+    _departments = TASClient._departments
+
+    """
+    Authenticate a user
+    """
+    async def authenticate(self, username, password):
+        payload = {'username': username, 'password': password}
+        headers = { 'Content-Type':'application/json' }
+        r = await self._request('POST', self.baseURL + '/auth/login', data=self._dumps( payload ), headers=headers)
+        resp = self._json(r)
+        if resp['status'] == 'success':
+            return resp['result']
+        else:
+            raise Exception('Authentication Error', resp['message'])
+
+    """
+    Users
+    """
+    async def get_user(self, id=None, username=None, email=None):
+        if id:
+            field, value = 'id', id
+            url = '{0}/v1/users/{1}'.format(self.baseURL, id)
+        elif username:
+            field, value = 'username', username
+            url = '{0}/v1/users/username/{1}'.format(self.baseURL, username)
+        elif email:
+            field, value = 'email', email
+            url = '{0}/tup/users/email/{1}'.format(self.baseURL, email)
+        else:
+            raise Exception('username, email, or id is required!')
+
+        user_cache = self.user_cache
+        if user_cache is not None:
+            user = user_cache.get(field, value)
+            if user is not None:
+                return user
+
+        r = await self._request('GET', url)
+        if r.ok:
+            resp = self._json(r)
+            if resp['status'] == 'success':
+                if user_cache is not None:
+                    user_cache.put(resp['result'])
+                return resp['result']
+            else:
+                raise Exception('Error: %s' % resp['message'])
+        else:
+            r.raise_for_status()
+
+    async def get_users(self, ids=None, usernames=None, emails=None, max_workers=DEFAULT_MAX_WORKERS):
+        """
+        Coroutine version of `TASClient.get_users`, with at most
+        `max_workers` lookups in flight.
+        """
+        return await async_bulk_map(lambda lookup: self.get_user(**{lookup[0]: lookup[1]}),
+                                    user_lookups(ids, usernames, emails), max_workers)
+
+    @saved_user
+    async def save_user(self, id, user):
+        if id:
+            url = '{0}/v1/users/{1}'.format( self.baseURL, id )
+            method = 'PUT'
+        else:
+            url = '{0}/v1/users'.format( self.baseURL )
+            method = 'POST'
+
+        headers = { 'Content-Type':'application/json' }
+        r = await self._request(method, url, data=self._dumps( user ), headers=headers )
+        resp = self._json(r)
+        if resp['status'] == 'success':
+            return resp['result']
+        else:
+            if id:
+                raise Exception( 'Unable to save user id={0}'.format( id ), resp['message'] )
+            else:
+                raise Exception('Unable to save new user', resp['message'])
+
+    @verified_user
+    async def verify_user(self, user_id, code, password=None):
+        url = '{0}/v1/users/{1}/{2}'.format(self.baseURL, user_id, code)
+        if password:
+            data = {'password': password}
+            r = await self._request('POST', url, data=data)
+        else:
+            r = await self._request('PUT', url)
+        resp = self._json(r)
+        if resp['status'] == 'success':
+            return True
+        else:
+            raise Exception('Error verifying user id={0}'.format(user_id), resp['message'])
+
+    async def request_password_reset( self, username, source=None ):
+        if source:
+            url = '{0}/v1/users/{1}/passwordResets?source={2}'.format( self.baseURL, username, source )
+        else:
+            url = '{0}/v1/users/{1}/passwordResets'.format( self.baseURL, username )
+        r = await self._request('POST', url )
+        resp = self._json(r)
+        if resp['status'] == 'success':
+            return resp['result']
+        else:
+            raise Exception( 'Error requesting password reset for user={0}'.format( username ), resp['message'] )
+
+    @changed_password
+    async def confirm_password_reset( self, username, code, new_password, source=None  ):
+        if source:
+            url = '{0}/v1/users/{1}/passwordResets/{2}?source={3}'.format( self.baseURL, username, code, source )
+        else:
+            url = '{0}/v1/users/{1}/passwordResets/{2}'.format( self.baseURL, username, code )
+        body = {
+            'password': new_password
+        }
+        headers = { 'Content-Type':'application/json' }
+        r = await self._request('POST', url, data=self._dumps( body ), headers=headers )
+        if r.status_code == 200:
+            resp = self._json(r)
+            if resp['status'] == 'success':
+                return True
+            else:
+                raise Exception( 'Failed password reset for user={0}'.format( username ), resp['message'] )
+        else:
+            raise Exception( 'Failed password reset for user={0}'.format( username ), 'Server Error' )
+
+    @changed_password
+    async def change_password(self, username, current_password, new_password):
+        url = '{0}/v1/users/{1}/passwordChanges'.format(self.baseURL, username)
+        body = {
+            'password': current_password,
+            'newPassword': new_password
+        }
+        headers = {'Content-Type':'application/json'}
+        r = await self._request('POST', url, data=self._dumps(body), headers=headers)
+        if r.ok:
+            resp = self._json(r)
+            if resp['status'] == 'success':
+                return True
+            else:
+                raise Exception('Failed password change for user={0}'.format(username),
+                                resp['message'])
+        else:
+            raise Exception('Failed password change for user={0}'.format(username),
+                            'Server Error')
+
+    """
+    Data Lists
+    Institutions/Departments
+    """
+    async def institutions(self):
+        url = '{0}/v1/institutions/'.format(self.baseURL)
+        r = await self._cached_get('institutions', url, headers={'Content-Type':'application/json'})
+        if r.status_code == 200:
+            resp = self._json(r)
+            if resp['status'] == 'success':
+                return resp['result']
+            else:
+                raise Exception('Failed to fetch institution list: %s' % resp['message'])
+        else:
+            raise Exception('Failed to fetch institution list: %s' % 'Server error')
+
+    async def get_institution(self, institution_id):
+        url = '{0}/v1/institutions/{1}'.format( self.baseURL, institution_id )
+
+        headers = { 'Content-Type':'application/json' }
+
+        r = await self._cached_get('institution', url, headers=headers )
+        if r.status_code == 200:
+            resp = self._json(r)
+            if resp['status'] == 'success':
+                inst = {
+                    'id': resp['result']['id'],
+                    'name': resp['result']['name'],
+                    'children': self._departments(resp['result']['departments'])
+                }
+
+                return inst
+            else:
+                raise Exception( 'Failed to fetch institution for id={0}'.format( institution_id ), resp['message'] )
+        else:
+            raise Exception( 'Failed to fetch institution for id={0}'.format( institution_id ), 'Server error' )
+
+    async def get_departments(self, institution_id):
+        url = '{0}/v1/institutions/{1}/departments'.format( self.baseURL, institution_id )
+
+        headers = { 'Content-Type':'application/json' }
+
+        r = await self._cached_get('departments', url, headers=headers )
+        if r.status_code == 200:
+            resp = self._json(r)
+            if resp['status'] == 'success':
+                return self._departments(resp['result'])
+
+
+    async def get_department(self, institution_id, department_id):
+        return await self.get_institution(department_id)
+
+
+    async def countries(self):
+        url = '{0}/v1/countries/'.format(self.baseURL)
+        r = await self._cached_get('countries', url, headers={'Content-Type':'application/json'})
+        if r.status_code == 200:
+            resp = self._json(r)
+            if resp['status'] == 'success':
+                return resp['result']
+            else:
+                raise Exception('Failed to fetch country list: %s' % resp['message'])
+        else:
+            raise Exception('Failed to fetch country list: %s' % 'Server error')
+
+    """
+    Fields
+    """
+    async def fields( self ):
+        r = await self._cached_get('fields', '{0}/tup/projects/fields'.format(self.baseURL) )
+        resp = self._json(r)
+        return resp[ 'result' ]
+
+    """
+    Projects
+    """
+    async def projects_for_group(self, group):
+        headers = {'Content-Type':'application/json'}
+        r = await self._request('GET', '{0}/v1/projects/group/{1}'.format(self.baseURL, group), headers=headers )
+        resp = self._json(r)
+        if resp['status'] == 'success':
+            return resp['result']
+        else:
+            raise Exception('Projects not found: %s' % resp['message'])
+
+    async def project( self, id ):
+        headers = { 'Content-Type':'application/json' }
+        r = await self._request('GET', '{0}/v1/projects/{1}'.format(self.baseURL, id), headers=headers )
+        if r.status_code == 200:
+            resp = self._json(r)
+            if resp['status'] == 'success':
+                return resp['result']
+            else:
+                raise Exception('API Error: %s' % resp['message'])
+        else:
+            r.raise_for_status()
+
+    async def projects_for_user( self, username ):
+        headers = { 'Content-Type':'application/json' }
+        r = await self._request('GET', '{0}/v1/projects/username/{1}'.format(self.baseURL, username), headers=headers )
+        resp = self._json(r)
+        return resp['result']
+
+    """
+    Project is a dict with:
+    {
+        'title': string, # project title
+        'typeId': number, # project type; 0=Research, 2=Startup
+        'description': string, # project abstract
+        'source': string, # project source, e.g. Chameleon
+        'fieldId': number, # project field of science
+        'piId': number, # PI user ID
+        'allocations': [ # optional list of requested allocations
+            {
+                'resourceId': number, # resource ID
+                'requestorId': number, # user ID making request
+                'justification': string,
+                'dateRequested': datetime,
+                'computeRequested': number # SUs
+            },
+        ]
+    }
+    """
+    async def create_project( self, project ):
+        url = '{0}/v1/projects'.format( self.baseURL )
+        headers = { 'Content-Type':'application/json' }
+        r = await self._request('POST', url, data=self._dumps( project ), headers=headers )
+        resp = self._json(r)
+        if resp['status'] == 'success':
+            return resp['result']
+        else:
+            raise Exception( 'Failed to create project', resp['message'] )
+
+    async def edit_project( self, project ):
+        url = '{0}/v1/projects/{1}'.format( self.baseURL, project['id'] )
+        headers = { 'Content-Type':'application/json' }
+        r = await self._request('PUT', url, data=self._dumps( project ), headers=headers )
+        resp = self._json(r)
+        if resp['status'] == 'success':
+            return resp['result']
+        else:
+            raise Exception( 'Failed to update project', resp['message'] )
+
+    async def edit_allocation( self, allocation ):
+        url = '{0}/v1/allocations/{1}'.format( self.baseURL, allocation['id'] )
+        headers = { 'Content-Type':'application/json' }
+        r = await self._request('PUT', url, data=self._dumps( allocation ), headers=headers )
+        resp = self._json(r)
+        if resp['status'] == 'success':
+            return resp['result']
+        else:
+            raise Exception( 'Failed to update allocation', resp['message'] )
+
+    async def create_allocation(self, allocation):
+        url = '{0}/v1/allocations'.format( self.baseURL )
+        headers = { 'Content-Type':'application/json' }
+        r = await self._request('POST', url, data=self._dumps( allocation ), headers=headers )
+        resp = self._json(r)
+        if resp['status'] == 'success':
+            return resp['result']
+        else:
+            raise Exception( 'Failed to create allocation', resp['message'] )
+
+    """
+    Project Users
+    """
+    async def get_project_users( self, project_id ):
+        r = await self._request('GET', '{0}/v1/projects/{1}/users'.format( self.baseURL, project_id ) )
+        resp = self._json(r)
+        if resp['status'] == 'success':
+            return resp['result']
+        else:
+            raise Exception( 'Failed to get project users', resp['message'] )
+
+    async def add_project_user( self, project_id, username ):
+        r = await self._request('POST', '{0}/v1/projects/{1}/users/{2}'.format( self.baseURL, project_id, username ) )
+        resp = self._json(r)
+        if resp['status'] == 'success':
+            return True
+        else:
+            raise Exception( 'Failed to add user to project', resp['message'] )
+
+    async def del_project_user( self, project_id, username ):
+        r = await self._request('DELETE', '{0}/v1/projects/{1}/users/{2}'.format( self.baseURL, project_id, username ) )
+        resp = self._json(r)
+        if resp['status'] == 'success':
+            return True
+        else:
+            raise Exception( 'Failed to remove user from project', resp['message'] )
+    """
+    Allocation
+    """
+    async def allocation_approval(self, id, allocation):
+        url = '{0}/v1/allocations/{1}'.format( self.baseURL, id )
+        method = 'PUT'
+        headers = { 'Content-Type':'application/json' }
+        r = await self._request(method, url, data=self._dumps( allocation ), headers=headers )
+        resp = self._json(r)
+        if resp['status'] == 'success':
+            return resp['result']
+        else:
+            raise Exception( 'Unable to process allocation approval for allocation id:'.format( id ), resp['message'] )
+
+
+"""
+Async client class for the TAS Jobs API.
+"""
+@metrics_util.instrument
+class AsyncJobsClient(_AsyncPooledClient):
+
+    """
+    Instantiate the API Object with a base URI and service account credentials.
+    The credentials should be a hash with keys `username` and `password` for
+    BASIC Auth.
+
+    Connection pool, `retry`, `breaker`, `metrics` and `codec` options are
+    the same as for `AsyncTASClient`.
+    """
+    def __init__(self, baseURL=None, credentials=None, pool=None, retry=None, breaker=None,
+                 metrics=None, codec=None, **pool_options):
+        if (baseURL == None):
+            baseURL = os.environ.get('JOBS_URL', 'https://example.com/api')
+
+        if (credentials == None):
+            key = os.environ.get('JOBS_USER')
+            secret = os.environ.get('JOBS_PASSWORD')
+            credentials = {'username': key, 'password': secret}
+
+        self.baseURL = baseURL
+        self.credentials = credentials
+        self.retry = retry
+        self.breaker = breaker
+        self.metrics = metrics
+        self.codec = codec_util.get_codec(codec) if codec is not None else None
+        self._init_pool(credentials, pool, **pool_options)
+
+    """
+    Jobs
+    """
+    _jobs_request = JobsClient._jobs_request
+
+    async def get_jobs(self, resource=None, start=None, end=None, allocation_id=None, username=None, queue=None):
+        url, params, headers = self._jobs_request(resource, start, end, allocation_id, username, queue)
+        r = await self._request('GET', url, params=params, headers=headers)
+        resp = self._json(r)
+        #if resp['status'] == 'success':
+        if r.status_code == 200:
+            return resp['jobs']
+        else:
+            raise Exception('Unable to get jobs for username: {0}'.format(username), resp['message'])
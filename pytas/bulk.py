@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+"""
+Helpers for fanning a call out over many items with bounded concurrency.
+"""
+
+DEFAULT_MAX_WORKERS = 10
+
+class BulkResult(object):
+
+    """
+    The outcome of one item of a bulk call: `item` is the input, and exactly
+    one of `result` or `error` is set depending on whether the call for that
+    item succeeded.
+    """
+    __slots__ = ('item', 'result', 'error')
+
+    def __init__(self, item, result=None, error=None):
+        self.item = item
+        self.result = result
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def __repr__(self):
+        if self.ok:
+            return 'BulkResult(%r, result=%r)' % (self.item, self.result)
+        return 'BulkResult(%r, error=%r)' % (self.item, self.error)
+
+
+def _call(func, item):
+    try:
+        return BulkResult(item, result=func(item))
+    except Exception as e:
+        return BulkResult(item, error=e)
+
+
+def bulk_map(func, items, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Calls `func(item)` for every item using at most `max_workers` threads and
+    returns a list of `BulkResult` in input order. A failing item is
+    reported in its result rather than aborting the batch.
+    """
+    items = list(items)
+    if not items:
+        return []
+    if max_workers <= 1 or len(items) == 1:
+        return [_call(func, item) for item in items]
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        return list(executor.map(lambda item: _call(func, item), items))
+
+
+async def async_bulk_map(func, items, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Coroutine counterpart of `bulk_map`: awaits `func(item)` for every item
+    with at most `max_workers` calls in flight.
+    """
+    if max_workers < 1:
+        raise ValueError('max_workers must be at least 1, got {0!r}'.format(max_workers))
+    semaphore = asyncio.Semaphore(max_workers)
+
+    async def call(item):
+        async with semaphore:
+            try:
+                return BulkResult(item, result=await func(item))
+            except Exception as e:
+                return BulkResult(item, error=e)
+
+    return list(await asyncio.gather(*[call(item) for item in items]))
+
+
+def user_lookups(ids=None, usernames=None, emails=None):
+    """
+    Flattens the arguments of a bulk user lookup into `(field, value)`
+    pairs accepted by `get_user(**{field: value})`: ids first, then
+    usernames, then emails, each in the order given.
+    """
+    lookups = []
+    lookups.extend(('id', i) for i in ids or [])
+    lookups.extend(('username', u) for u in usernames or [])
+    lookups.extend(('email', e) for e in emails or [])
+    return lookups
@@ -0,0 +1,261 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import copy
+import functools
+import inspect
+import threading
+import time
+from collections import OrderedDict
+
+"""
+Opt-in caches for TAS reference data (institutions, departments,
+countries, fields) and user records.
+"""
+
+"""
+Default time-to-live, in seconds, for each cacheable endpoint.
+"""
+DEFAULT_TTLS = {
+    'institutions': 24 * 60 * 60,
+    'institution': 24 * 60 * 60,
+    'departments': 24 * 60 * 60,
+    'countries': 7 * 24 * 60 * 60,
+    'fields': 7 * 24 * 60 * 60,
+}
+
+class CacheEntry(object):
+
+    """
+    A cached response together with the validators needed to revalidate it.
+    """
+    __slots__ = ('endpoint', 'response', 'expires', 'etag', 'last_modified')
+
+    def __init__(self, endpoint, response, expires):
+        self.endpoint = endpoint
+        self.response = response
+        self.expires = expires
+        self.etag = response.headers.get('ETag')
+        self.last_modified = response.headers.get('Last-Modified')
+
+    def conditional_headers(self):
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class ResponseCache(object):
+
+    """
+    A thread-safe, size-bounded LRU cache of successful GET responses.
+
+    Entries are keyed by URL and expire after the TTL configured for their
+    endpoint in `ttls` (falling back to `DEFAULT_TTLS` and then `ttl`). An
+    expired entry is kept until evicted so that, if the server sent an
+    `ETag` or `Last-Modified` header, the next request can be made
+    conditional and a `304 Not Modified` answered from the cache. At most
+    `maxsize` entries are kept; the least recently used is evicted first.
+
+    Responses are stored as-is and decoded on every use, so callers never
+    share (and can freely mutate) the parsed results.
+    """
+    def __init__(self, maxsize=256, ttl=60 * 60, ttls=None, timer=time.time):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.ttls = dict(DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        self.timer = timer
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def ttl_for(self, endpoint):
+        return self.ttls.get(endpoint, self.ttl)
+
+    def get(self, url):
+        """
+        Returns the `CacheEntry` for `url`, fresh or stale, or None.
+        """
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                self._entries.move_to_end(url)
+            return entry
+
+    def is_fresh(self, entry):
+        return self.timer() < entry.expires
+
+    def put(self, endpoint, url, response):
+        entry = CacheEntry(endpoint, response, self.timer() + self.ttl_for(endpoint))
+        with self._lock:
+            self._entries[url] = entry
+            self._entries.move_to_end(url)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return entry
+
+    def revalidated(self, entry):
+        """
+        Marks `entry` fresh again after the server answered `304 Not Modified`.
+        """
+        entry.expires = self.timer() + self.ttl_for(entry.endpoint)
+
+    def invalidate(self, endpoint=None, url=None):
+        """
+        Drops the entry for `url`, every entry for `endpoint`, or, with no
+        arguments, everything.
+        """
+        with self._lock:
+            if url is not None:
+                self._entries.pop(url, None)
+            elif endpoint is not None:
+                for key in [k for k, e in self._entries.items() if e.endpoint == endpoint]:
+                    del self._entries[key]
+            else:
+                self._entries.clear()
+
+    def clear(self):
+        self.invalidate()
+
+
+"""
+Default time-to-live, in seconds, of a `UserCache` record.
+"""
+DEFAULT_USER_TTL = 5 * 60
+
+class UserCache(object):
+
+    """
+    A thread-safe, size-bounded LRU cache of TAS user records indexed by
+    id, username and email, so that fetching a user by any one of them
+    answers later lookups by the others.
+
+    Records expire `ttl` seconds after they were fetched and at most
+    `maxsize` users are kept. Records are copied on the way in and out, so
+    callers can freely mutate what they get back.
+    """
+    FIELDS = ('id', 'username', 'email')
+
+    def __init__(self, maxsize=1024, ttl=DEFAULT_USER_TTL, timer=time.time):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timer = timer
+        self._records = OrderedDict()
+        self._index = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._records)
+
+    @staticmethod
+    def _key(field, value):
+        # ids arrive both as ints and as strings from URLs and forms, and
+        # usernames and emails are matched case-insensitively
+        if field == 'id':
+            return (field, str(value))
+        return (field, value.lower() if isinstance(value, str) else value)
+
+    def _remove(self, user_id):
+        entry = self._records.pop(user_id, None)
+        if entry is not None:
+            record = entry[0]
+            for field in self.FIELDS:
+                key = self._key(field, record.get(field))
+                if self._index.get(key) == user_id:
+                    del self._index[key]
+
+    def get(self, field, value):
+        """
+        Returns a copy of the cached user whose `field` (`id`, `username` or
+        `email`) is `value`, or None if it is not cached or has expired.
+        """
+        with self._lock:
+            user_id = self._index.get(self._key(field, value))
+            if user_id is None:
+                return None
+            record, expires = self._records[user_id]
+            if self.timer() >= expires:
+                self._remove(user_id)
+                return None
+            self._records.move_to_end(user_id)
+        return copy.deepcopy(record)
+
+    def put(self, record):
+        """
+        Caches `record` under its id, username and email. Records without an
+        id are ignored.
+        """
+        if record.get('id') is None:
+            return
+        user_id = str(record['id'])
+        record = copy.deepcopy(record)
+        with self._lock:
+            # the user's username or email may have changed since it was cached
+            self._remove(user_id)
+            self._records[user_id] = (record, self.timer() + self.ttl)
+            for field in self.FIELDS:
+                if record.get(field) is not None:
+                    self._index[self._key(field, record[field])] = user_id
+            while len(self._records) > self.maxsize:
+                self._remove(next(iter(self._records)))
+
+    def invalidate(self, id=None, username=None, email=None):
+        """
+        Drops the user cached under any of the given keys, or, with no
+        arguments, everything.
+        """
+        with self._lock:
+            if id is None and username is None and email is None:
+                self._records.clear()
+                self._index.clear()
+                return
+            for field, value in (('id', id), ('username', username), ('email', email)):
+                if value is not None:
+                    user_id = self._index.get(self._key(field, value))
+                    if user_id is not None:
+                        self._remove(user_id)
+
+    def clear(self):
+        self.invalidate()
+
+
+def invalidates_user(keys):
+    """
+    Decorates a client write method to drop a user from the client's
+    `user_cache` after the method returns or fails. `keys` maps the
+    method's arguments to the `id`, `username` and `email` to invalidate.
+    """
+    def decorator(method):
+        def invalidate(self, args, kwargs):
+            if self.user_cache is not None:
+                found = dict((k, v) for k, v in keys(*args, **kwargs).items() if v)
+                if found:
+                    self.user_cache.invalidate(**found)
+
+        if inspect.iscoroutinefunction(method):
+            @functools.wraps(method)
+            async def async_wrapper(self, *args, **kwargs):
+                try:
+                    return await method(self, *args, **kwargs)
+                finally:
+                    invalidate(self, args, kwargs)
+            return async_wrapper
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                invalidate(self, args, kwargs)
+        return wrapper
+    return decorator
+
+saved_user = invalidates_user(lambda id, user: {'id': id, 'username': user.get('username'),
+                                                'email': user.get('email')})
+verified_user = invalidates_user(lambda user_id, *args, **kwargs: {'id': user_id})
+changed_password = invalidates_user(lambda username, *args, **kwargs: {'username': username})
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import json
+import threading
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+"""
+Pluggable JSON codecs for request payloads, API responses and model
+serialization. The default is the stdlib `JSONCodec`; opt in to the faster
+`OrjsonCodec` (``pip install pytas[fast]``) with ``set_codec('orjson')`` or
+a client's `codec` argument.
+"""
+
+class JSONCodec(object):
+
+    """
+    The stdlib `json` codec. `encode` returns the UTF-8 bytes sent as a
+    request body, `dumps` a str, and `loads` accepts str or bytes.
+    """
+    name = 'json'
+
+    def dumps(self, obj, default=None, sort_keys=False, indent=None):
+        return json.dumps(obj, default=default, sort_keys=sort_keys, indent=indent)
+
+    def encode(self, obj):
+        return self.dumps(obj).encode('utf-8')
+
+    def loads(self, data):
+        return json.loads(data)
+
+
+class OrjsonCodec(JSONCodec):
+
+    """
+    A codec backed by orjson, which encodes and decodes several times faster
+    than the stdlib and decodes straight from response bytes. Output is
+    compact and not ASCII-escaped; values orjson cannot encode (integers
+    wider than 64 bits, non-str dict keys) and indents other than 2 fall
+    back to the stdlib. Unlike the stdlib, orjson decodes integers wider
+    than 64 bits as floats.
+    """
+    name = 'orjson'
+
+    def __init__(self):
+        if orjson is None:
+            raise ImportError('OrjsonCodec requires orjson; install it with `pip install pytas[fast]`')
+
+    def dumps(self, obj, default=None, sort_keys=False, indent=None):
+        if indent not in (None, 2):
+            return JSONCodec.dumps(self, obj, default, sort_keys, indent)
+        return self._encode(obj, default, sort_keys, indent).decode('utf-8')
+
+    def encode(self, obj):
+        return self._encode(obj)
+
+    def _encode(self, obj, default=None, sort_keys=False, indent=None):
+        option = 0
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent == 2:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, default=default, option=option)
+        except TypeError:
+            return JSONCodec.dumps(self, obj, default, sort_keys, indent).encode('utf-8')
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+
+CODECS = {'json': JSONCodec, 'orjson': OrjsonCodec}
+
+_default_codec = None
+_default_codec_lock = threading.Lock()
+
+def _make_codec(codec):
+    if codec is None:
+        return JSONCodec()
+    if isinstance(codec, str):
+        if codec not in CODECS:
+            raise ValueError('Unknown JSON codec: %s' % codec)
+        return CODECS[codec]()
+    return codec
+
+def set_codec(codec):
+    """
+    Sets the codec used by clients that are not given one and by the
+    models. Takes a codec instance or a name from `CODECS`; None restores
+    the default.
+    """
+    global _default_codec
+    with _default_codec_lock:
+        _default_codec = _make_codec(codec)
+
+def get_codec(codec=None):
+    """
+    Returns `codec` (an instance or a name) if given, else the default.
+    """
+    global _default_codec
+    if codec is not None:
+        return _make_codec(codec)
+    if _default_codec is None:
+        with _default_codec_lock:
+            if _default_codec is None:
+                _default_codec = _make_codec(None)
+    return _default_codec
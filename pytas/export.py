@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import collections
+import gzip as gzip_module
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from pytas import codec as codec_util
+from pytas.models import base
+
+logger = logging.getLogger(__name__)
+
+"""
+Streaming NDJSON export of projects, their allocations and members.
+
+Records are written as they are fetched, one JSON object per line, in an
+envelope that says what they are::
+
+    {"kind": "project", "source": ["group", "foo"], "data": {...}}
+    {"kind": "allocation", "projectId": 123, "data": {...}}
+    {"kind": "user", "projectId": 123, "data": {...}}
+
+`data` is the record as TAS sent it (a project without its `allocations`,
+which follow as their own records), so no models are built and memory use
+does not grow with the size of the export.
+"""
+
+DEFAULT_PREFETCH = 4
+
+def _sources(groups, usernames):
+    for group in groups or ():
+        yield ('group', group)
+    for username in usernames or ():
+        yield ('username', username)
+
+def _fetch(client, source):
+    kind, name = source
+    if kind == 'group':
+        return client.projects_for_group(name)
+    return client.projects_for_user(name)
+
+def iter_records(groups=None, usernames=None, client=None, include_users=False,
+                 prefetch=DEFAULT_PREFETCH):
+    """
+    Yields export records for the projects of every group in `groups`, then
+    of every user in `usernames`. A project reached from more than one
+    source is exported once, from the first.
+
+    With `include_users`, each project's members are fetched once and
+    yielded after its allocations. Up to `prefetch` sources, and the
+    members of their projects, are fetched ahead in background threads
+    while earlier ones are being written; their results are the only data
+    held in memory. Fetch errors are raised.
+    """
+    api = base.get_client(client)
+    prefetch = max(1, prefetch)
+    seen = set()
+    sources = _sources(groups, usernames)
+    pending = collections.deque()
+    members = {}
+    members_lock = threading.Lock()
+    with ThreadPoolExecutor(max_workers=prefetch) as executor:
+        def fetch(source):
+            projects = _fetch(api, source)
+            if include_users:
+                # whichever source returns a project first fetches its members
+                with members_lock:
+                    for project in projects:
+                        project_id = project.get('id')
+                        if project_id not in members:
+                            members[project_id] = executor.submit(api.get_project_users, project_id)
+            return projects
+
+        def submit():
+            source = next(sources, None)
+            if source is not None:
+                pending.append((source, executor.submit(fetch, source)))
+
+        for _ in range(prefetch):
+            submit()
+        while pending:
+            source, future = pending.popleft()
+            submit()
+            projects = future.result()
+            logger.debug('Exporting %d projects for %s %s', len(projects), *source)
+            for project in projects:
+                project_id = project.get('id')
+                if project_id in seen:
+                    continue
+                seen.add(project_id)
+                data = dict(project)
+                allocations = data.pop('allocations', None) or ()
+                yield {'kind': 'project', 'source': list(source), 'data': data}
+                for allocation in allocations:
+                    yield {'kind': 'allocation', 'projectId': project_id, 'data': allocation}
+                if include_users:
+                    with members_lock:
+                        users = members[project_id]
+                        # keep the key so later sources do not fetch it again
+                        members[project_id] = None
+                    for user in users.result() or ():
+                        yield {'kind': 'user', 'projectId': project_id, 'data': user}
+
+def write_ndjson(records, stream, codec=None):
+    """
+    Writes `records` to the binary `stream` as NDJSON and returns how many
+    were written.
+    """
+    encode = codec_util.get_codec(codec).encode
+    count = 0
+    for record in records:
+        stream.write(encode(record) + b'\n')
+        count += 1
+    return count
+
+def export_ndjson(out, groups=None, usernames=None, client=None, include_users=False,
+                  gzip=None, prefetch=DEFAULT_PREFETCH, codec=None):
+    """
+    Exports the projects of `groups` and `usernames` (see `iter_records`)
+    to `out`, a path or a binary stream, and returns the number of records
+    written. Output is gzipped when `gzip` is true, or by default when
+    `out` is a path ending in ``.gz``.
+    """
+    records = iter_records(groups, usernames, client, include_users, prefetch)
+    if isinstance(out, str):
+        if gzip is None:
+            gzip = out.endswith('.gz')
+        with (gzip_module.open(out, 'wb') if gzip else open(out, 'wb')) as stream:
+            return write_ndjson(records, stream, codec)
+    if gzip:
+        with gzip_module.GzipFile(fileobj=out, mode='wb') as stream:
+            return write_ndjson(records, stream, codec)
+    return write_ndjson(records, out, codec)
@@ -0,0 +1,610 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import argparse
+import functools
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+"""
+A local stand-in for the TAS and Jobs APIs, for load testing the clients
+offline. Serves users, projects, allocations, institutions, reference
+lists and jobs generated from a seed at production volumes, with optional
+latency, jitter and error injection. Run it with::
+
+    python -m pytas.fakeserver --port 8080 --projects 5000 --jobs-per-day 20000
+
+and point `TAS_URL` and `JOBS_URL` at it. Any credentials are accepted;
+users log in with the password ``password``.
+"""
+
+ALLOCATION_STATUSES = ('Active', 'Active', 'Active', 'Inactive', 'Approved', 'Pending', 'Waiting', 'Rejected')
+RESOURCES = ('Chameleon', 'Stampede3', 'Lonestar6')
+QUEUES = ('normal', 'development', 'large', 'gpu')
+FIELDS = ('Computer Science', 'Physics', 'Biology', 'Chemistry', 'Engineering', 'Mathematics',
+          'Earth Sciences', 'Astronomy', 'Economics', 'Medicine')
+COUNTRIES = ('United States', 'Canada', 'Mexico', 'United Kingdom', 'Germany', 'France', 'India',
+             'China', 'Japan', 'Brazil')
+
+def _iso(dt):
+    return dt.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def _locked(lock):
+    """
+    Runs a `FakeTAS` request handler holding the lock named `lock`.
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(self, *args):
+            with getattr(self, lock):
+                return handler(self, *args)
+        return wrapper
+    return decorator
+
+
+class FakeTAS(object):
+
+    """
+    The fake's data and request handling, independent of the HTTP server.
+
+    Users, institutions and projects are generated up front from `seed`
+    and kept in memory, so writes (new projects, membership changes,
+    allocation edits) persist for the life of the fake. Jobs are not
+    stored: each resource-day's `jobs_per_day` jobs are regenerated from
+    the seed on request, so any number of days can be served in constant
+    memory.
+
+    Users and projects are guarded by separate locks, so requests for one
+    do not wait on the other, and handlers return copies of the stored
+    records so they can be encoded after the lock is released. Writers only
+    ever replace a record's top-level values, so shallow copies suffice.
+    """
+    def __init__(self, users=10000, projects=2000, institutions=300, groups=20,
+                 jobs_per_day=1000, seed=0):
+        self.jobs_per_day = jobs_per_day
+        self.seed = seed
+        # when both are needed, the projects lock is taken first
+        self._users_lock = threading.Lock()
+        self._projects_lock = threading.Lock()
+        rng = random.Random(seed)
+
+        self.fields = [{'id': i + 1, 'name': name} for i, name in enumerate(FIELDS)]
+        self.countries = [{'id': i + 1, 'name': name} for i, name in enumerate(COUNTRIES)]
+
+        self.institutions = {}
+        dept_id = institutions + 1
+        for i in range(1, institutions + 1):
+            departments = []
+            for d in range(rng.randint(0, 8)):
+                departments.append({'id': dept_id, 'name': 'Department of %s %d' % (rng.choice(FIELDS), d)})
+                dept_id += 1
+            self.institutions[i] = {'id': i, 'name': 'University %d' % i, 'departments': departments}
+        self.departments = dict((d['id'], d) for inst in self.institutions.values()
+                                for d in inst['departments'])
+
+        self.users = {}
+        self.usernames = {}
+        self.emails = {}
+        for i in range(1, users + 1):
+            inst = self.institutions[rng.randint(1, institutions)]
+            self._add_user({
+                'id': i, 'username': 'user%d' % i, 'email': 'user%d@example.com' % i,
+                'firstName': 'First%d' % i, 'lastName': 'Last%d' % i,
+                'institution': inst['name'], 'institutionId': inst['id'],
+                'department': None, 'departmentId': 0,
+                'country': 'United States', 'countryId': 1,
+                'citizenship': 'United States', 'citizenshipId': 1,
+                'piEligibility': rng.choice(('Eligible', 'Ineligible')),
+                'phone': None, 'title': None, 'source': 'Chameleon', 'emailConfirmations': [],
+            })
+
+        self.projects = {}
+        self.groups = dict(('group%d' % g, []) for g in range(groups))
+        self.members = {}
+        self.user_projects = {}
+        self.allocations = {}
+        start = datetime(2015, 1, 1)
+        for p in range(1, projects + 1):
+            pi_id = rng.randint(1, users)
+            project = {
+                'id': p, 'title': 'Project %d' % p, 'chargeCode': 'CH-%06d' % p,
+                'typeId': rng.choice((0, 2, 4)), 'type': 'Research',
+                'description': 'Generated project %d. ' % p + 'Lorem ipsum dolor sit amet. ' * rng.randint(1, 8),
+                'source': 'Chameleon', 'fieldId': rng.randint(1, len(FIELDS)), 'field': rng.choice(FIELDS),
+                'gid': 100000 + p, 'piId': pi_id, 'allocations': [],
+            }
+            self.projects[p] = project
+            self.groups['group%d' % (p % groups)].append(p)
+            members = set([pi_id] + [rng.randint(1, users) for _ in range(rng.randint(0, 20))])
+            self.members[p] = members
+            for u in members:
+                self.user_projects.setdefault(u, []).append(p)
+            for _ in range(rng.randint(1, 3)):
+                alloc_start = start + timedelta(days=rng.randint(0, 900))
+                self._add_allocation(project, {
+                    'status': rng.choice(ALLOCATION_STATUSES), 'resource': rng.choice(RESOURCES),
+                    'computeRequested': 20000, 'computeAllocated': 20000,
+                    'computeUsed': round(rng.uniform(0, 25000), 3),
+                    'start': _iso(alloc_start), 'end': _iso(alloc_start + timedelta(days=365)),
+                    'dateRequested': _iso(alloc_start - timedelta(days=10)),
+                    'dateReviewed': _iso(alloc_start - timedelta(days=2)),
+                    'justification': 'Justification.', 'decisionSummary': None,
+                    'requestorId': pi_id, 'requestor': 'user%d' % pi_id,
+                })
+
+    def _add_user(self, user):
+        self.users[user['id']] = user
+        self.usernames[user['username']] = user['id']
+        self.emails[user['email']] = user['id']
+
+    def _add_allocation(self, project, data):
+        alloc = dict(data)
+        alloc.setdefault('id', len(self.allocations) + 1)
+        alloc.update({'projectId': project['id'], 'project': project['chargeCode'],
+                      'resourceId': RESOURCES.index(alloc.get('resource', 'Chameleon')) + 1
+                                    if alloc.get('resource') in RESOURCES else 0})
+        for f in ('memoryUsed', 'memoryAllocated', 'memoryRequested',
+                  'storageUsed', 'storageAllocated', 'storageRequested', 'reviewerId'):
+            alloc.setdefault(f, 0)
+        alloc.setdefault('reviewer', None)
+        self.allocations[alloc['id']] = alloc
+        project['allocations'].append(alloc['id'])
+        return dict(alloc)
+
+    def project_view(self, p):
+        """
+        A copy of project `p` with its PI and allocations, as the API sends
+        it. Call with the projects lock held.
+        """
+        project = dict(self.projects[p])
+        with self._users_lock:
+            pi = self.users.get(project['piId'])
+        project['pi'] = dict(pi) if pi is not None else None
+        project['allocations'] = [dict(self.allocations[a]) for a in project['allocations']]
+        return project
+
+    """
+    Jobs
+    """
+    def iter_jobs(self, resource, start, end, allocation_id=None, username=None, queue=None):
+        """
+        Yields the jobs for `resource` ending in `[start, end)`, generated
+        deterministically per day.
+        """
+        day = datetime(start.year, start.month, start.day)
+        with self._projects_lock:
+            project_ids = sorted(self.projects)
+        with self._users_lock:
+            user_count = len(self.users)
+        while day < end:
+            rng = random.Random('%s/%s/%s' % (self.seed, resource, day.date()))
+            for n in range(self.jobs_per_day):
+                job_end = day + timedelta(seconds=rng.randint(0, 86399))
+                runtime = rng.randint(60, 48 * 3600)
+                p = project_ids[rng.randrange(len(project_ids))] if project_ids else 0
+                user_id = rng.randint(1, max(1, user_count))
+                nodes = rng.choice((1, 1, 1, 2, 4, 8, 16))
+                if job_end < start or job_end >= end:
+                    continue
+                job = {
+                    'jobId': '%s-%s-%d' % (resource, day.strftime('%Y%m%d'), n),
+                    'resource': resource,
+                    'username': 'user%d' % user_id,
+                    'allocationId': p,
+                    'chargeCode': 'CH-%06d' % p,
+                    'queueName': QUEUES[rng.randrange(len(QUEUES))],
+                    'nodes': nodes,
+                    'start': (job_end - timedelta(seconds=runtime)).strftime('%Y-%m-%dT%H:%M:%S'),
+                    'end': job_end.strftime('%Y-%m-%dT%H:%M:%S'),
+                    'su': round(nodes * runtime / 3600.0, 4),
+                }
+                if allocation_id is not None and str(job['allocationId']) != str(allocation_id):
+                    continue
+                if username is not None and job['username'] != username:
+                    continue
+                if queue is not None and job['queueName'] != queue:
+                    continue
+                yield job
+            day += timedelta(days=1)
+
+    """
+    Request handling. Returns `(status, headers, body)`, where body is
+    bytes, a JSON-able value or an iterator of already encoded chunks.
+    """
+    def handle(self, method, path, query, body):
+        for route_method, pattern, handler in self._routes():
+            if route_method == method:
+                m = pattern.match(path)
+                if m:
+                    status, result = handler(query, body, *m.groups())
+                    return status, {}, result
+        return 404, {}, {'status': 'error', 'result': None, 'message': 'Not found: %s %s' % (method, path)}
+
+    def _routes(self):
+        routes = getattr(self, '_compiled_routes', None)
+        if routes is None:
+            table = [
+                ('POST', r'/auth/login', self._login),
+                ('GET', r'/v1/users/username/([^/]+)', self._user_by_username),
+                ('GET', r'/tup/users/email/([^/]+)', self._user_by_email),
+                ('GET', r'/v1/users/(\d+)', self._user_by_id),
+                ('POST', r'/v1/users', self._create_user),
+                ('PUT', r'/v1/users/(\d+)', self._update_user),
+                ('POST', r'/v1/users/([^/]+)/passwordResets', self._ok_true),
+                ('POST', r'/v1/users/([^/]+)/passwordResets/([^/]+)', self._ok_true),
+                ('POST', r'/v1/users/([^/]+)/passwordChanges', self._ok_true),
+                ('POST', r'/v1/users/(\d+)/([^/]+)', self._ok_true),
+                ('PUT', r'/v1/users/(\d+)/([^/]+)', self._ok_true),
+                ('GET', r'/v1/institutions/?', self._institutions),
+                ('GET', r'/v1/institutions/(\d+)', self._institution),
+                ('GET', r'/v1/institutions/(\d+)/departments', self._departments),
+                ('GET', r'/v1/countries/?', lambda q, b: (200, _ok(self.countries))),
+                ('GET', r'/tup/projects/fields', lambda q, b: (200, _ok(self.fields))),
+                ('GET', r'/v1/projects/group/([^/]+)', self._projects_for_group),
+                ('GET', r'/v1/projects/username/([^/]+)', self._projects_for_user),
+                ('GET', r'/v1/projects/(\d+)', self._project),
+                ('POST', r'/v1/projects', self._create_project),
+                ('PUT', r'/v1/projects/(\d+)', self._update_project),
+                ('GET', r'/v1/projects/(\d+)/users', self._project_users),
+                ('POST', r'/v1/projects/(\d+)/users/([^/]+)', self._add_project_user),
+                ('DELETE', r'/v1/projects/(\d+)/users/([^/]+)', self._del_project_user),
+                ('POST', r'/v1/allocations', self._create_allocation),
+                ('PUT', r'/v1/allocations/(\d+)', self._update_allocation),
+                ('GET', r'/v1/Jobs', self._jobs),
+            ]
+            routes = self._compiled_routes = [(m, re.compile(p + '$'), h) for m, p, h in table]
+        return routes
+
+    def _ok_true(self, query, body, *args):
+        return 200, _ok(True)
+
+    def _user_id(self, username):
+        with self._users_lock:
+            return self.usernames.get(username)
+
+    @_locked('_users_lock')
+    def _login(self, query, body):
+        data = json.loads(body or '{}')
+        if data.get('username') in self.usernames and data.get('password') == 'password':
+            return 200, _ok(True)
+        return 200, {'status': 'success', 'result': None, 'message': 'The username or password is incorrect.'}
+
+    def _user(self, user_id):
+        user = self.users.get(user_id)
+        if user is None:
+            return 200, _error('User not found')
+        return 200, _ok(dict(user))
+
+    @_locked('_users_lock')
+    def _user_by_id(self, query, body, user_id):
+        return self._user(int(user_id))
+
+    @_locked('_users_lock')
+    def _user_by_username(self, query, body, username):
+        return self._user(self.usernames.get(username))
+
+    @_locked('_users_lock')
+    def _user_by_email(self, query, body, email):
+        return self._user(self.emails.get(email))
+
+    @_locked('_users_lock')
+    def _create_user(self, query, body):
+        user = json.loads(body or '{}')
+        if user.get('username') in self.usernames:
+            return 200, _error('Username already exists')
+        user['id'] = max(self.users) + 1 if self.users else 1
+        self._add_user(user)
+        return 200, _ok(dict(user))
+
+    @_locked('_users_lock')
+    def _update_user(self, query, body, user_id):
+        user = self.users.get(int(user_id))
+        if user is None:
+            return 200, _error('User not found')
+        user.update(json.loads(body or '{}'))
+        user['id'] = int(user_id)
+        return 200, _ok(dict(user))
+
+    def _institutions(self, query, body):
+        return 200, _ok(list(self.institutions.values()))
+
+    def _institution(self, query, body, inst_id):
+        inst = self.institutions.get(int(inst_id))
+        if inst is None:
+            dept = self.departments.get(int(inst_id))
+            if dept is None:
+                return 200, _error('Object reference not set to an instance of an object.')
+            inst = dict(dept, departments=[])
+        return 200, _ok(inst)
+
+    def _departments(self, query, body, inst_id):
+        inst = self.institutions.get(int(inst_id))
+        if inst is None:
+            return 200, _error('Institution not found')
+        return 200, _ok(inst['departments'])
+
+    @_locked('_projects_lock')
+    def _projects_for_group(self, query, body, group):
+        if group not in self.groups:
+            return 200, _error('Group not found')
+        return 200, _ok([self.project_view(p) for p in self.groups[group]])
+
+    @_locked('_projects_lock')
+    def _projects_for_user(self, query, body, username):
+        user_id = self._user_id(username)
+        return 200, _ok([self.project_view(p) for p in self.user_projects.get(user_id, [])])
+
+    @_locked('_projects_lock')
+    def _project(self, query, body, project_id):
+        if int(project_id) not in self.projects:
+            return 200, _error('Object reference not set to an instance of an object.')
+        return 200, _ok(self.project_view(int(project_id)))
+
+    @_locked('_projects_lock')
+    def _create_project(self, query, body):
+        data = json.loads(body or '{}')
+        p = max(self.projects) + 1 if self.projects else 1
+        project = {
+            'id': p, 'title': data.get('title'), 'chargeCode': 'CH-%06d' % p,
+            'typeId': data.get('typeId', 0), 'description': data.get('description'),
+            'source': data.get('source', 'Chameleon'), 'fieldId': data.get('fieldId'),
+            'piId': data.get('piId'), 'gid': 100000 + p, 'allocations': [],
+        }
+        self.projects[p] = project
+        self.members[p] = set([project['piId']]) if project['piId'] else set()
+        for u in self.members[p]:
+            self.user_projects.setdefault(u, []).append(p)
+        for alloc in data.get('allocations') or []:
+            self._add_allocation(project, dict(alloc, status='Pending'))
+        return 200, _ok(self.project_view(p))
+
+    @_locked('_projects_lock')
+    def _update_project(self, query, body, project_id):
+        project = self.projects.get(int(project_id))
+        if project is None:
+            return 200, _error('Project not found')
+        data = json.loads(body or '{}')
+        for key in ('title', 'description', 'typeId', 'fieldId', 'source'):
+            if key in data:
+                project[key] = data[key]
+        return 200, _ok(self.project_view(int(project_id)))
+
+    @_locked('_projects_lock')
+    def _project_users(self, query, body, project_id):
+        members = self.members.get(int(project_id))
+        if members is None:
+            return 200, _error('Project not found')
+        with self._users_lock:
+            return 200, _ok([dict(self.users[u]) for u in sorted(members) if u in self.users])
+
+    @_locked('_projects_lock')
+    def _add_project_user(self, query, body, project_id, username):
+        p, user_id = int(project_id), self._user_id(username)
+        if p not in self.members or user_id is None:
+            return 200, _error('Project or user not found')
+        if user_id not in self.members[p]:
+            self.members[p].add(user_id)
+            self.user_projects.setdefault(user_id, []).append(p)
+        return 200, _ok(True)
+
+    @_locked('_projects_lock')
+    def _del_project_user(self, query, body, project_id, username):
+        p, user_id = int(project_id), self._user_id(username)
+        if p not in self.members or user_id not in self.members[p]:
+            return 200, _error('User is not a member of the project')
+        self.members[p].discard(user_id)
+        self.user_projects[user_id].remove(p)
+        return 200, _ok(True)
+
+    @_locked('_projects_lock')
+    def _create_allocation(self, query, body):
+        data = json.loads(body or '{}')
+        project = self.projects.get(data.get('projectId'))
+        if project is None:
+            return 200, _error('Project not found')
+        data.pop('id', None)
+        return 200, _ok(self._add_allocation(project, dict(data, status=data.get('status', 'Pending'))))
+
+    @_locked('_projects_lock')
+    def _update_allocation(self, query, body, alloc_id):
+        alloc = self.allocations.get(int(alloc_id))
+        if alloc is None:
+            return 200, _error('Allocation not found')
+        data = json.loads(body or '{}')
+        data.pop('id', None)
+        alloc.update(data)
+        return 200, _ok(dict(alloc))
+
+    def _jobs(self, query, body):
+        def param(name):
+            values = query.get(name)
+            return values[0] if values else None
+        try:
+            start = _parse_day(param('start'))
+            end = _parse_day(param('end'))
+        except (TypeError, ValueError):
+            return 400, {'message': 'start and end dates are required'}
+        if param('resource') is None:
+            return 400, {'message': 'resource is required'}
+        jobs = self.iter_jobs(param('resource'), start, end,
+                              param('allocationId'), param('username'), param('queueName'))
+        return 200, _stream_jobs(jobs)
+
+
+def _ok(result):
+    return {'status': 'success', 'result': result, 'message': None}
+
+def _error(message):
+    return {'status': 'error', 'result': None, 'message': message}
+
+def _parse_day(value):
+    for fmt in ('%Y-%m-%d', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%dT%H:%M:%SZ'):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            pass
+    raise ValueError(value)
+
+def _stream_jobs(jobs, batch=500):
+    yield b'{"jobs": ['
+    first = True
+    buf = []
+    for job in jobs:
+        buf.append(json.dumps(job))
+        if len(buf) >= batch:
+            yield ((b'' if first else b',') + ','.join(buf).encode('utf-8'))
+            first = False
+            buf = []
+    if buf:
+        yield ((b'' if first else b',') + ','.join(buf).encode('utf-8'))
+    yield b']}'
+
+
+class FakeTASServer(object):
+
+    """
+    Serves a `FakeTAS` over HTTP/1.1 on `host:port` (port 0 picks a free
+    port) from a background thread. Use as a context manager; `url` is the
+    base URL for both `TASClient` and `JobsClient`. Any other `fake` with
+    a `handle(method, path, query, body)` returning `(status, headers,
+    body)` can be served the same way.
+
+    Every request is delayed by `latency` plus up to `jitter` seconds. A
+    fraction `error_rate` of requests fail with `503` and a `Retry-After`
+    header, and a fraction `api_error_rate` answer `200` with an API
+    `error` status.
+    """
+    def __init__(self, fake=None, host='127.0.0.1', port=0, latency=0.0, jitter=0.0,
+                 error_rate=0.0, api_error_rate=0.0, seed=None, **fake_options):
+        self.fake = fake if fake is not None else FakeTAS(**fake_options)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.api_error_rate = api_error_rate
+        self.random = random.Random(seed)
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # headers and body are written separately; without this, Nagle's
+            # algorithm and delayed ACKs stall every keep-alive response
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def handle_one(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length).decode('utf-8') if length else ''
+                url = urlparse(self.path)
+                status, headers, payload = server.respond(self.command, url.path,
+                                                          parse_qs(url.query), body)
+                if isinstance(payload, (dict, list)):
+                    payload = json.dumps(payload).encode('utf-8')
+                if isinstance(payload, bytes):
+                    self.send_bytes(status, headers, payload)
+                else:
+                    self.send_chunks(status, headers, payload)
+
+            def send_headers(self, status, headers):
+                self.send_response(status)
+                headers = dict(headers)
+                self.send_header('Content-Type', headers.pop('Content-Type', 'application/json'))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+
+            def send_bytes(self, status, headers, data):
+                self.send_headers(status, headers)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def send_chunks(self, status, headers, chunks):
+                self.send_headers(status, headers)
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                for chunk in chunks:
+                    if chunk:
+                        self.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+                self.wfile.write(b'0\r\n\r\n')
+
+            do_GET = do_POST = do_PUT = do_DELETE = handle_one
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.url = 'http://%s:%d' % self.httpd.server_address[:2]
+        self._thread = None
+
+    def respond(self, method, path, query, body):
+        """
+        Returns `(status, headers, body)` for a request, after the injected
+        latency and errors.
+        """
+        if self.latency or self.jitter:
+            time.sleep(self.latency + self.random.uniform(0, self.jitter))
+        roll = self.random.random()
+        if roll < self.error_rate:
+            return (503, {'Content-Type': 'text/html', 'Retry-After': '1'},
+                    b'<html><body>Service Unavailable</body></html>')
+        if roll < self.error_rate + self.api_error_rate:
+            return 200, {}, _error('Injected API error')
+        return self.fake.handle(method, path, query, body)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self.httpd.serve_forever()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run a fake TAS and Jobs API server for load testing.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--projects', type=int, default=2000)
+    parser.add_argument('--institutions', type=int, default=300)
+    parser.add_argument('--groups', type=int, default=20)
+    parser.add_argument('--jobs-per-day', type=int, default=1000, help='jobs per resource per day')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--latency', type=float, default=0.0, help='latency per request, in ms')
+    parser.add_argument('--jitter', type=float, default=0.0, help='extra random latency up to this many ms')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests failing with 503')
+    parser.add_argument('--api-error-rate', type=float, default=0.0,
+                        help='fraction of requests answering with an API error status')
+    args = parser.parse_args(argv)
+
+    fake = FakeTAS(users=args.users, projects=args.projects, institutions=args.institutions,
+                   groups=args.groups, jobs_per_day=args.jobs_per_day, seed=args.seed)
+    server = FakeTASServer(fake, host=args.host, port=args.port, latency=args.latency / 1000.0,
+                           jitter=args.jitter / 1000.0, error_rate=args.error_rate,
+                           api_error_rate=args.api_error_rate)
+    print('Serving fake TAS on %s' % server.url)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
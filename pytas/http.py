@@ -1,25 +1,272 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
-import json
+import functools
 import os
 import re
+import time
 import requests
 from requests.auth import HTTPBasicAuth
 import logging
+import threading
+import weakref
+from requests.adapters import HTTPAdapter
+from pytas.bulk import bulk_map, user_lookups, DEFAULT_MAX_WORKERS
+from pytas.streaming import iter_json_array
+from pytas import jobs as jobs_util
+from pytas import retry as retry_util
+from pytas.singleflight import SingleFlight
+from pytas import metrics as metrics_util
+from pytas import codec as codec_util
+from pytas.cache import saved_user, verified_user, changed_password
 
 logger = logging.getLogger(__name__)
 
+JOBS_CHUNK_SIZE = 64 * 1024
+
+"""
+Connection pooling shared by the TAS and Jobs clients.
+"""
+
+class _ThreadSession(object):
+
+    """
+    Holds a per-thread session. It is referenced only by the thread's local
+    storage, so it is collected, and its session closed, when the thread
+    exits.
+    """
+    __slots__ = ('session', '__weakref__')
+
+    def __init__(self, session):
+        self.session = session
+
+
+class SessionPool(object):
+
+    """
+    A pool of keep-alive HTTP connections backed by `requests.Session`.
+
+    `pool_connections` is the number of per-host pools to keep and
+    `pool_maxsize` the maximum number of connections kept open to each
+    host. With `pool_block=True` callers wait for a free connection rather
+    than opening throwaway ones beyond `pool_maxsize`. `keep_alive=False`
+    asks the server to close each connection after the response.
+
+    By default a single session is shared by all threads. Set
+    `per_thread=True` to give each thread its own session (and pool), which
+    avoids sharing cookie state between threads; a thread's session is
+    closed when the thread exits.
+    """
+    def __init__(self, pool_connections=10, pool_maxsize=10, pool_block=False,
+                 keep_alive=True, per_thread=False):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.keep_alive = keep_alive
+        self.per_thread = per_thread
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._shared = None
+        self._sessions = weakref.WeakSet()
+        self.closed = False
+
+    def _new_session(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_connections,
+                              pool_maxsize=self.pool_maxsize,
+                              pool_block=self.pool_block)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        if not self.keep_alive:
+            session.headers['Connection'] = 'close'
+        self._sessions.add(session)
+        return session
+
+    def session(self):
+        if self.closed:
+            raise Exception('Session pool is closed')
+        if self.per_thread:
+            holder = getattr(self._local, 'session', None)
+            if holder is None:
+                with self._lock:
+                    session = self._new_session()
+                holder = self._local.session = _ThreadSession(session)
+                weakref.finalize(holder, session.close)
+            return holder.session
+
+        if self._shared is None:
+            with self._lock:
+                if self._shared is None:
+                    self._shared = self._new_session()
+        return self._shared
+
+    def close(self):
+        with self._lock:
+            self.closed = True
+            sessions, self._sessions = list(self._sessions), weakref.WeakSet()
+            self._shared = None
+        for session in sessions:
+            session.close()
+
+
+class _PooledClient(object):
+
+    """
+    Base class for clients that send every request through a `SessionPool`.
+
+    A client creates its own pool unless one is passed in with `pool`, in
+    which case the pool is shared and is not closed by `close()`.
+    """
+    cache = None
+    retry = None
+    breaker = None
+    singleflight = None
+    metrics = None
+    codec = None
+    user_cache = None
+
+    def _init_pool(self, pool=None, **pool_options):
+        if pool is None:
+            self.pool = SessionPool(**pool_options)
+            self._owns_pool = True
+        else:
+            self.pool = pool
+            self._owns_pool = False
+
+    def _send(self, method, url, **kwargs):
+        if self.metrics is None:
+            return self.pool.session().request(method, url, **kwargs)
+
+        endpoint = metrics_util.current_endpoint() or method
+        start = time.perf_counter()
+        try:
+            r = self.pool.session().request(method, url, **kwargs)
+        except Exception as e:
+            self.metrics.observe_request(endpoint, method, url, None, time.perf_counter() - start, 0, e)
+            raise
+        self.metrics.observe_request(endpoint, method, url, r.status_code, time.perf_counter() - start,
+                                     metrics_util.response_size(r))
+        return r
+
+    def _request(self, method, url, **kwargs):
+        kwargs.setdefault('auth', self.auth)
+        if self.retry is None and self.breaker is None:
+            return self._send(method, url, **kwargs)
+        return retry_util.send(lambda: self._send(method, url, **kwargs),
+                               method, self.retry, self.breaker)
+
+    def _cached_get(self, endpoint, url, headers=None, **kwargs):
+        """
+        GETs `url`, answering from `self.cache` while the entry is fresh and
+        revalidating it with a conditional request once it has expired.
+        """
+        cache = self.cache
+        if cache is None:
+            return self._request('GET', url, headers=headers, **kwargs)
+
+        entry = cache.get(url)
+        if entry is not None:
+            if cache.is_fresh(entry):
+                return entry.response
+            headers = dict(headers or {}, **entry.conditional_headers())
+
+        r = self._request('GET', url, headers=headers, **kwargs)
+        if r.status_code == 304 and entry is not None:
+            cache.revalidated(entry)
+            return entry.response
+        if self._cacheable(r):
+            cache.put(endpoint, url, r)
+        return r
+
+    def _cacheable(self, r):
+        # TAS reports errors with a 200 and an error status in the body
+        if r.status_code != 200:
+            return False
+        try:
+            body = self._json(r)
+        except ValueError:
+            return False
+        return isinstance(body, dict) and body.get('status') == 'success'
+
+    def _dumps(self, obj):
+        return (self.codec or codec_util.get_codec()).encode(obj)
+
+    def _json(self, r):
+        return (self.codec or codec_util.get_codec()).loads(r.content)
+
+    def invalidate_cache(self, endpoint=None, url=None):
+        if self.cache is not None:
+            self.cache.invalidate(endpoint, url)
+
+    def close(self):
+        if self._owns_pool:
+            self.pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _coalesced(method):
+    """
+    Lets identical concurrent calls of a read method share one request when
+    the client has a `singleflight`.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.singleflight is None:
+            return method(self, *args, **kwargs)
+        key = (self.baseURL, self.credentials.get('username'), method.__name__,
+               args, tuple(sorted(kwargs.items())))
+        return self.singleflight.do(key, lambda: method(self, *args, **kwargs))
+    return wrapper
+
+
 """
 Client class for the TAS REST APIs.
 """
-class TASClient:
+@metrics_util.instrument
+class TASClient(_PooledClient):
 
     """
     Instantiate the API Object with a base URI and service account credentials.
     The credentials should be a hash with keys `username` and `password` for
     BASIC Auth.
+
+    Any additional keyword arguments (`pool_connections`, `pool_maxsize`,
+    `pool_block`, `keep_alive`, `per_thread`) configure the client's
+    `SessionPool`; pass `pool` to share an existing pool instead.
+
+    Pass a `pytas.cache.ResponseCache` as `cache` to cache the reference
+    data lists (`institutions`, `get_institution`, `get_departments`,
+    `countries` and `fields`). Use `invalidate_cache()` to drop entries.
+
+    Pass a `pytas.retry.RetryPolicy` as `retry` to retry idempotent calls
+    with backoff, and a `pytas.retry.CircuitBreaker` as `breaker` to fail
+    fast with `CircuitOpenError` while TAS is down. Both can be shared with
+    a `JobsClient`.
+
+    With `coalesce=True`, identical concurrent calls of the read methods
+    (users, projects, project users and reference lists) share a single
+    request; pass a `pytas.singleflight.SingleFlight` to coalesce across
+    clients.
+
+    Pass a `pytas.metrics.Metrics` as `metrics` to record per-method request
+    counts, latency, response sizes, statuses and errors.
+
+    `codec` selects the JSON codec for request and response bodies, as a
+    `pytas.codec` codec or its name; by default the process-wide codec from
+    `pytas.codec.get_codec()` is used.
+
+    Pass a `pytas.cache.UserCache` as `user_cache` to answer `get_user` by
+    id, username or email from users fetched earlier. `save_user`,
+    `verify_user`, `confirm_password_reset` and `change_password` drop the
+    user they touch.
     """
-    def __init__(self, baseURL = None, credentials = None):
+    def __init__(self, baseURL = None, credentials = None, pool = None, cache = None,
+                 retry = None, breaker = None, coalesce = False, metrics = None, codec = None,
+                 user_cache = None, **pool_options):
         if (baseURL == None):
             baseURL = os.environ.get('TAS_URL', 'https://example.com/api')
 
@@ -31,6 +278,16 @@ class TASClient:
         self.baseURL = baseURL
         self.credentials = credentials
         self.auth = HTTPBasicAuth(credentials['username'], credentials['password'])
+        self.cache = cache
+        self.retry = retry
+        self.breaker = breaker
+        if coalesce is True:
+            coalesce = SingleFlight()
+        self.singleflight = coalesce or None
+        self.metrics = metrics
+        self.user_cache = user_cache
+        self.codec = codec_util.get_codec(codec) if codec is not None else None
+        self._init_pool(pool, **pool_options)
 
     """
     Authenticate a user
@@ -38,8 +295,8 @@ class TASClient:
     def authenticate(self, username, password):
         payload = {'username': username, 'password': password}
         headers = { 'Content-Type':'application/json' }
-        r = requests.post(self.baseURL + '/auth/login', data=json.dumps( payload ), auth=self.auth, headers=headers)
-        resp = r.json()
+        r = self._request('POST', self.baseURL + '/auth/login', data=self._dumps( payload ), headers=headers)
+        resp = self._json(r)
         if resp['status'] == 'success':
             return resp['result']
         else:
@@ -48,26 +305,50 @@ class TASClient:
     """
     Users
     """
+    @_coalesced
     def get_user(self, id=None, username=None, email=None):
         if id:
+            field, value = 'id', id
             url = '{0}/v1/users/{1}'.format(self.baseURL, id)
         elif username:
+            field, value = 'username', username
             url = '{0}/v1/users/username/{1}'.format(self.baseURL, username)
         elif email:
+            field, value = 'email', email
             url = '{0}/tup/users/email/{1}'.format(self.baseURL, email)
         else:
             raise Exception('username, email, or id is required!')
 
-        r = requests.get(url, auth=self.auth)
+        user_cache = self.user_cache
+        if user_cache is not None:
+            user = user_cache.get(field, value)
+            if user is not None:
+                return user
+
+        r = self._request('GET', url)
         if r.ok:
-            resp = r.json()
+            resp = self._json(r)
             if resp['status'] == 'success':
+                if user_cache is not None:
+                    user_cache.put(resp['result'])
                 return resp['result']
             else:
                 raise Exception('Error: %s' % resp['message'])
         else:
             r.raise_for_status()
 
+    def get_users(self, ids=None, usernames=None, emails=None, max_workers=DEFAULT_MAX_WORKERS):
+        """
+        Looks up many users at once, running up to `max_workers` `get_user`
+        calls concurrently over the client's pool. Returns a list of
+        `pytas.bulk.BulkResult`, one per lookup in input order (ids, then
+        usernames, then emails); each result's `item` is the `(field, value)`
+        lookup and a failed lookup carries its exception in `error`.
+        """
+        return bulk_map(lambda lookup: self.get_user(**{lookup[0]: lookup[1]}),
+                        user_lookups(ids, usernames, emails), max_workers)
+
+    @saved_user
     def save_user(self, id, user):
         if id:
             url = '{0}/v1/users/{1}'.format( self.baseURL, id )
@@ -77,8 +358,8 @@ class TASClient:
             method = 'POST'
 
         headers = { 'Content-Type':'application/json' }
-        r = requests.request( method, url, data=json.dumps( user ), auth=self.auth, headers=headers )
-        resp = r.json()
+        r = self._request(method, url, data=self._dumps( user ), headers=headers )
+        resp = self._json(r)
         if resp['status'] == 'success':
             return resp['result']
         else:
@@ -87,14 +368,15 @@ class TASClient:
             else:
                 raise Exception('Unable to save new user', resp['message'])
 
+    @verified_user
     def verify_user(self, user_id, code, password=None):
         url = '{0}/v1/users/{1}/{2}'.format(self.baseURL, user_id, code)
         if password:
             data = {'password': password}
-            r = requests.post(url, data=data, auth=self.auth)
+            r = self._request('POST', url, data=data)
         else:
-            r = requests.put(url, auth=self.auth)
-        resp = r.json()
+            r = self._request('PUT', url)
+        resp = self._json(r)
         if resp['status'] == 'success':
             return True
         else:
@@ -105,13 +387,14 @@ class TASClient:
             url = '{0}/v1/users/{1}/passwordResets?source={2}'.format( self.baseURL, username, source )
         else:
             url = '{0}/v1/users/{1}/passwordResets'.format( self.baseURL, username )
-        r = requests.post( url, auth=self.auth )
-        resp = r.json()
+        r = self._request('POST', url )
+        resp = self._json(r)
         if resp['status'] == 'success':
             return resp['result']
         else:
             raise Exception( 'Error requesting password reset for user={0}'.format( username ), resp['message'] )
 
+    @changed_password
     def confirm_password_reset( self, username, code, new_password, source=None  ):
         if source:
             url = '{0}/v1/users/{1}/passwordResets/{2}?source={3}'.format( self.baseURL, username, code, source )
@@ -121,9 +404,9 @@ class TASClient:
             'password': new_password
         }
         headers = { 'Content-Type':'application/json' }
-        r = requests.post( url, data=json.dumps( body ), auth=self.auth, headers=headers )
+        r = self._request('POST', url, data=self._dumps( body ), headers=headers )
         if r.status_code == 200:
-            resp = r.json()
+            resp = self._json(r)
             if resp['status'] == 'success':
                 return True
             else:
@@ -131,6 +414,7 @@ class TASClient:
         else:
             raise Exception( 'Failed password reset for user={0}'.format( username ), 'Server Error' )
 
+    @changed_password
     def change_password(self, username, current_password, new_password):
         url = '{0}/v1/users/{1}/passwordChanges'.format(self.baseURL, username)
         body = {
@@ -138,9 +422,9 @@ class TASClient:
             'newPassword': new_password
         }
         headers = {'Content-Type':'application/json'}
-        r = requests.post(url, data=json.dumps(body), auth=self.auth, headers=headers)
+        r = self._request('POST', url, data=self._dumps(body), headers=headers)
         if r.ok:
-            resp = r.json()
+            resp = self._json(r)
             if resp['status'] == 'success':
                 return True
             else:
@@ -154,11 +438,12 @@ class TASClient:
     Data Lists
     Institutions/Departments
     """
+    @_coalesced
     def institutions(self):
         url = '{0}/v1/institutions/'.format(self.baseURL)
-        r = requests.get(url, auth=self.auth, headers={'Content-Type':'application/json'})
+        r = self._cached_get('institutions', url, headers={'Content-Type':'application/json'})
         if r.status_code == 200:
-            resp = r.json()
+            resp = self._json(r)
             if resp['status'] == 'success':
                 return resp['result']
             else:
@@ -182,14 +467,15 @@ class TASClient:
 
         return depts
 
+    @_coalesced
     def get_institution(self, institution_id):
         url = '{0}/v1/institutions/{1}'.format( self.baseURL, institution_id )
 
         headers = { 'Content-Type':'application/json' }
 
-        r = requests.get( url, auth=self.auth, headers=headers )
+        r = self._cached_get('institution', url, headers=headers )
         if r.status_code == 200:
-            resp = r.json()
+            resp = self._json(r)
             if resp['status'] == 'success':
                 inst = {
                     'id': resp['result']['id'],
@@ -203,14 +489,15 @@ class TASClient:
         else:
             raise Exception( 'Failed to fetch institution for id={0}'.format( institution_id ), 'Server error' )
 
+    @_coalesced
     def get_departments(self, institution_id):
         url = '{0}/v1/institutions/{1}/departments'.format( self.baseURL, institution_id )
 
         headers = { 'Content-Type':'application/json' }
 
-        r = requests.get( url, auth=self.auth, headers=headers )
+        r = self._cached_get('departments', url, headers=headers )
         if r.status_code == 200:
-            resp = r.json()
+            resp = self._json(r)
             if resp['status'] == 'success':
                 return self._departments(resp['result'])
 
@@ -230,11 +517,12 @@ class TASClient:
 
         return depts
 
+    @_coalesced
     def countries(self):
         url = '{0}/v1/countries/'.format(self.baseURL)
-        r = requests.get(url, auth=self.auth, headers={'Content-Type':'application/json'})
+        r = self._cached_get('countries', url, headers={'Content-Type':'application/json'})
         if r.status_code == 200:
-            resp = r.json()
+            resp = self._json(r)
             if resp['status'] == 'success':
                 return resp['result']
             else:
@@ -245,28 +533,31 @@ class TASClient:
     """
     Fields
     """
+    @_coalesced
     def fields( self ):
-        r = requests.get( '{0}/tup/projects/fields'.format(self.baseURL), auth=self.auth )
-        resp = r.json()
+        r = self._cached_get('fields', '{0}/tup/projects/fields'.format(self.baseURL) )
+        resp = self._json(r)
         return resp[ 'result' ]
 
     """
     Projects
     """
+    @_coalesced
     def projects_for_group(self, group):
         headers = {'Content-Type':'application/json'}
-        r = requests.get( '{0}/v1/projects/group/{1}'.format(self.baseURL, group), headers=headers, auth=self.auth )
-        resp = r.json()
+        r = self._request('GET', '{0}/v1/projects/group/{1}'.format(self.baseURL, group), headers=headers )
+        resp = self._json(r)
         if resp['status'] == 'success':
             return resp['result']
         else:
             raise Exception('Projects not found: %s' % resp['message'])
 
+    @_coalesced
     def project( self, id ):
         headers = { 'Content-Type':'application/json' }
-        r = requests.get( '{0}/v1/projects/{1}'.format(self.baseURL, id), headers=headers, auth=self.auth )
+        r = self._request('GET', '{0}/v1/projects/{1}'.format(self.baseURL, id), headers=headers )
         if r.status_code == 200:
-            resp = r.json()
+            resp = self._json(r)
             if resp['status'] == 'success':
                 return resp['result']
             else:
@@ -274,10 +565,11 @@ class TASClient:
         else:
             r.raise_for_status()
 
+    @_coalesced
     def projects_for_user( self, username ):
         headers = { 'Content-Type':'application/json' }
-        r = requests.get( '{0}/v1/projects/username/{1}'.format(self.baseURL, username), headers=headers, auth=self.auth )
-        resp = r.json()
+        r = self._request('GET', '{0}/v1/projects/username/{1}'.format(self.baseURL, username), headers=headers )
+        resp = self._json(r)
         return resp['result']
 
     """
@@ -303,8 +595,8 @@ class TASClient:
     def create_project( self, project ):
         url = '{0}/v1/projects'.format( self.baseURL )
         headers = { 'Content-Type':'application/json' }
-        r = requests.post( url, data=json.dumps( project ), auth=self.auth, headers=headers )
-        resp = r.json()
+        r = self._request('POST', url, data=self._dumps( project ), headers=headers )
+        resp = self._json(r)
         if resp['status'] == 'success':
             return resp['result']
         else:
@@ -313,8 +605,8 @@ class TASClient:
     def edit_project( self, project ):
         url = '{0}/v1/projects/{1}'.format( self.baseURL, project['id'] )
         headers = { 'Content-Type':'application/json' }
-        r = requests.put( url, data=json.dumps( project ), auth=self.auth, headers=headers )
-        resp = r.json()
+        r = self._request('PUT', url, data=self._dumps( project ), headers=headers )
+        resp = self._json(r)
         if resp['status'] == 'success':
             return resp['result']
         else:
@@ -323,8 +615,8 @@ class TASClient:
     def edit_allocation( self, allocation ):
         url = '{0}/v1/allocations/{1}'.format( self.baseURL, allocation['id'] )
         headers = { 'Content-Type':'application/json' }
-        r = requests.put( url, data=json.dumps( allocation ), auth=self.auth, headers=headers )
-        resp = r.json()
+        r = self._request('PUT', url, data=self._dumps( allocation ), headers=headers )
+        resp = self._json(r)
         if resp['status'] == 'success':
             return resp['result']
         else:
@@ -333,8 +625,8 @@ class TASClient:
     def create_allocation(self, allocation):
         url = '{0}/v1/allocations'.format( self.baseURL )
         headers = { 'Content-Type':'application/json' }
-        r = requests.post( url, data=json.dumps( allocation ), auth=self.auth, headers=headers )
-        resp = r.json()
+        r = self._request('POST', url, data=self._dumps( allocation ), headers=headers )
+        resp = self._json(r)
         if resp['status'] == 'success':
             return resp['result']
         else:
@@ -343,25 +635,26 @@ class TASClient:
     """
     Project Users
     """
+    @_coalesced
     def get_project_users( self, project_id ):
-        r = requests.get( '{0}/v1/projects/{1}/users'.format( self.baseURL, project_id ), auth=self.auth )
-        resp = r.json()
+        r = self._request('GET', '{0}/v1/projects/{1}/users'.format( self.baseURL, project_id ) )
+        resp = self._json(r)
         if resp['status'] == 'success':
             return resp['result']
         else:
             raise Exception( 'Failed to get project users', resp['message'] )
 
     def add_project_user( self, project_id, username ):
-        r = requests.post( '{0}/v1/projects/{1}/users/{2}'.format( self.baseURL, project_id, username ), auth=self.auth )
-        resp = r.json()
+        r = self._request('POST', '{0}/v1/projects/{1}/users/{2}'.format( self.baseURL, project_id, username ) )
+        resp = self._json(r)
         if resp['status'] == 'success':
             return True
         else:
             raise Exception( 'Failed to add user to project', resp['message'] )
 
     def del_project_user( self, project_id, username ):
-        r = requests.delete( '{0}/v1/projects/{1}/users/{2}'.format( self.baseURL, project_id, username ), auth=self.auth )
-        resp = r.json()
+        r = self._request('DELETE', '{0}/v1/projects/{1}/users/{2}'.format( self.baseURL, project_id, username ) )
+        resp = self._json(r)
         if resp['status'] == 'success':
             return True
         else:
@@ -373,8 +666,8 @@ class TASClient:
         url = '{0}/v1/allocations/{1}'.format( self.baseURL, id )
         method = 'PUT'
         headers = { 'Content-Type':'application/json' }
-        r = requests.request( method, url, data=json.dumps( allocation ), auth=self.auth, headers=headers )
-        resp = r.json()
+        r = self._request(method, url, data=self._dumps( allocation ), headers=headers )
+        resp = self._json(r)
         if resp['status'] == 'success':
             return resp['result']
         else:
@@ -384,7 +677,8 @@ class TASClient:
         Client class for the TAS REST APIs.
         """
 
-class JobsClient:
+@metrics_util.instrument
+class JobsClient(_PooledClient):
 
     """
     Instantiate the API Object with a base URI and service account credentials.
@@ -392,9 +686,13 @@ class JobsClient:
     BASIC Auth.
 
     This gets a seperate class from the regular TAS functions because everything about this endpoint is completely different.
+
+    Connection pool, `retry`, `breaker`, `metrics` and `codec` options are
+    the same as for `TASClient`.
     """
 
-    def __init__(self, baseURL=None, credentials=None):
+    def __init__(self, baseURL=None, credentials=None, pool=None, retry=None, breaker=None,
+                 metrics=None, codec=None, **pool_options):
         if (baseURL == None):
             baseURL = os.environ.get('JOBS_URL', 'https://example.com/api')
 
@@ -406,11 +704,16 @@ class JobsClient:
         self.baseURL = baseURL
         self.credentials = credentials
         self.auth = HTTPBasicAuth(credentials['username'], credentials['password'])
+        self.retry = retry
+        self.breaker = breaker
+        self.metrics = metrics
+        self.codec = codec_util.get_codec(codec) if codec is not None else None
+        self._init_pool(pool, **pool_options)
 
     """
     Jobs
     """
-    def get_jobs(self, resource=None, start=None, end=None, allocation_id=None, username=None, queue=None):
+    def _jobs_request(self, resource, start, end, allocation_id, username, queue):
         logger.debug("Getting jobs!")
         if resource is None:
             raise Exception('Resource is required.')
@@ -418,8 +721,7 @@ class JobsClient:
             raise Exception('Start date is required')
         if end is None:
             raise Exception('End date is required')
-        logger.debug(resource + ", start= " + start + ", end = " + end)
-        method = 'GET'
+        logger.debug("{0}, start= {1}, end = {2}".format(resource, start, end))
         headers = {'Content-Type': 'application/json'}
 
         url = '{0}/v1/Jobs'.format(self.baseURL)
@@ -437,10 +739,91 @@ class JobsClient:
 
         logger.debug(url)
         logger.debug(params)
-        r = requests.request(method, url, params=params, auth=self.auth, headers=headers)
-        resp = r.json()
+        return url, params, headers
+
+    def get_jobs(self, resource=None, start=None, end=None, allocation_id=None, username=None, queue=None):
+        url, params, headers = self._jobs_request(resource, start, end, allocation_id, username, queue)
+        r = self._request('GET', url, params=params, headers=headers)
+        resp = self._json(r)
         #if resp['status'] == 'success':
         if r.status_code == 200:
             return resp['jobs']
         else:
             raise Exception('Unable to get jobs for username: {0}'.format(username), resp['message'])
+
+    def get_jobs_sharded(self, resource=None, start=None, end=None, allocation_id=None, username=None, queue=None,
+                         window=jobs_util.DEFAULT_SHARD_WINDOW, max_workers=4,
+                         id_field=jobs_util.JOB_ID_FIELD, time_field=jobs_util.JOB_TIME_FIELD):
+        """
+        Like `get_jobs`, but splits `[start, end]` into sub-windows of at
+        most `window` (a `timedelta`) and fetches them with up to
+        `max_workers` concurrent requests, applying the same filters to each.
+        Results are merged in `time_field` order and jobs returned by more
+        than one window are deduplicated on `id_field`. If any window fails
+        its exception is raised.
+        """
+        if start is None:
+            raise Exception('Start date is required')
+        if end is None:
+            raise Exception('End date is required')
+        windows = jobs_util.time_windows(start, end, window)
+        results = bulk_map(lambda w: self.get_jobs(resource, w[0], w[1], allocation_id, username, queue),
+                           windows, max_workers)
+        for result in results:
+            if not result.ok:
+                raise result.error
+        return jobs_util.merge_jobs([result.result for result in results], id_field, time_field)
+
+    def sync_jobs(self, store, resource, end, start=None, allocation_id=None, username=None, queue=None,
+                  window=None, max_workers=4):
+        """
+        Incrementally syncs jobs for `resource` into `store` (a
+        `pytas.jobstore.JobStore`). Fetches from the watermark, or from
+        `start` on the first sync, up to `end`, then advances the watermark
+        to `end` (never backwards, and never past the store's clock). Syncs
+        filtered by allocation, user or queue keep their own watermark.
+        Jobs on the boundary may be fetched twice and are simply
+        overwritten. With `window`, the range is fetched with
+        `get_jobs_sharded`. Returns the number of jobs written.
+        """
+        watermark = store.get_watermark(resource, allocation_id, username, queue)
+        if watermark is not None:
+            start = watermark
+        elif start is None:
+            raise Exception('Start date is required for the first sync of {0}'.format(resource))
+
+        if window is None:
+            jobs = self.get_jobs(resource, start, end, allocation_id, username, queue)
+        else:
+            jobs = self.get_jobs_sharded(resource, start, end, allocation_id, username, queue,
+                                         window=window, max_workers=max_workers,
+                                         id_field=store.id_field, time_field=store.time_field)
+        return store.add_jobs(resource, jobs, watermark=end, allocation_id=allocation_id,
+                              username=username, queue=queue)
+
+    def iter_jobs(self, resource=None, start=None, end=None, allocation_id=None, username=None, queue=None,
+                  chunk_size=JOBS_CHUNK_SIZE):
+        """
+        Like `get_jobs`, but returns an iterator that yields job records one
+        at a time while the response body is still arriving, so memory use
+        stays flat regardless of the size of the time window. The request is
+        sent (and argument or HTTP errors raised) when this method is
+        called; the connection is released once the iterator is exhausted
+        or closed.
+        """
+        url, params, headers = self._jobs_request(resource, start, end, allocation_id, username, queue)
+        r = self._request('GET', url, params=params, headers=headers, stream=True)
+        if r.status_code != 200:
+            try:
+                resp = self._json(r)
+            finally:
+                r.close()
+            raise Exception('Unable to get jobs for username: {0}'.format(username), resp['message'])
+
+        def jobs():
+            try:
+                for job in iter_json_array(r.iter_content(chunk_size), 'jobs'):
+                    yield job
+            finally:
+                r.close()
+        return jobs()
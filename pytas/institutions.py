@@ -0,0 +1,299 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import bisect
+import logging
+import re
+import threading
+import time
+import unicodedata
+
+from pytas.bulk import bulk_map, DEFAULT_MAX_WORKERS
+from pytas.models import base
+
+logger = logging.getLogger(__name__)
+
+"""
+A local, periodically refreshed index of TAS institutions and departments
+for typeahead pickers.
+"""
+
+DEFAULT_REFRESH_INTERVAL = 24 * 60 * 60
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+def normalize(text):
+    """
+    Folds case and strips accents, so that "zurich" finds "Zürich".
+    """
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+def tokenize(text):
+    return _TOKEN_RE.findall(normalize(text))
+
+
+class IndexEntry(object):
+
+    """
+    An institution or a department in the index. Institutions and
+    departments have separate id spaces, so an entry is identified by its
+    `key`, `(kind, id)`. `children` holds the keys of its departments.
+    """
+    __slots__ = ('id', 'name', 'kind', 'parent_key', 'children')
+
+    INSTITUTION = 'institution'
+    DEPARTMENT = 'department'
+
+    def __init__(self, id, name, kind=INSTITUTION, parent_key=None):
+        self.id = id
+        self.name = name
+        self.kind = kind
+        self.parent_key = parent_key
+        self.children = []
+
+    @property
+    def key(self):
+        return (self.kind, self.id)
+
+    @property
+    def parent_id(self):
+        return self.parent_key[1] if self.parent_key is not None else None
+
+    @property
+    def is_institution(self):
+        return self.kind == self.INSTITUTION
+
+    def as_dict(self):
+        return {'id': self.id, 'name': self.name, 'kind': self.kind, 'parentId': self.parent_id,
+                'children': [id for _, id in self.children]}
+
+    def __repr__(self):
+        return 'IndexEntry(%r, %r, kind=%r, parent_key=%r)' % (self.id, self.name, self.kind,
+                                                                self.parent_key)
+
+
+class _SortedNames(object):
+
+    """
+    Sorted arrays of the normalized full names and of the name words of a
+    set of entries, so that a prefix lookup is a bisect followed by a scan
+    of just the matches it returns.
+    """
+    __slots__ = ('names', 'name_keys', 'tokens', 'token_keys')
+
+    def __init__(self, keys, normalized, words):
+        names = sorted((normalized[k], k) for k in keys)
+        self.names = [n for n, _ in names]
+        self.name_keys = [k for _, k in names]
+        tokens = sorted((token, normalized[k], k) for k in keys for token in set(words[k].split()))
+        self.tokens = [t for t, _, _ in tokens]
+        self.token_keys = [k for _, _, k in tokens]
+
+
+class _Snapshot(object):
+
+    """
+    One immutable build of the index. Searches run against `_SortedNames`
+    of every entry, or of institutions only, so that an institutions-only
+    search never scans departments. Searches within one parent scan only
+    that parent's children.
+    """
+    def __init__(self, entries):
+        self.entries = entries
+        normalized = self.normalized = dict((k, normalize(e.name)) for k, e in entries.items())
+        self.institutions = sorted((e for e in entries.values() if e.is_institution),
+                                   key=lambda e: normalized[e.key])
+        # every word of the name preceded by a space, so that "word starts
+        # with w" is a substring test for " " + w
+        self.words = dict((k, ' ' + ' '.join(_TOKEN_RE.findall(n))) for k, n in normalized.items())
+        self.all_names = _SortedNames(list(entries), normalized, self.words)
+        self.institution_names = _SortedNames([e.key for e in self.institutions], normalized, self.words)
+        self.by_parent = {}
+        for k in self.all_names.name_keys:
+            parent_key = entries[k].parent_key
+            if parent_key is not None:
+                self.by_parent.setdefault(parent_key, []).append(k)
+
+    def lookup(self, id, kind=None):
+        if kind is not None:
+            return self.entries.get((kind, id))
+        entry = self.entries.get((IndexEntry.INSTITUTION, id))
+        if entry is None:
+            entry = self.entries.get((IndexEntry.DEPARTMENT, id))
+        return entry
+
+    def _range(self, keys, prefix):
+        return bisect.bisect_left(keys, prefix), bisect.bisect_left(keys, prefix + '\U0010ffff')
+
+    def _search_children(self, phrase, words, limit, parent_id, parent_kind):
+        kinds = (parent_kind,) if parent_kind else (IndexEntry.INSTITUTION, IndexEntry.DEPARTMENT)
+        children = [k for kind in kinds for k in self.by_parent.get((kind, parent_id), ())]
+        starts = [k for k in children if self.normalized[k].startswith(phrase)]
+        matched = set(starts)
+        starts.extend(k for k in children if k not in matched
+                      and all(' ' + w in self.words[k] for w in words))
+        return [self.entries[k] for k in starts[:limit]]
+
+    def search(self, query, limit, parent_id, institutions_only, parent_kind=None):
+        phrase = normalize(query).strip()
+        words = tokenize(query)
+        if not words:
+            return []
+        if parent_id is not None:
+            if institutions_only:
+                return []
+            return self._search_children(phrase, words, limit, parent_id, parent_kind)
+
+        # names starting with the query rank first, then names with a word
+        # starting with the rarest query word, each in alphabetical order
+        arrays = self.institution_names if institutions_only else self.all_names
+        ranges = [(self._range(arrays.tokens, w), w) for w in words]
+        (lo, hi), rarest = min(ranges, key=lambda r: r[0][1] - r[0][0])
+        rest = [' ' + w for w in words if w != rarest]
+        results, seen = [], set()
+        for keys, (lo, hi) in ((arrays.name_keys, self._range(arrays.names, phrase)),
+                               (arrays.token_keys, (lo, hi))):
+            for i in range(lo, hi):
+                key = keys[i]
+                if key in seen:
+                    continue
+                seen.add(key)
+                if rest and not all(w in self.words[key] for w in rest):
+                    continue
+                results.append(self.entries[key])
+                if len(results) >= limit:
+                    return results
+        return results
+
+
+class InstitutionIndex(object):
+
+    """
+    An in-memory index of all institutions and their departments, answering
+    id lookups, parent/child navigation and case-insensitive prefix and
+    word searches without calling TAS.
+
+    The index is built from `institutions()` on first use. Departments
+    listed in the institutions' `departments` or `children` are indexed
+    directly; with `fetch_departments=True`, `get_departments()` is called
+    for each institution (using up to `max_workers` threads) instead.
+
+    After `refresh_interval` seconds the next access starts a rebuild in a
+    background thread and keeps answering from the current index until it
+    completes. A failed rebuild is logged and retried after the next
+    interval.
+    """
+    def __init__(self, client=None, refresh_interval=DEFAULT_REFRESH_INTERVAL,
+                 fetch_departments=False, max_workers=DEFAULT_MAX_WORKERS, timer=time.monotonic):
+        self.client = client
+        self.refresh_interval = refresh_interval
+        self.fetch_departments = fetch_departments
+        self.max_workers = max_workers
+        self.timer = timer
+        self._snapshot = None
+        self._expires = None
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        api = base.get_client(self.client)
+        institutions = api.institutions()
+        if self.fetch_departments:
+            results = bulk_map(lambda inst: api.get_departments(inst['id']), institutions, self.max_workers)
+            for result in results:
+                if not result.ok:
+                    raise result.error
+            institutions = [{'id': r.item['id'], 'name': r.item.get('name'), 'departments': r.result}
+                            for r in results]
+
+        entries = {}
+        def add(node, parent):
+            if parent is None:
+                entry = IndexEntry(node['id'], node.get('name'))
+            else:
+                entry = IndexEntry(node['id'], node.get('name'), IndexEntry.DEPARTMENT, parent.key)
+                parent.children.append(entry.key)
+            entries[entry.key] = entry
+            for child in (node.get('departments') or []) + (node.get('children') or []):
+                add(child, entry)
+
+        for inst in institutions:
+            add(inst, None)
+        return _Snapshot(entries)
+
+    def refresh(self):
+        """
+        Rebuilds the index from TAS now.
+        """
+        snapshot = self._load()
+        with self._lock:
+            self._snapshot = snapshot
+            self._expires = self.timer() + self.refresh_interval
+
+    def _background_refresh(self):
+        try:
+            self.refresh()
+        except Exception:
+            logger.exception('Failed to refresh the institution index')
+            with self._lock:
+                self._expires = self.timer() + self.refresh_interval
+        finally:
+            self._refreshing = False
+
+    def _current(self):
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._snapshot = self._load()
+                    self._expires = self.timer() + self.refresh_interval
+                return self._snapshot
+        if self.timer() >= self._expires and not self._refreshing:
+            with self._lock:
+                if self._refreshing:
+                    return snapshot
+                self._refreshing = True
+            threading.Thread(target=self._background_refresh, daemon=True).start()
+        return snapshot
+
+    def get(self, id, kind=None):
+        """
+        Returns the `IndexEntry` for an institution or department id, or
+        None. Pass `kind` (`IndexEntry.INSTITUTION` or `IndexEntry.DEPARTMENT`)
+        when the id could be either; otherwise an institution is preferred.
+        """
+        return self._current().lookup(id, kind)
+
+    def parent(self, id, kind=None):
+        snapshot = self._current()
+        entry = snapshot.lookup(id, kind)
+        if entry is None or entry.parent_key is None:
+            return None
+        return snapshot.entries.get(entry.parent_key)
+
+    def children(self, id, kind=None):
+        snapshot = self._current()
+        entry = snapshot.lookup(id, kind)
+        if entry is None:
+            return []
+        return [snapshot.entries[k] for k in entry.children]
+
+    def institutions(self):
+        """
+        Returns all top-level institutions, sorted by name.
+        """
+        return list(self._current().institutions)
+
+    def search(self, query, limit=10, parent_id=None, institutions_only=False, parent_kind=None):
+        """
+        Returns up to `limit` entries matching `query`, ignoring case and
+        accents. Entries whose name starts with the query come first, then
+        entries with a word starting with each query word. Pass `parent_id`
+        (and `parent_kind` if the id could be either) to search one
+        institution's or department's children, or `institutions_only` to
+        skip departments.
+        """
+        return self._current().search(query, limit, parent_id, institutions_only, parent_kind)
+
+    def __len__(self):
+        return len(self._current().entries)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from datetime import date, datetime, timedelta
+
+"""
+Helpers for working with job records from the TAS Jobs API.
+"""
+
+"""
+Job record fields used to identify and order jobs.
+"""
+JOB_ID_FIELD = 'jobId'
+JOB_TIME_FIELD = 'end'
+JOB_USERNAME_FIELD = 'username'
+JOB_ALLOCATION_FIELD = 'allocationId'
+JOB_QUEUE_FIELD = 'queueName'
+JOB_CHARGE_FIELD = 'su'
+
+DEFAULT_SHARD_WINDOW = timedelta(days=7)
+
+_DATE_FORMATS = (
+    '%Y-%m-%d',
+    '%Y-%m-%dT%H:%M:%S',
+    '%Y-%m-%dT%H:%M:%SZ',
+    '%Y-%m-%dT%H:%M:%S.%f',
+    '%Y-%m-%dT%H:%M:%S.%fZ',
+    '%Y-%m-%d %H:%M:%S',
+)
+
+def parse_date(value):
+    """
+    Returns `(datetime, format)` for a date given as a `datetime`, a `date`
+    or a string in one of the formats accepted by the Jobs API. `format`
+    is the one to write boundaries back in, or None for non-strings.
+    """
+    if isinstance(value, datetime):
+        return value, None
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day), None
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt), fmt
+        except ValueError:
+            pass
+    raise ValueError('Unrecognized date: {0}'.format(value))
+
+
+def time_windows(start, end, window=DEFAULT_SHARD_WINDOW):
+    """
+    Splits `[start, end]` into consecutive `(start, end)` windows of at most
+    `window`. Adjacent windows share their boundary, so together they cover
+    the whole range. Boundaries are returned in the same representation
+    as `start`; date-only strings are split on whole days.
+    """
+    start_dt, fmt = parse_date(start)
+    end_dt, _ = parse_date(end)
+    if fmt == '%Y-%m-%d' and window < timedelta(days=1):
+        window = timedelta(days=1)
+    if window <= timedelta(0):
+        raise ValueError('Shard window must be positive')
+
+    def out(dt):
+        if fmt is not None:
+            return dt.strftime(fmt)
+        if isinstance(start, datetime):
+            return dt
+        return dt.date()
+
+    windows = []
+    lo = start_dt
+    while True:
+        hi = min(lo + window, end_dt)
+        windows.append((out(lo), out(hi)))
+        if hi >= end_dt:
+            return windows
+        lo = hi
+
+
+def merge_jobs(shards, id_field=JOB_ID_FIELD, time_field=JOB_TIME_FIELD):
+    """
+    Merges lists of jobs fetched for consecutive windows into one list in
+    `time_field` order, keeping the first copy of any job (by `id_field`)
+    returned by more than one window. Jobs without an id are all kept and
+    jobs without a time sort last, in their original order.
+    """
+    seen = set()
+    merged = []
+    for jobs in shards:
+        for job in jobs:
+            job_id = job.get(id_field)
+            if job_id is not None:
+                if job_id in seen:
+                    continue
+                seen.add(job_id)
+            merged.append(job)
+    merged.sort(key=lambda job: (job.get(time_field) is None, job.get(time_field) or ''))
+    return merged
@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import sqlite3
+import threading
+from datetime import datetime
+
+from pytas import jobs as jobs_util
+from pytas import codec as codec_util
+
+"""
+Local SQLite store of job records for incremental syncing from the Jobs API.
+"""
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    resource TEXT NOT NULL,
+    job_id TEXT NOT NULL,
+    username TEXT,
+    allocation_id TEXT,
+    queue TEXT,
+    time TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (resource, job_id)
+);
+CREATE INDEX IF NOT EXISTS jobs_username ON jobs (resource, username, time);
+CREATE INDEX IF NOT EXISTS jobs_allocation ON jobs (resource, allocation_id, time);
+CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (resource, queue, time);
+CREATE INDEX IF NOT EXISTS jobs_time ON jobs (resource, time);
+CREATE TABLE IF NOT EXISTS watermarks (
+    resource TEXT PRIMARY KEY,
+    watermark TEXT NOT NULL
+);
+"""
+
+def watermark_key(resource, allocation_id=None, username=None, queue=None):
+    """
+    Returns the key a watermark is kept under. A sync filtered by
+    allocation, user or queue only covers part of the resource's jobs, so
+    it gets a watermark of its own and never moves the unfiltered one.
+    """
+    filters = [(name, value) for name, value in (('allocationId', allocation_id),
+                                                 ('username', username),
+                                                 ('queueName', queue)) if value is not None]
+    if not filters:
+        return resource
+    return '{0}?{1}'.format(resource, '&'.join('{0}={1}'.format(n, v) for n, v in filters))
+
+
+class JobStore(object):
+
+    """
+    A persistent store of job records keyed by `(resource, job id)`, with a
+    per-resource sync watermark recording the end of the last synced range.
+    Syncs filtered by allocation, user or queue keep separate watermarks.
+
+    `path` is a SQLite database file (the default keeps the store in memory).
+    Job records are stored whole as JSON alongside indexed columns for the
+    user, allocation, queue and time fields, whose names default to the
+    `pytas.jobs` constants. Times are compared as strings, so query bounds
+    should use the same ISO format as the Jobs API.
+
+    `clock` returns the current time, in the Jobs API's time zone, that
+    watermarks are clamped to.
+
+    See `JobsClient.sync_jobs` for incremental syncing.
+    """
+    def __init__(self, path=':memory:', id_field=jobs_util.JOB_ID_FIELD,
+                 time_field=jobs_util.JOB_TIME_FIELD,
+                 username_field=jobs_util.JOB_USERNAME_FIELD,
+                 allocation_field=jobs_util.JOB_ALLOCATION_FIELD,
+                 queue_field=jobs_util.JOB_QUEUE_FIELD, clock=datetime.utcnow):
+        self.path = path
+        self.clock = clock
+        self.id_field = id_field
+        self.time_field = time_field
+        self.username_field = username_field
+        self.allocation_field = allocation_field
+        self.queue_field = queue_field
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _row(self, resource, job):
+        def column(field):
+            value = job.get(field)
+            return None if value is None else str(value)
+        return (resource, str(job[self.id_field]), column(self.username_field),
+                column(self.allocation_field), column(self.queue_field),
+                column(self.time_field), codec_util.get_codec().dumps(job))
+
+    def _advance_watermark(self, key, watermark):
+        value, fmt = jobs_util.parse_date(watermark)
+        now = self.clock().replace(microsecond=0)
+        if value > now:
+            # jobs ending after now have not been reported yet
+            value = now
+            watermark = now.strftime(fmt) if fmt else now
+        row = self._conn.execute('SELECT watermark FROM watermarks WHERE resource = ?', (key,)).fetchone()
+        if row is not None:
+            try:
+                if jobs_util.parse_date(row[0])[0] >= value:
+                    return
+            except ValueError:
+                pass
+        self._conn.execute('INSERT OR REPLACE INTO watermarks VALUES (?, ?)', (key, str(watermark)))
+
+    def add_jobs(self, resource, jobs, watermark=None, allocation_id=None, username=None, queue=None):
+        """
+        Inserts or replaces `jobs` for `resource` and returns how many were
+        written; jobs without an id cannot be tracked and are skipped. If
+        `watermark` is given the watermark for `resource` and the filters
+        is advanced in the same transaction, so an interrupted sync is
+        retried from the old mark. The watermark only moves forward and
+        never past the store's `clock`.
+        """
+        rows = [self._row(resource, job) for job in jobs if job.get(self.id_field) is not None]
+        with self._lock, self._conn:
+            self._conn.executemany('INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+            if watermark is not None:
+                self._advance_watermark(watermark_key(resource, allocation_id, username, queue), watermark)
+        return len(rows)
+
+    def get_watermark(self, resource, allocation_id=None, username=None, queue=None):
+        key = watermark_key(resource, allocation_id, username, queue)
+        with self._lock:
+            row = self._conn.execute('SELECT watermark FROM watermarks WHERE resource = ?',
+                                     (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_watermark(self, resource, watermark, allocation_id=None, username=None, queue=None):
+        """
+        Sets the watermark as given, including moving it backwards to
+        re-sync a range.
+        """
+        key = watermark_key(resource, allocation_id, username, queue)
+        with self._lock, self._conn:
+            self._conn.execute('INSERT OR REPLACE INTO watermarks VALUES (?, ?)', (key, str(watermark)))
+
+    def query(self, resource=None, username=None, allocation_id=None, queue=None, start=None, end=None):
+        """
+        Returns stored jobs matching every given filter, in time order.
+        `start` and `end` bound the job time field inclusively.
+        """
+        clauses = []
+        args = []
+        for column, value in (('resource', resource), ('username', username),
+                              ('allocation_id', allocation_id), ('queue', queue)):
+            if value is not None:
+                clauses.append('{0} = ?'.format(column))
+                args.append(str(value))
+        if start is not None:
+            clauses.append('time >= ?')
+            args.append(str(start))
+        if end is not None:
+            clauses.append('time <= ?')
+            args.append(str(end))
+
+        sql = 'SELECT data FROM jobs'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += ' ORDER BY time IS NULL, time, job_id'
+        with self._lock:
+            rows = self._conn.execute(sql, args).fetchall()
+        loads = codec_util.get_codec().loads
+        return [loads(row[0]) for row in rows]
+
+    def count(self, resource=None):
+        with self._lock:
+            if resource is None:
+                return self._conn.execute('SELECT COUNT(*) FROM jobs').fetchone()[0]
+            return self._conn.execute('SELECT COUNT(*) FROM jobs WHERE resource = ?',
+                                      (resource,)).fetchone()[0]
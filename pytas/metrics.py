@@ -0,0 +1,245 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import asyncio
+import bisect
+import contextvars
+import functools
+import threading
+
+"""
+Per-endpoint request metrics for the TAS and Jobs clients.
+"""
+
+"""
+Latency histogram bucket upper bounds, in seconds.
+"""
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_current_endpoint = contextvars.ContextVar('pytas_endpoint', default=None)
+
+def current_endpoint():
+    return _current_endpoint.get()
+
+
+class _EndpointStats(object):
+    __slots__ = ('requests', 'statuses', 'errors', 'latency_sum', 'latency_buckets', 'size_sum')
+
+    def __init__(self, nbuckets):
+        self.requests = 0
+        self.statuses = {}
+        self.errors = {}
+        self.latency_sum = 0.0
+        self.latency_buckets = [0] * (nbuckets + 1)
+        self.size_sum = 0
+
+
+class Metrics(object):
+
+    """
+    Collects, per client method ("endpoint"): the number of HTTP requests,
+    a latency histogram, total response bytes, counts by HTTP status and
+    counts of errors by exception type (connection failures and errors
+    raised by the method, e.g. for an API `error` status).
+
+    `callback`, if given, is called with a dict describing every request
+    (`endpoint`, `method`, `url`, `status`, `latency`, `size`, `error`) and
+    every failed call (`endpoint`, `error`). An error is counted, and
+    reported to the callback, once: against the request that failed, or
+    else the innermost method that raised it. Use `snapshot()` for the totals
+    or `prometheus()` for Prometheus text exposition.
+
+    Clients only record metrics when given a `Metrics` instance, so there
+    is no cost beyond an attribute check otherwise.
+    """
+    def __init__(self, buckets=DEFAULT_BUCKETS, callback=None):
+        self.buckets = tuple(sorted(buckets))
+        self.callback = callback
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _endpoint(self, endpoint):
+        stats = self._stats.get(endpoint)
+        if stats is None:
+            stats = self._stats[endpoint] = _EndpointStats(len(self.buckets))
+        return stats
+
+    @staticmethod
+    def _mark_observed(error):
+        # an error is counted once, by the innermost request or method
+        # that saw it, however many instrumented calls it then unwinds
+        try:
+            error._pytas_observed = True
+        except AttributeError:
+            pass
+
+    def observe_request(self, endpoint, method, url, status, latency, size, error=None):
+        with self._lock:
+            stats = self._endpoint(endpoint)
+            stats.requests += 1
+            stats.latency_sum += latency
+            stats.latency_buckets[bisect.bisect_left(self.buckets, latency)] += 1
+            stats.size_sum += size
+            if status is not None:
+                stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            if error is not None:
+                name = type(error).__name__
+                stats.errors[name] = stats.errors.get(name, 0) + 1
+        if error is not None:
+            self._mark_observed(error)
+        if self.callback is not None:
+            self.callback({'endpoint': endpoint, 'method': method, 'url': url, 'status': status,
+                           'latency': latency, 'size': size, 'error': error})
+
+    def observe_error(self, endpoint, error):
+        """
+        Counts `error` raised by the method `endpoint`, unless it has been
+        counted already by a request or a nested method.
+        """
+        if getattr(error, '_pytas_observed', False):
+            return
+        self._mark_observed(error)
+        with self._lock:
+            stats = self._endpoint(endpoint)
+            name = type(error).__name__
+            stats.errors[name] = stats.errors.get(name, 0) + 1
+        if self.callback is not None:
+            self.callback({'endpoint': endpoint, 'error': error})
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+
+    def snapshot(self):
+        """
+        Returns `{endpoint: {...}}` with `requests`, `statuses`, `errors`,
+        `latency_sum`, `latency_buckets` (cumulative, keyed by upper bound
+        with `inf` last) and `size_sum`.
+        """
+        with self._lock:
+            result = {}
+            for endpoint, stats in self._stats.items():
+                cumulative = []
+                total = 0
+                for bound, count in zip(self.buckets + (float('inf'),), stats.latency_buckets):
+                    total += count
+                    cumulative.append((bound, total))
+                result[endpoint] = {
+                    'requests': stats.requests,
+                    'statuses': dict(stats.statuses),
+                    'errors': dict(stats.errors),
+                    'latency_sum': stats.latency_sum,
+                    'latency_buckets': cumulative,
+                    'size_sum': stats.size_sum,
+                }
+            return result
+
+    def prometheus(self, prefix='pytas'):
+        """
+        Renders the metrics in the Prometheus text exposition format.
+        """
+        snapshot = self.snapshot()
+        lines = [
+            '# HELP {0}_requests_total HTTP requests by client endpoint and status.'.format(prefix),
+            '# TYPE {0}_requests_total counter'.format(prefix),
+        ]
+        for endpoint, stats in sorted(snapshot.items()):
+            for status, count in sorted(stats['statuses'].items()):
+                lines.append('{0}_requests_total{{endpoint="{1}",status="{2}"}} {3}'.format(
+                    prefix, _escape(endpoint), status, count))
+
+        lines.extend([
+            '# HELP {0}_errors_total Errors by client endpoint and exception type.'.format(prefix),
+            '# TYPE {0}_errors_total counter'.format(prefix),
+        ])
+        for endpoint, stats in sorted(snapshot.items()):
+            for error, count in sorted(stats['errors'].items()):
+                lines.append('{0}_errors_total{{endpoint="{1}",error="{2}"}} {3}'.format(
+                    prefix, _escape(endpoint), _escape(error), count))
+
+        lines.extend([
+            '# HELP {0}_request_duration_seconds HTTP request latency by client endpoint.'.format(prefix),
+            '# TYPE {0}_request_duration_seconds histogram'.format(prefix),
+        ])
+        for endpoint, stats in sorted(snapshot.items()):
+            if not stats['requests']:
+                continue
+            label = _escape(endpoint)
+            for bound, count in stats['latency_buckets']:
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append('{0}_request_duration_seconds_bucket{{endpoint="{1}",le="{2}"}} {3}'.format(
+                    prefix, label, le, count))
+            lines.append('{0}_request_duration_seconds_sum{{endpoint="{1}"}} {2!r}'.format(
+                prefix, label, stats['latency_sum']))
+            lines.append('{0}_request_duration_seconds_count{{endpoint="{1}"}} {2}'.format(
+                prefix, label, stats['requests']))
+
+        lines.extend([
+            '# HELP {0}_response_size_bytes_total Response body bytes by client endpoint.'.format(prefix),
+            '# TYPE {0}_response_size_bytes_total counter'.format(prefix),
+        ])
+        for endpoint, stats in sorted(snapshot.items()):
+            if stats['requests']:
+                lines.append('{0}_response_size_bytes_total{{endpoint="{1}"}} {2}'.format(
+                    prefix, _escape(endpoint), stats['size_sum']))
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def response_size(r):
+    """
+    Size of a response body without forcing a streamed body to be read.
+    """
+    if getattr(r, '_content_consumed', True):
+        content = r.content
+        return len(content) if content else 0
+    try:
+        return int(r.headers.get('Content-Length', 0))
+    except ValueError:
+        return 0
+
+
+def instrument(cls):
+    """
+    Class decorator naming the endpoint for requests made by each public
+    method of a client, and recording errors the method raises, when the
+    client has `metrics`.
+    """
+    for name, func in list(vars(cls).items()):
+        if name.startswith('_') or not callable(func) or isinstance(func, (staticmethod, classmethod)):
+            continue
+        setattr(cls, name, _instrumented(name, func))
+    return cls
+
+
+def _instrumented(name, func):
+    if asyncio.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(self, *args, **kwargs):
+            if self.metrics is None:
+                return await func(self, *args, **kwargs)
+            token = _current_endpoint.set(name)
+            try:
+                return await func(self, *args, **kwargs)
+            except Exception as e:
+                self.metrics.observe_error(name, e)
+                raise
+            finally:
+                _current_endpoint.reset(token)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        if self.metrics is None:
+            return func(self, *args, **kwargs)
+        token = _current_endpoint.set(name)
+        try:
+            return func(self, *args, **kwargs)
+        except Exception as e:
+            self.metrics.observe_error(name, e)
+            raise
+        finally:
+            _current_endpoint.reset(token)
+    return wrapper
@@ -3,7 +3,7 @@
 #
 #
 #####
-from .base import TASModel
+from .base import TASModel, get_client, set_client, use_client, dump_many
 from .projects import Project, Allocation
 from .users import User
 from .misc import Institution, Department
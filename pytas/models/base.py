@@ -3,29 +3,230 @@
 #
 #
 ###
-import json
+import contextlib
+import contextvars
+import keyword
+import threading
+from datetime import datetime, timezone
+from pytas.http import TASClient
+from pytas import codec as codec_util
+
+_default_client = None
+_default_client_lock = threading.Lock()
+_scoped_client = contextvars.ContextVar('pytas_scoped_client', default=None)
+
+def set_client(client):
+    """
+    Sets the `TASClient` the models use by default. Passing None resets it so
+    the next model call creates a new client from the environment.
+    """
+    global _default_client
+    with _default_client_lock:
+        _default_client = client
+
+def get_client(client=None):
+    """
+    Returns the client a model call should use: `client` if given, else the
+    client installed with `use_client()` for the current context, else the
+    process-wide default (created from the environment on first use).
+    """
+    global _default_client
+    if client is not None:
+        return client
+    scoped = _scoped_client.get()
+    if scoped is not None:
+        return scoped
+    if _default_client is None:
+        with _default_client_lock:
+            if _default_client is None:
+                _default_client = TASClient()
+    return _default_client
+
+@contextlib.contextmanager
+def use_client(client):
+    """
+    Makes the models use `client` within a `with` block. Scopes nest and are
+    local to the current thread or asyncio task.
+    """
+    token = _scoped_client.set(client)
+    try:
+        yield client
+    finally:
+        _scoped_client.reset(token)
 
 class TASModel(object):
+    __slots__ = ()
     _resource_uri = None
     _fields = None
 
+    """
+    `_date_fields` are formatted back to the API's timestamp format when
+    serialized, and `_field_formatters` maps other fields to a function
+    applied to their value.
+    """
+    _date_fields = ()
+    _field_formatters = {}
+    _client = None
+
     def __init__(self):
         self.id = None
 
     def is_new(self):
         return self.id is None
 
+    def _get_client(self, client):
+        # a client given to the constructor, or to the `list` that built the
+        # instance, is used by later calls that are not given one
+        return get_client(client if client is not None else self._client)
+
     def get_uri(self):
         if self.id:
             return '%s%s' % (self._resource_uri, self.id)
         else:
             return self._resource_uri
 
+    @classmethod
+    def _get_serializer(cls):
+        serializer = cls.__dict__.get('_serializer')
+        if serializer is None:
+            serializer = _compile_serializer(cls)
+            setattr(cls, '_serializer', serializer)
+        return serializer
+
     def as_dict(self):
-        if self._fields:
-            return {f:getattr(self, f, None) for f in self._fields}
-        return self.__dict__
+        return self._get_serializer()(self)
 
     def as_json(self, indent=None):
-        return json.dumps(self, default=lambda o: o.as_dict() ,
-                                          sort_keys=True, indent=indent)
+        return codec_util.get_codec().dumps(self.as_dict(), default=lambda o: o.as_dict() ,
+                                            sort_keys=True, indent=indent)
+
+
+class SlottedModel(TASModel):
+    """
+    Base for models that are held in large numbers. Attributes named in the
+    class's `__slots__` (or settable properties) are stored without a
+    per-instance dict; any other keys in the API data, and attributes set
+    by callers, go in the instance `__dict__`, which is only allocated when
+    first used.
+    """
+    __slots__ = ('__dict__',)
+    _slot_names = frozenset()
+
+    def __init_subclass__(cls, **kwargs):
+        super(SlottedModel, cls).__init_subclass__(**kwargs)
+        names = set()
+        for klass in cls.__mro__:
+            names.update(klass.__dict__.get('__slots__', ()))
+            names.update(n for n, v in vars(klass).items()
+                         if isinstance(v, property) and v.fset is not None)
+        cls._slot_names = frozenset(n for n in names if not n.startswith('_'))
+
+    def _populate(self, data):
+        for key, value in data.items():
+            if key in self._slot_names:
+                setattr(self, key, value)
+            else:
+                self.__dict__[key] = value
+
+
+def _dict_serializer(obj):
+    return obj.__dict__
+
+def _compile_serializer(cls):
+    """
+    Generates a function that serializes instances of `cls` to a dict of
+    its `_fields`, with the formatters applied. The generated code reads
+    fields that are valid attribute names as plain attributes and others
+    with `getattr(obj, field)`, and only falls back to
+    `getattr(obj, field, None)` when one is missing. Models without
+    `_fields` serialize to their `__dict__`.
+    """
+    if not cls._fields:
+        return _dict_serializer
+
+    formatters = dict((f, format_datetime) for f in cls._date_fields)
+    formatters.update(cls._field_formatters)
+    namespace = {'_getattr': getattr}
+    fast, slow = [], []
+    for i, field in enumerate(cls._fields):
+        # fields that cannot be written as attribute access, such as
+        # keywords, are read with getattr
+        if field.isidentifier() and not keyword.iskeyword(field):
+            fast_value = 'obj.%s' % field
+        else:
+            fast_value = '_getattr(obj, %r)' % field
+        slow_value = '_getattr(obj, %r, None)' % field
+        if field in formatters:
+            namespace['_format%d' % i] = formatters[field]
+            fast_value = '_format%d(%s)' % (i, fast_value)
+            slow_value = '_format%d(%s)' % (i, slow_value)
+        fast.append('%r: %s' % (field, fast_value))
+        slow.append('%r: %s' % (field, slow_value))
+    source = '\n'.join([
+        'def serialize(obj):',
+        '    try:',
+        '        return {%s}' % ', '.join(fast),
+        '    except AttributeError:',
+        '        return {%s}' % ', '.join(slow),
+    ])
+    exec(compile(source, '<%s serializer>' % cls.__name__, 'exec'), namespace)
+    serialize = namespace['serialize']
+    serialize.__qualname__ = '%s.serialize' % cls.__name__
+    return serialize
+
+def dump_many(models):
+    """
+    Serializes a list of models, of any classes, to a list of dicts in one
+    pass, looking up each class's serializer once.
+    """
+    serializers = {}
+    result = []
+    for model in models:
+        cls = type(model)
+        serialize = serializers.get(cls)
+        if serialize is None:
+            serialize = serializers[cls] = cls._get_serializer()
+        result.append(serialize(model))
+    return result
+
+class _APIDatetime(datetime):
+    """
+    A timestamp parsed from the API that keeps the text it came from, so
+    that it is written back with its original precision and offset.
+    Arithmetic and `replace()` return instances without the text.
+    """
+    __slots__ = ('source',)
+
+
+def parse_datetime(value):
+    """
+    Parses an ISO 8601 timestamp from the API into a naive UTC datetime.
+    Values that are already datetimes, empty, or not ISO 8601 timestamps
+    are returned as-is.
+    """
+    if not value or isinstance(value, datetime):
+        return value
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except (AttributeError, TypeError, ValueError):
+        return value
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    result = _APIDatetime(parsed.year, parsed.month, parsed.day, parsed.hour,
+                          parsed.minute, parsed.second, parsed.microsecond)
+    result.source = value
+    return result
+
+def format_datetime(value):
+    """
+    Formats a datetime the way the API sends it: a parsed API timestamp as
+    its original text, a naive datetime as UTC, keeping fractional seconds.
+    """
+    if isinstance(value, datetime):
+        source = getattr(value, 'source', None)
+        if source is not None:
+            return source
+        if value.tzinfo is None:
+            return value.isoformat() + 'Z'
+        return value.isoformat()
+    return value
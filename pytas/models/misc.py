@@ -1,14 +1,15 @@
 from pytas.models import base
-from pytas.http import TASClient
 
 class Institution(base.TASModel):
 
     _resource_uri = 'institutions/'
+    __slots__ = ('__dict__', '_client')
 
-    def __init__(self, id=None, initial={}):
+    def __init__(self, id=None, initial={}, client=None):
         super(Institution, self).__init__()
+        self._client = client
         if id is not None:
-            api = TASClient()
+            api = base.get_client(client)
             initial = api.get_institution(id)
             self.__populate(initial)
         else:
@@ -21,30 +22,33 @@ class Institution(base.TASModel):
         self.__dict__.update(data)
 
     @classmethod
-    def list(cls):
-        api = TASClient();
+    def list(cls, client=None):
+        api = base.get_client(client)
         institutions = []
         data = api.institutions()
         for inst in data:
-            institutions.append(cls(initial=data))
+            institutions.append(cls(initial=inst, client=api))
+        return institutions
 
     @property
     def departments(self):
         depts = []
         if self.id:
-            api = TASClient()
+            api = self._get_client(None)
             data = api.get_departments(self.id)
             for dept in data:
-                depts.append(Department(initial=dept))
+                depts.append(Department(initial=dept, client=api))
         return depts
 
 
 class Department(base.TASModel):
+    __slots__ = ('__dict__', '_client')
 
-    def __init__(self, id=None, initial={}):
+    def __init__(self, id=None, initial={}, client=None):
         super(Department, self).__init__()
+        self._client = client
         if id is not None:
-            api = TASClient()
+            api = base.get_client(client)
             initial = api.get_department(id, id)
             self.__populate(initial)
         else:
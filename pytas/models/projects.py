@@ -3,9 +3,12 @@
 #
 #
 ###
+import logging
 from datetime import datetime
 from pytas.models import base, users
-from pytas.http import TASClient
+from pytas.bulk import bulk_map, DEFAULT_MAX_WORKERS
+
+logger = logging.getLogger(__name__)
 
 PROJECT_TYPES = (
     (0, 'Research'),
@@ -17,7 +20,14 @@ PROJECT_TYPES = (
 
 RENEWAL_START_WINDOW = 90
 
-class Project(base.TASModel):
+DEFAULT_ALLOCATION_RESOURCE = 'Chameleon'
+
+"""
+Related data that `Project.list(prefetch=...)` can gather up front.
+"""
+PREFETCH_RELATED = ('users',)
+
+class Project(base.SlottedModel):
     _resource_uri = 'projects/'
     _fields = [
         'id',
@@ -30,21 +40,32 @@ class Project(base.TASModel):
         'piId',
         'allocations',
     ]
+    __slots__ = tuple(f for f in _fields if f != 'allocations') + (
+        'type', 'field', 'gid', '_pi', '_pi_data',
+        '_allocations', '_allocation_data', '_allocation_index', '_users', '_client')
+    _field_formatters = {'allocations': base.dump_many}
 
-    def __populate(self, data):
-        self.__dict__.update(data)
-
-        self.pi = users.User(initial=data['pi'])
+    """
+    The resource the `*_allocations` properties report on. Set it on the
+    class or a subclass to report on a different resource.
+    """
+    allocation_resource = DEFAULT_ALLOCATION_RESOURCE
 
-        allocations = []
-        for alloc in data['allocations']:
-            allocations.append(Allocation(initial=alloc))
-        self.allocations = allocations
+    def __populate(self, data):
+        # `pi` and `allocations` keep the raw data until first accessed
+        self._populate(data)
 
-    def __init__(self, id=None, initial={}):
+    def __init__(self, id=None, initial={}, client=None):
         super(Project, self).__init__()
+        self._pi = None
+        self._pi_data = None
+        self._allocations = []
+        self._allocation_data = None
+        self._allocation_index = None
+        self._users = None
+        self._client = client
         if id is not None:
-            api = TASClient()
+            api = base.get_client(client)
             remote_data = api.project(id)
             self.__populate(remote_data)
         else:
@@ -53,95 +74,243 @@ class Project(base.TASModel):
     def __str__(self):
         return getattr(self, 'chargeCode', '<new project>')
 
-    def as_dict(self):
-        proj_dict =  {f:getattr(self, f, None) for f in self._fields}
-        proj_dict['allocations'] = [a.as_dict() for a in self.allocations]
-        return proj_dict
-
     @classmethod
-    def list(cls, username=None, group=None):
+    def list(cls, username=None, group=None, client=None, prefetch=None,
+             max_workers=DEFAULT_MAX_WORKERS):
         """
         Returns a list for projects for the given username or group.
         An argument for username or group is required and only one
-        may be provided.
+        may be provided. `client` overrides the client from
+        `base.get_client()`. `prefetch` names related data to gather for
+        all projects up front; see `prefetch_related`.
         """
         if username is None and group is None:
             raise TypeError('Argument username or group is required')
         if username is not None and group is not None:
             raise TypeError('One one of username or group can be passed')
 
-        api = TASClient()
+        api = base.get_client(client)
         if username:
             data = api.projects_for_user(username)
         elif group:
             data = api.projects_for_group(group)
-        return list(cls(initial=d) for d in data)
+        projects = list(cls(initial=d, client=api) for d in data)
+        if prefetch:
+            cls.prefetch_related(projects, prefetch, client=api, max_workers=max_workers)
+        return projects
 
-    def save(self):
-        api = TASClient()
+    @staticmethod
+    def prefetch_related(projects, related, client=None, max_workers=DEFAULT_MAX_WORKERS):
+        """
+        Fetches `related` data (names from `PREFETCH_RELATED`) for every
+        project concurrently, on up to `max_workers` threads, and attaches
+        it so later calls such as `get_users()` need no request. A project
+        whose fetch fails is left as it was and fetches on demand.
+        """
+        unknown = set(related) - set(PREFETCH_RELATED)
+        if unknown:
+            raise ValueError('Cannot prefetch {0}'.format(', '.join(sorted(unknown))))
+        api = base.get_client(client)
+        if 'users' in related:
+            results = bulk_map(lambda p: api.get_project_users(p.id), projects, max_workers)
+            for result in results:
+                if result.ok:
+                    result.item._users = [users.User(initial=u) for u in result.result]
+                else:
+                    logger.warning('Unable to prefetch users for project %s: %s', result.item.id, result.error)
+        return projects
+
+    def save(self, client=None):
+        api = self._get_client(client)
         if self.is_new():
             created = api.create_project(self.as_dict())
             self.__populate(initial=created)
 
-    def get_users(self):
-        api = TASClient()
+    def get_users(self, client=None, refresh=False):
+        """
+        Returns the project's members as `users.User` objects, reusing
+        prefetched members unless `refresh` is set.
+        """
+        if self._users is not None and not refresh:
+            return list(self._users)
+        api = self._get_client(client)
         user_data = api.get_project_users(self.id)
         return list(users.User(initial=u) for u in user_data)
 
-    def add_user(self, username):
-        api = TASClient()
+    def sync_users(self, desired_usernames, remove=False, max_workers=DEFAULT_MAX_WORKERS, client=None):
+        """
+        Makes the project's members match `desired_usernames`: users not yet
+        on the project are added and, with `remove=True`, members not in the
+        list are removed, except the PI, who is never removed. Adds and
+        removes run concurrently on up to `max_workers` threads. Returns a
+        list of `pytas.bulk.BulkResult` whose `item` is `('add', username)`
+        or `('remove', username)`; users already in sync are not included.
+        """
+        api = self._get_client(client)
+        members = api.get_project_users(self.id)
+        current = set(u['username'] for u in members)
+        desired = list(dict.fromkeys(desired_usernames))
+        changes = [('add', u) for u in desired if u not in current]
+        if remove:
+            pi_id = getattr(self, 'piId', None)
+            pi_username = getattr(self.pi, 'username', None)
+            keep = set(desired)
+            keep.update(u['username'] for u in members
+                        if u['username'] == pi_username or (pi_id is not None and u.get('id') == pi_id))
+            changes.extend(('remove', u) for u in sorted(current) if u not in keep)
+
+        def apply(change):
+            action, username = change
+            if action == 'add':
+                return api.add_project_user(self.id, username)
+            return api.del_project_user(self.id, username)
+
+        results = bulk_map(apply, changes, max_workers)
+        self._users = None
+        return results
+
+    def add_user(self, username, client=None):
+        api = self._get_client(client)
+        self._users = None
         return api.add_project_user(self.id, username)
 
-    def remove_user(self, username):
-        api = TASClient()
+    def remove_user(self, username, client=None):
+        api = self._get_client(client)
+        self._users = None
         return api.del_project_user(self.id, username)
 
+    @property
+    def pi(self):
+        """
+        The PI as a `users.User`, built from the raw data on first access.
+        """
+        if self._pi_data is not None:
+            self._pi = users.User(initial=self._pi_data)
+            self._pi_data = None
+        return self._pi
+
+    @pi.setter
+    def pi(self, pi):
+        if isinstance(pi, dict):
+            self._pi, self._pi_data = None, pi
+        else:
+            self._pi, self._pi_data = pi, None
+
+    @property
+    def allocations(self):
+        """
+        The project's `Allocation` list. Raw allocation dicts from the API
+        (or assigned by callers) are only turned into `Allocation` objects
+        the first time the list is accessed. Change it by assigning, or with
+        `add_allocation` and `remove_allocation`, so that the status index
+        is rebuilt.
+        """
+        if self._allocation_data is not None:
+            self._allocations = [a if isinstance(a, Allocation) else Allocation(initial=a)
+                                 for a in self._allocation_data]
+            self._allocation_data = None
+        return self._allocations
+
+    @allocations.setter
+    def allocations(self, allocations):
+        self._allocations = []
+        self._allocation_data = allocations
+        self._allocation_index = None
+
+    def add_allocation(self, allocation):
+        """
+        Appends an `Allocation` (or raw allocation dict) to `allocations`.
+        """
+        if not isinstance(allocation, Allocation):
+            allocation = Allocation(initial=allocation)
+        self.allocations.append(allocation)
+        self._allocation_index = None
+        return allocation
+
+    def remove_allocation(self, allocation):
+        """
+        Removes `allocation` from `allocations`; raises ValueError if it is
+        not there.
+        """
+        self.allocations.remove(allocation)
+        self._allocation_index = None
+
+    def invalidate_allocations(self):
+        """
+        Drops the status index; call after changing `allocations` in place.
+        """
+        self._allocation_index = None
+
+    def _allocation_bucket(self, status, resource):
+        if self._allocation_index is None:
+            index = {}
+            for a in self.allocations:
+                key = (getattr(a, 'status', None), getattr(a, 'resource', None))
+                index.setdefault(key, []).append(a)
+            self._allocation_index = index
+        if resource is None:
+            resource = self.allocation_resource
+        return self._allocation_index.get((status, resource), ())
+
+    def allocations_for(self, status, resource=None):
+        """
+        Returns the allocations with `status` on `resource` (by default
+        `allocation_resource`). Allocations are bucketed by status and
+        resource in one pass on first use, and the buckets reused until
+        `allocations` is reassigned.
+        """
+        return list(self._allocation_bucket(status, resource))
+
+    def has_allocations_for(self, status, resource=None):
+        return len(self._allocation_bucket(status, resource)) > 0
+
     @property
     def active_allocations(self):
-        return [a for a in self.allocations if a.status == 'Active' and a.resource == 'Chameleon']
+        return self.allocations_for('Active')
 
     @property
     def has_active_allocations(self):
-        return len(self.active_allocations) > 0
+        return self.has_allocations_for('Active')
 
     @property
     def inactive_allocations(self):
-        return [a for a in self.allocations if a.status == 'Inactive' and a.resource == 'Chameleon']
+        return self.allocations_for('Inactive')
 
     @property
     def has_inactive_allocations(self):
-        return len(self.inactive_allocations) > 0
+        return self.has_allocations_for('Inactive')
 
     @property
     def approved_allocations(self):
-        return [a for a in self.allocations if a.status == 'Approved' and a.resource == 'Chameleon']
+        return self.allocations_for('Approved')
 
     @property
     def has_approved_allocations(self):
-        return len(self.approved_allocations) > 0
+        return self.has_allocations_for('Approved')
 
     @property
     def pending_allocations(self):
-        return [a for a in self.allocations if a.status == 'Pending' and a.resource == 'Chameleon']
+        return self.allocations_for('Pending')
 
     @property
     def waiting_allocations(self):
-        return [a for a in self.allocations if a.status == 'Waiting' and a.resource == 'Chameleon']
+        return self.allocations_for('Waiting')
 
     @property
     def has_pending_allocations(self):
-        return len(self.pending_allocations) + len(self.waiting_allocations) > 0
+        return self.has_allocations_for('Pending') or self.has_allocations_for('Waiting')
 
     @property
     def rejected_allocations(self):
-        return [a for a in self.allocations if a.status == 'Rejected' and a.resource == 'Chameleon']
+        return self.allocations_for('Rejected')
 
     @property
     def has_rejected_allocations(self):
-        return len(self.rejected_allocations) > 0
+        return self.has_allocations_for('Rejected')
 
-class Allocation(base.TASModel):
+class Allocation(base.SlottedModel):
     _resource_uri = 'allocations/'
+    _date_fields = ('dateRequested', 'dateReviewed', 'end', 'start')
     _fields = [
         'computeUsed',
         'computeAllocated',
@@ -169,13 +338,18 @@ class Allocation(base.TASModel):
         'storageAllocated',
         'storageRequested',
     ]
+    __slots__ = tuple(_fields)
 
     def __init__(self, initial={}):
         super(Allocation, self).__init__()
         self.__populate(initial)
 
     def __populate(self, data):
-        self.__dict__.update(data)
+        self._populate(data)
+        for f in self._date_fields:
+            value = getattr(self, f, None)
+            if value is not None:
+                setattr(self, f, base.parse_datetime(value))
 
     @property
     def percentComputeUsed(self):
@@ -187,12 +361,15 @@ class Allocation(base.TASModel):
 
     @property
     def days_left(self):
-        return (self.end - datetime.utcnow()).days
+        end = getattr(self, 'end', None)
+        if not isinstance(end, datetime):
+            return None
+        return (end - datetime.utcnow()).days
 
     @property
     def up_for_renewal(self):
         days_left = self.days_left
-        return days_left >= 0 and days_left <= RENEWAL_START_WINDOW
+        return days_left is not None and days_left >= 0 and days_left <= RENEWAL_START_WINDOW
 
     @property
     def renewal_days(self):
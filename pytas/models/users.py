@@ -4,15 +4,16 @@
 #
 ###
 from pytas.models import base
-from pytas.http import TASClient
 
 class User(base.TASModel):
     _resource_uri = 'users/'
+    __slots__ = ('__dict__', '_client')
 
-    def __init__(self, username=None, id=None, initial={}):
+    def __init__(self, username=None, id=None, initial={}, client=None):
         super(User, self).__init__()
+        self._client = client
         if username is not None or id is not None:
-            api = TASClient()
+            api = base.get_client(client)
             remote_data = api.get_user(id=id, username=username)
             self.__populate(remote_data)
         else:
@@ -25,40 +26,46 @@ class User(base.TASModel):
         self.__dict__.update(data)
 
     @classmethod
-    def authenticate(cls, username, password):
-        api = TASClient()
+    def authenticate(cls, username, password, client=None):
+        api = base.get_client(client)
         if api.authenticate(username, password):
-            return cls(initial=api.get_user(username=username))
+            return cls(initial=api.get_user(username=username), client=api)
 
     @property
     def projects(self):
+        return self.get_projects()
+
+    def get_projects(self, client=None, prefetch=None):
+        """
+        Returns the user's projects; `prefetch` gathers related data for
+        all of them up front, as for `Project.list`.
+        """
         _projects = []
         if self.username:
-            api = TASClient()
-            project_data = api.projects_for_user(username=self.username)
-            for d in project_data:
-                _projects.append(Project(initial=d))
+            from pytas.models.projects import Project
+            _projects = Project.list(username=self.username, client=self._get_client(client),
+                                     prefetch=prefetch)
         return _projects
 
     def save(self):
         pass
 
-    def request_password_reset(self, source=None):
+    def request_password_reset(self, source=None, client=None):
         if self.username:
-            api = TASClient()
+            api = self._get_client(client)
             return api.request_password_reset(self.username, source)
         else:
             raise Exception('Cannot reset password: username is not set')
 
-    def confirm_password_reset(self, code, new_password, source=None):
+    def confirm_password_reset(self, code, new_password, source=None, client=None):
         if self.username:
-            api = TASClient()
+            api = self._get_client(client)
             return api.confirm_password_reset(self.username, code, new_password, source)
         else:
             raise Exception('Cannot reset password: username is not set')
 
-    def verify_user(self, code):
-        api = TASClient()
-        if api.verify_user(code):
+    def verify_user(self, code, client=None):
+        api = self._get_client(client)
+        if api.verify_user(self.id, code):
             return True
         return False
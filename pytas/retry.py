@@ -0,0 +1,252 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import asyncio
+import email.utils
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timezone
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+"""
+Retry policies and a circuit breaker for calls to TAS and the Jobs API.
+"""
+
+class CircuitOpenError(Exception):
+
+    """
+    Raised instead of sending a request while the circuit breaker is open.
+    """
+    pass
+
+
+class RetryPolicy(object):
+
+    """
+    Retries idempotent requests that fail with a connection error or a
+    retryable status (`statuses`), up to `max_retries` times.
+
+    The delay before retry `n` (counting from 0) is
+    `backoff_factor * 2 ** n` capped at `max_backoff`, drawn uniformly from
+    `[0, delay]` when `jitter` is on so that many workers do not retry in
+    lockstep. A `Retry-After` header on the response is honored instead;
+    if it asks for longer than `max_backoff` the request is not retried.
+
+    Only methods in `methods` are retried; by default only reads, since a
+    write that timed out may already have been applied and TAS write
+    endpoints do not answer a repeated write the same way. When retries
+    for a retryable status run out the response is raised as
+    `requests.HTTPError`.
+    """
+    def __init__(self, max_retries=3, backoff_factor=0.5, max_backoff=30, jitter=True,
+                 statuses=(429, 500, 502, 503, 504),
+                 methods=('GET', 'HEAD', 'OPTIONS'),
+                 sleep=time.sleep):
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.statuses = frozenset(statuses)
+        self.methods = frozenset(m.upper() for m in methods)
+        self.sleep = sleep
+
+    def retries(self, method):
+        return method.upper() in self.methods
+
+    def backoff(self, attempt, response=None):
+        """
+        Returns the delay in seconds before retry `attempt`, or None if the
+        server asked for a longer wait than `max_backoff`.
+        """
+        if response is not None:
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            if retry_after is not None:
+                return retry_after if retry_after <= self.max_backoff else None
+        delay = min(self.max_backoff, self.backoff_factor * (2 ** attempt))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        return delay
+
+
+def parse_retry_after(value):
+    """
+    Parses a `Retry-After` header given as seconds or as an HTTP date.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class CircuitBreaker(object):
+
+    """
+    Fails fast while a service is down.
+
+    After `failure_threshold` consecutive failures (connection errors or
+    5xx responses) the circuit opens and requests raise `CircuitOpenError`
+    without being sent. Once `reset_timeout` seconds have passed a single
+    trial request is let through: success closes the circuit, failure
+    opens it again. Share one breaker between clients that talk to the
+    same service.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30, timer=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.timer = timer
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return self.CLOSED
+        if self.timer() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def before_request(self):
+        with self._lock:
+            state = self.state
+            if state == self.CLOSED:
+                return
+            if state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+        raise CircuitOpenError('Circuit open: service failed {0} times in a row'.format(self.failures))
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.failure_threshold:
+                self.opened_at = self.timer()
+            self._probing = False
+
+    def release(self):
+        """
+        Ends a trial request that failed for a reason other than the
+        service, so that the next request can be the trial instead.
+        """
+        with self._lock:
+            self._probing = False
+
+    def record(self, response):
+        if response.status_code >= 500:
+            self.record_failure()
+        else:
+            self.record_success()
+
+
+RETRYABLE_ERRORS = (requests.ConnectionError, requests.Timeout)
+
+def send(request, method, policy=None, breaker=None, errors=RETRYABLE_ERRORS):
+    """
+    Calls `request()` to send one HTTP request, applying `breaker` and
+    retrying according to `policy`.
+    """
+    attempt = 0
+    while True:
+        if breaker is not None:
+            breaker.before_request()
+        try:
+            r = request()
+        except errors as e:
+            if breaker is not None:
+                breaker.record_failure()
+            delay = _next_delay(policy, method, attempt)
+            if delay is None:
+                raise
+            logger.debug('Retrying %s after attempt %d: %s', method, attempt + 1, e)
+            policy.sleep(delay)
+            attempt += 1
+            continue
+        except BaseException:
+            if breaker is not None:
+                breaker.release()
+            raise
+
+        if breaker is not None:
+            breaker.record(r)
+        if policy is None or r.status_code not in policy.statuses:
+            return r
+        delay = _next_delay(policy, method, attempt, r)
+        if delay is None:
+            if policy.retries(method):
+                r.raise_for_status()
+            return r
+        logger.debug('Retrying %s after attempt %d: HTTP %s', method, attempt + 1, r.status_code)
+        # release the connection of a response that is thrown away
+        r.close()
+        policy.sleep(delay)
+        attempt += 1
+
+
+async def async_send(request, method, policy=None, breaker=None, errors=RETRYABLE_ERRORS):
+    """
+    Coroutine version of `send`: awaits `request()` and sleeps with
+    `asyncio.sleep` between attempts.
+    """
+    attempt = 0
+    while True:
+        if breaker is not None:
+            breaker.before_request()
+        try:
+            r = await request()
+        except errors as e:
+            if breaker is not None:
+                breaker.record_failure()
+            delay = _next_delay(policy, method, attempt)
+            if delay is None:
+                raise
+            logger.debug('Retrying %s after attempt %d: %s', method, attempt + 1, e)
+            await asyncio.sleep(delay)
+            attempt += 1
+            continue
+        except BaseException:
+            if breaker is not None:
+                breaker.release()
+            raise
+
+        if breaker is not None:
+            breaker.record(r)
+        if policy is None or r.status_code not in policy.statuses:
+            return r
+        delay = _next_delay(policy, method, attempt, r)
+        if delay is None:
+            if policy.retries(method):
+                r.raise_for_status()
+            return r
+        logger.debug('Retrying %s after attempt %d: HTTP %s', method, attempt + 1, r.status_code)
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
+def _next_delay(policy, method, attempt, response=None):
+    if policy is None or not policy.retries(method) or attempt >= policy.max_retries:
+        return None
+    return policy.backoff(attempt, response)
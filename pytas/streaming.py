@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import codecs
+import json
+
+"""
+Incremental JSON parsing for large API responses.
+"""
+
+_WHITESPACE = ' \t\r\n'
+
+class _ChunkReader(object):
+
+    """
+    A text buffer over an iterator of byte chunks that only holds the part
+    of the document that has not been consumed yet.
+    """
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self.json_decoder = json.JSONDecoder()
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        if self.eof:
+            return False
+        try:
+            chunk = next(self.chunks)
+            text = self.text_decoder.decode(chunk)
+        except StopIteration:
+            text = self.text_decoder.decode(b'', final=True)
+            self.eof = True
+        self.buf = self.buf[self.pos:] + text
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return None
+
+    def next_char(self):
+        c = self.peek()
+        if c is None:
+            raise ValueError('Unexpected end of JSON document')
+        self.pos += 1
+        return c
+
+    def expect(self, expected):
+        c = self.next_char()
+        if c != expected:
+            raise ValueError('Expected %r at position %d, got %r' % (expected, self.pos - 1, c))
+
+    def value(self):
+        """
+        Decodes the next complete JSON value, reading more chunks as needed.
+        A value ending exactly at the end of the buffer is only accepted
+        once more input (or the end of input) confirms it is complete, so a
+        number split across chunks is never decoded short.
+        """
+        while True:
+            if self.peek() is None:
+                raise ValueError('Unexpected end of JSON document')
+            try:
+                obj, end = self.json_decoder.raw_decode(self.buf, self.pos)
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return obj
+            except ValueError:
+                if self.eof:
+                    raise
+            self.fill()
+
+
+def iter_json_array(chunks, key):
+    """
+    Yields the elements of the array stored under `key` in a JSON object
+    whose bytes arrive as `chunks`, decoding each element as soon as it is
+    complete. Memory use is bounded by the largest single element rather
+    than by the whole document. Other members of the object are parsed and
+    discarded; parsing stops once the array has been read.
+    """
+    reader = _ChunkReader(chunks)
+    reader.expect('{')
+    if reader.peek() == '}':
+        raise ValueError('No %r member in JSON document' % key)
+
+    while True:
+        name = reader.value()
+        reader.expect(':')
+        if name == key:
+            if reader.peek() == 'n':
+                reader.value()
+                return
+            reader.expect('[')
+            if reader.peek() == ']':
+                return
+            while True:
+                yield reader.value()
+                c = reader.next_char()
+                if c == ']':
+                    return
+                if c != ',':
+                    raise ValueError('Expected \',\' or \']\' in array, got %r' % c)
+
+        reader.value()
+        c = reader.next_char()
+        if c == '}':
+            raise ValueError('No %r member in JSON document' % key)
+        if c != ',':
+            raise ValueError('Expected \',\' or \'}\' in object, got %r' % c)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from pytas import jobs as jobs_util
+
+"""
+Vectorized usage aggregation over job records. Requires NumPy
+(``pip install pytas[reports]``).
+"""
+
+"""
+Histogram bucket sizes accepted by `UsageFrame.histogram`, as NumPy
+datetime64 units.
+"""
+BUCKETS = ('h', 'D', 'W', 'M', 'Y')
+
+class UsageFrame(object):
+
+    """
+    Job records held as columnar NumPy arrays: user, allocation and queue
+    as string arrays, charge (SUs) as float64 and job time as
+    datetime64[s]. Jobs can be added in batches, e.g. one per `get_jobs`
+    call or `iter_jobs` chunk; each batch is converted once and the
+    aggregations run over all of them without per-job Python loops.
+
+    Field names default to the `pytas.jobs` constants. Jobs with a missing
+    charge count as 0 SUs; missing keys group under None.
+    """
+    COLUMNS = ('username', 'allocation', 'queue')
+
+    def __init__(self, jobs=None, charge_field=jobs_util.JOB_CHARGE_FIELD,
+                 time_field=jobs_util.JOB_TIME_FIELD,
+                 username_field=jobs_util.JOB_USERNAME_FIELD,
+                 allocation_field=jobs_util.JOB_ALLOCATION_FIELD,
+                 queue_field=jobs_util.JOB_QUEUE_FIELD):
+        if np is None:
+            raise ImportError('UsageFrame requires numpy; install it with `pip install pytas[reports]`')
+        self.charge_field = charge_field
+        self.time_field = time_field
+        self.fields = {
+            'username': username_field,
+            'allocation': allocation_field,
+            'queue': queue_field,
+        }
+        self._batches = []
+        self._columns = None
+        if jobs is not None:
+            self.add(jobs)
+
+    def add(self, jobs):
+        """
+        Converts a batch of job dicts to arrays and appends it.
+        """
+        jobs = list(jobs)
+        if not jobs:
+            return
+        batch = {}
+        for column, field in self.fields.items():
+            batch[column] = np.array([_key(job.get(field)) for job in jobs], dtype=str)
+        batch['charge'] = np.array([job.get(self.charge_field) or 0 for job in jobs], dtype='float64')
+        batch['time'] = np.array([_time(job.get(self.time_field)) for job in jobs], dtype='datetime64[s]')
+        self._batches.append(batch)
+        self._columns = None
+
+    def __len__(self):
+        return sum(len(batch['charge']) for batch in self._batches)
+
+    def columns(self):
+        if self._columns is None:
+            if self._batches:
+                self._columns = {name: np.concatenate([b[name] for b in self._batches])
+                                 for name in self._batches[0]}
+            else:
+                self._columns = {name: np.array([], dtype=str) for name in self.COLUMNS}
+                self._columns['charge'] = np.array([], dtype='float64')
+                self._columns['time'] = np.array([], dtype='datetime64[s]')
+        return self._columns
+
+    def _group(self, by):
+        if by not in self.COLUMNS:
+            raise ValueError('Cannot group by {0!r}; expected one of {1}'.format(by, self.COLUMNS))
+        return np.unique(self.columns()[by], return_inverse=True)
+
+    def total(self):
+        return float(self.columns()['charge'].sum())
+
+    def sum_by(self, by):
+        """
+        Returns `{key: total SUs}` grouped by `username`, `allocation` or
+        `queue`.
+        """
+        keys, codes = self._group(by)
+        sums = np.bincount(codes, weights=self.columns()['charge'], minlength=len(keys))
+        return {_unkey(k): float(v) for k, v in zip(keys, sums)}
+
+    def count_by(self, by):
+        """
+        Returns `{key: number of jobs}` grouped by `username`, `allocation`
+        or `queue`.
+        """
+        keys, codes = self._group(by)
+        counts = np.bincount(codes, minlength=len(keys))
+        return {_unkey(k): int(v) for k, v in zip(keys, counts)}
+
+    def histogram(self, bucket='D', by=None, counts=False):
+        """
+        Returns total SUs (or job counts with `counts=True`) per time bucket
+        as `{bucket: value}`, with buckets as ISO strings in time order.
+        `bucket` is one of `BUCKETS` (NumPy weeks start on Thursday). With `by`, returns
+        `{key: {bucket: value}}` for every key. Jobs without a time are left
+        out.
+        """
+        if bucket not in BUCKETS:
+            raise ValueError('Unknown bucket {0!r}; expected one of {1}'.format(bucket, BUCKETS))
+        columns = self.columns()
+        valid = ~np.isnat(columns['time'])
+        times = columns['time'][valid].astype('datetime64[{0}]'.format(bucket))
+        weights = None if counts else columns['charge'][valid]
+        labels, bucket_codes = np.unique(times, return_inverse=True)
+        labels = [str(label) for label in labels]
+        convert = int if counts else float
+
+        if by is None:
+            values = np.bincount(bucket_codes, weights=weights, minlength=len(labels))
+            return dict(zip(labels, map(convert, values)))
+
+        keys, key_codes = self._group(by)
+        key_codes = key_codes[valid]
+        values = np.bincount(key_codes * len(labels) + bucket_codes, weights=weights,
+                             minlength=len(keys) * len(labels)).reshape(len(keys), len(labels))
+        return {_unkey(k): dict(zip(labels, map(convert, row))) for k, row in zip(keys, values)}
+
+
+def _key(value):
+    return '' if value is None else str(value)
+
+def _unkey(value):
+    value = str(value)
+    return None if value == '' else value
+
+def _time(value):
+    if value is None:
+        return None
+    if isinstance(value, str) and value.endswith('Z'):
+        return value[:-1]
+    return value
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+from pytas.bulk import BulkResult, DEFAULT_MAX_WORKERS
+from pytas.models import base
+
+"""
+A queue for allocation writes that returns immediately and sends them in
+the background.
+"""
+
+class AllocationWriteQueue(object):
+
+    """
+    Queues `allocation_approval` and `edit_allocation` calls and sends them
+    in the background with at most `max_workers` in flight. `approve` and
+    `edit` return a `concurrent.futures.Future` for the call's result right
+    away; writes for the same allocation are sent in the order they were
+    queued. The client is resolved when each write is queued, so a
+    `use_client()` scope active at that point applies.
+
+    `flush()` waits for every write queued since the last flush and returns
+    a `pytas.bulk.BulkResult` for each, in queue order, whose `item` is
+    `('approve' | 'edit', allocation_id)`; a failed write carries its
+    exception in `error` instead of aborting the rest. Used as a context
+    manager, the queue flushes and shuts down on exit.
+    """
+    def __init__(self, client=None, max_workers=DEFAULT_MAX_WORKERS):
+        self.client = client
+        self.closed = False
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._lock = threading.Lock()
+        self._pending = []
+        self._last = {}
+
+    @staticmethod
+    def _call(future, func, args):
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(func(*args))
+        except Exception as e:
+            future.set_exception(e)
+
+    def _start(self, future, func, args):
+        self._executor.submit(self._call, future, func, args)
+
+    def _submit(self, action, allocation_id, func, *args):
+        # ids may be given as ints or strings; order them as one allocation
+        key = str(allocation_id)
+        future = Future()
+        with self._lock:
+            if self.closed:
+                raise Exception('Allocation write queue is closed')
+            previous = self._last.get(key)
+            self._last[key] = future
+            self._pending.append(((action, allocation_id), future))
+        if previous is None:
+            self._start(future, func, args)
+        else:
+            # start once the previous write for this allocation is done,
+            # without holding a worker thread while it runs
+            previous.add_done_callback(lambda _: self._start(future, func, args))
+        return future
+
+    def approve(self, id, allocation):
+        """
+        Queues `allocation_approval(id, allocation)`.
+        """
+        client = base.get_client(self.client)
+        return self._submit('approve', id, client.allocation_approval, id, dict(allocation))
+
+    def edit(self, allocation):
+        """
+        Queues `edit_allocation(allocation)`.
+        """
+        client = base.get_client(self.client)
+        return self._submit('edit', allocation['id'], client.edit_allocation, dict(allocation))
+
+    def pending(self):
+        """
+        Returns the number of queued writes that have not completed yet.
+        """
+        with self._lock:
+            return sum(1 for _, future in self._pending if not future.done())
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, []
+
+        results = []
+        for item, future in pending:
+            try:
+                results.append(BulkResult(item, result=future.result()))
+            except Exception as e:
+                results.append(BulkResult(item, error=e))
+
+        with self._lock:
+            for key in [k for k, f in self._last.items() if f.done()]:
+                del self._last[key]
+        return results
+
+    def close(self):
+        with self._lock:
+            self.closed = True
+            last = list(self._last.values())
+        # queued writes are started from their predecessors' callbacks,
+        # so the executor must outlive every chain
+        wait(last)
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        try:
+            self.flush()
+        finally:
+            self.close()
@@ -38,11 +38,17 @@ setup(
     author='Matthew Hanlon',
     author_email='mrhanlon@tacc.utexas.edu',
     url='https://github.com/mrhanlon/pytas',
-    packages=find_packages(),
+    packages=find_packages(exclude=['benchmarks', 'tests*']),
     package_dir={'pytas':
                  'pytas'},
     include_package_data=True,
+    python_requires='>=3.7',
     install_requires=requires,
+    extras_require={
+        'async': ['aiohttp'],
+        'reports': ['numpy'],
+        'fast': ['orjson'],
+    },
     license="MIT",
     zip_safe=False,
     keywords='pytas',
@@ -51,11 +57,14 @@ setup(
         'Intended Audience :: Developers',
         'License :: OSI Approved :: BSD License',
         'Natural Language :: English',
-        "Programming Language :: Python :: 2",
-        'Programming Language :: Python :: 2.6',
-        'Programming Language :: Python :: 2.7',
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.3',
+        'Programming Language :: Python :: 3 :: Only',
+        'Programming Language :: Python :: 3.7',
+        'Programming Language :: Python :: 3.8',
+        'Programming Language :: Python :: 3.9',
+        'Programming Language :: Python :: 3.10',
+        'Programming Language :: Python :: 3.11',
+        'Programming Language :: Python :: 3.12',
     ],
     cmdclass={'test': PyTest},
     tests_require=['pytest'],
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_aio
+----------------------------------
+
+Tests for `pytas.aio` module.
+"""
+
+import asyncio
+import pytest
+import requests
+
+aiohttp = pytest.importorskip('aiohttp')
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from pytas.aio import AsyncTASClient, AsyncJobsClient
+
+
+def run_with_server(routes, test):
+    async def main():
+        app = web.Application()
+        app.add_routes(routes)
+        server = TestServer(app)
+        await server.start_server()
+        try:
+            return await test(str(server.make_url('')).rstrip('/'))
+        finally:
+            await server.close()
+    return asyncio.run(main())
+
+
+async def ok(result):
+    return web.json_response({'status': 'success', 'result': result, 'message': ''})
+
+
+class TestAsyncTAS:
+
+    def test_get_user_by_username(self):
+        async def handler(request):
+            return await ok({'username': request.match_info['username']})
+
+        async def test(url):
+            async with AsyncTASClient(baseURL=url) as tas:
+                return await asyncio.gather(*[tas.get_user(username='user%d' % i) for i in range(20)])
+
+        users = run_with_server([web.get('/v1/users/username/{username}', handler)], test)
+        assert [u['username'] for u in users] == ['user%d' % i for i in range(20)]
+
+    def test_api_error(self):
+        async def handler(request):
+            return web.json_response({'status': 'error', 'result': None, 'message': 'nope'})
+
+        async def test(url):
+            async with AsyncTASClient(baseURL=url) as tas:
+                with pytest.raises(Exception) as e:
+                    await tas.projects_for_group('foo')
+                assert 'nope' in str(e.value)
+
+        run_with_server([web.get('/v1/projects/group/{group}', handler)], test)
+
+    def test_http_error(self):
+        async def handler(request):
+            return web.Response(status=404)
+
+        async def test(url):
+            async with AsyncTASClient(baseURL=url) as tas:
+                with pytest.raises(requests.HTTPError):
+                    await tas.project(123)
+
+        run_with_server([web.get('/v1/projects/{id}', handler)], test)
+
+    def test_get_departments(self):
+        async def handler(request):
+            return await ok([{'id': 125, 'name': 'ACES IT Group', 'extra': True}])
+
+        async def test(url):
+            async with AsyncTASClient(baseURL=url) as tas:
+                return await tas.get_departments(1)
+
+        depts = run_with_server([web.get('/v1/institutions/{id}/departments', handler)], test)
+        assert depts == [{'id': 125, 'name': 'ACES IT Group'}]
+
+
+    def test_requires_aiohttp(self):
+        import mock
+        with mock.patch('pytas.aio.aiohttp', None):
+            with pytest.raises(ImportError):
+                AsyncTASClient(pool=object())
+            with pytest.raises(ImportError):
+                AsyncJobsClient()
+
+    def test_bulk_needs_a_worker(self):
+        async def test():
+            async with AsyncTASClient(baseURL='http://localhost') as tas:
+                await tas.get_users(ids=[1], max_workers=0)
+        with pytest.raises(ValueError):
+            asyncio.run(test())
+
+
+class TestAsyncJobs:
+
+    def test_get_jobs(self):
+        async def handler(request):
+            assert request.query['resource'] == 'chameleon'
+            assert request.query['queueName'] == 'batch'
+            return web.json_response({'jobs': [{'jobId': 1}, {'jobId': 2}]})
+
+        async def test(url):
+            async with AsyncJobsClient(baseURL=url) as jobs:
+                return await jobs.get_jobs('chameleon', '2016-01-01', '2016-02-01', queue='batch')
+
+        assert len(run_with_server([web.get('/v1/Jobs', handler)], test)) == 2
@@ -0,0 +1,24 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_benchmarks
+----------------------------------
+
+Smoke test for the `benchmarks` suite: every client method must run
+against the stub server.
+"""
+
+import io
+
+from benchmarks import bench_client
+
+class TestBenchmarks:
+
+    def test_every_method_runs(self):
+        out = io.StringIO()
+        results = bench_client.run(iterations=2, concurrency=2, out=out)
+        names = [name for name, _ in bench_client.TAS_CALLS + bench_client.JOBS_CALLS]
+        assert sorted(results) == sorted((n, m) for n in names for m in bench_client.MODES)
+        assert all(r['ops'] > 0 for r in results.values())
+        assert 'get_jobs_sharded' in out.getvalue()
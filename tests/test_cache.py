@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_cache
+----------------------------------
+
+Tests for `pytas.cache` module.
+"""
+
+import pytest
+import responses
+
+from pytas.http import TASClient
+from pytas.cache import ResponseCache, UserCache
+
+INSTITUTIONS_URL = 'https://example.com/api/v1/institutions/'
+
+class Clock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+@pytest.fixture
+def tas(clock):
+    return TASClient(cache=ResponseCache(maxsize=2, ttls={'institutions': 60}, timer=clock))
+
+def institutions_response(**kwargs):
+    return dict(json={"status": "success", "result": [{"id": 1, "name": "UT Austin"}], "message": ""},
+                status=200, **kwargs)
+
+class TestResponseCache:
+
+    @responses.activate
+    def test_fresh_hit(self, tas):
+        responses.add(responses.GET, INSTITUTIONS_URL, **institutions_response())
+
+        first = tas.institutions()
+        first.append('mutated')
+        assert tas.institutions() == [{"id": 1, "name": "UT Austin"}]
+        assert len(responses.calls) == 1
+
+    @responses.activate
+    def test_expired_revalidates_with_etag(self, tas, clock):
+        responses.add(responses.GET, INSTITUTIONS_URL, **institutions_response(headers={'ETag': '"v1"'}))
+        responses.add(responses.GET, INSTITUTIONS_URL, status=304)
+
+        tas.institutions()
+        clock.now += 61
+        assert tas.institutions() == [{"id": 1, "name": "UT Austin"}]
+        assert len(responses.calls) == 2
+        assert responses.calls[1].request.headers['If-None-Match'] == '"v1"'
+
+        # the 304 made the entry fresh again
+        tas.institutions()
+        assert len(responses.calls) == 2
+
+    @responses.activate
+    def test_expired_without_validators_refetches(self, tas, clock):
+        responses.add(responses.GET, INSTITUTIONS_URL, **institutions_response())
+
+        tas.institutions()
+        clock.now += 61
+        tas.institutions()
+        assert len(responses.calls) == 2
+        assert 'If-None-Match' not in responses.calls[1].request.headers
+
+    @responses.activate
+    def test_lru_eviction(self, tas):
+        for i in (1, 2, 3):
+            responses.add(responses.GET, 'https://example.com/api/v1/institutions/%d' % i,
+                json={"status": "success", "result": {"id": i, "name": "I%d" % i, "departments": []}},
+                status=200)
+
+        tas.get_institution(1)
+        tas.get_institution(2)
+        tas.get_institution(1)
+        tas.get_institution(3)
+        assert len(tas.cache) == 2
+        tas.get_institution(1)
+        assert len(responses.calls) == 3
+        tas.get_institution(2)
+        assert len(responses.calls) == 4
+
+    @responses.activate
+    def test_invalidate(self, tas):
+        responses.add(responses.GET, INSTITUTIONS_URL, **institutions_response())
+
+        tas.institutions()
+        tas.invalidate_cache('institutions')
+        tas.institutions()
+        assert len(responses.calls) == 2
+
+    @responses.activate
+    def test_errors_not_cached(self, tas):
+        responses.add(responses.GET, INSTITUTIONS_URL, status=500)
+
+        with pytest.raises(Exception):
+            tas.institutions()
+        assert len(tas.cache) == 0
+
+    @responses.activate
+    def test_api_errors_not_cached(self, tas):
+        responses.add(responses.GET, INSTITUTIONS_URL, status=200,
+                      json={"status": "error", "message": "Try again", "result": None})
+        responses.add(responses.GET, INSTITUTIONS_URL, status=200,
+                      json={"status": "success", "message": None, "result": []})
+
+        with pytest.raises(Exception):
+            tas.institutions()
+        assert len(tas.cache) == 0
+        assert tas.institutions() == []
+        assert len(tas.cache) == 1
+
+
+USER = {'id': 7, 'username': 'alice', 'email': 'alice@example.com', 'firstName': 'Alice'}
+
+def user_response(user=USER):
+    return dict(json={"status": "success", "result": user, "message": None}, status=200)
+
+class TestUserCache:
+
+    def test_indexed_by_every_key(self, clock):
+        cache = UserCache(ttl=60, timer=clock)
+        cache.put(USER)
+        assert cache.get('id', '7') == USER
+        assert cache.get('username', 'alice') == USER
+        assert cache.get('email', 'alice@example.com') == USER
+        cache.get('id', 7)['firstName'] = 'Mallory'
+        assert cache.get('id', 7)['firstName'] == 'Alice'
+        clock.now += 61
+        assert cache.get('username', 'alice') is None
+        assert len(cache) == 0
+
+    def test_bounded_and_reindexed(self, clock):
+        cache = UserCache(maxsize=2, timer=clock)
+        cache.put(USER)
+        cache.put(dict(USER, username='alice2'))
+        assert cache.get('username', 'alice') is None
+        assert cache.get('username', 'alice2')['id'] == 7
+        cache.put({'id': 8, 'username': 'bob'})
+        cache.put({'id': 9, 'username': 'carol'})
+        assert cache.get('id', 7) is None
+        assert len(cache) == 2
+        cache.invalidate(username='bob')
+        assert cache.get('id', 8) is None and cache.get('id', 9) is not None
+
+    def test_case_insensitive_keys(self, clock):
+        cache = UserCache(timer=clock)
+        cache.put(dict(USER, username='Alice', email='Alice@Example.com'))
+        assert cache.get('username', 'alice')['id'] == 7
+        assert cache.get('email', 'alice@example.COM')['id'] == 7
+        cache.invalidate(email='ALICE@example.com')
+        assert cache.get('username', 'Alice') is None
+
+    @responses.activate
+    def test_client_lookups_and_invalidation(self, clock):
+        responses.add(responses.GET, 'https://example.com/api/v1/users/username/alice', **user_response())
+        responses.add(responses.PUT, 'https://example.com/api/v1/users/7', **user_response())
+        tas = TASClient(user_cache=UserCache(timer=clock))
+        assert tas.get_user(username='alice') == USER
+        assert tas.get_user(id=7) == USER
+        assert tas.get_user(email='alice@example.com') == USER
+        assert len(responses.calls) == 1
+
+        tas.save_user(7, {'firstName': 'Al'})
+        assert tas.get_user(username='alice') == USER
+        assert len(responses.calls) == 3
+
+        responses.add(responses.POST, 'https://example.com/api/v1/users/alice/passwordChanges',
+                      json={"status": "error", "result": None, "message": "bad"}, status=200)
+        with pytest.raises(Exception):
+            tas.change_password('alice', 'old', 'new')
+        assert tas.user_cache.get('id', 7) is None
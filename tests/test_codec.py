@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_codec
+----------------------------------
+
+Tests for `pytas.codec` module.
+"""
+
+import json
+
+import pytest
+import responses
+
+from pytas import codec as codec_util
+from pytas.codec import JSONCodec, OrjsonCodec
+from pytas.http import TASClient
+from pytas.models.projects import Project
+
+CODECS = [JSONCodec]
+if codec_util.orjson is not None:
+    CODECS.append(OrjsonCodec)
+
+@pytest.fixture(params=CODECS, ids=lambda c: c.name)
+def codec(request):
+    return request.param()
+
+@pytest.fixture
+def default_codec():
+    yield
+    codec_util.set_codec(None)
+
+class TestCodec:
+
+    def test_round_trip(self, codec):
+        data = {'b': [1, 2.5, None, True], 'a': u'Zürich'}
+        assert codec.loads(codec.encode(data)) == data
+        assert codec.loads(codec.dumps(data)) == data
+        assert codec.dumps(data, sort_keys=True).index('"a"') < codec.dumps(data, sort_keys=True).index('"b"')
+
+    def test_unencodable_values_fall_back(self, codec):
+        data = {1: 2 ** 70}
+        assert json.loads(codec.dumps(data)) == {'1': 2 ** 70}
+        assert codec.dumps(data, indent=4) == json.dumps(data, indent=4)
+
+    def test_get_and_set_codec(self, default_codec):
+        assert isinstance(codec_util.get_codec('json'), JSONCodec)
+        with pytest.raises(ValueError):
+            codec_util.get_codec('yaml')
+        codec_util.set_codec('json')
+        assert type(codec_util.get_codec()) is JSONCodec
+        codec_util.set_codec(None)
+        assert type(codec_util.get_codec()) is JSONCodec
+
+    @responses.activate
+    def test_client_uses_codec(self, codec):
+        responses.add(responses.POST, 'https://example.com/api/v1/projects',
+                      json={'status': 'success', 'result': {'id': 7, 'title': u'Zürich'}, 'message': None})
+        tas = TASClient(codec=codec)
+        assert tas.create_project({'title': u'Zürich'}) == {'id': 7, 'title': u'Zürich'}
+        assert json.loads(responses.calls[0].request.body) == {'title': u'Zürich'}
+
+    def test_as_json(self, codec, default_codec):
+        codec_util.set_codec(codec)
+        project = Project(initial={'id': 1, 'title': 'Test', 'allocations': [{'id': 2, 'status': 'Active'}]})
+        data = json.loads(project.as_json())
+        assert data['id'] == 1 and data['allocations'][0]['status'] == 'Active'
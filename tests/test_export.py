@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_export
+----------------------------------
+
+Tests for `pytas.export` module.
+"""
+
+import gzip
+import io
+import json
+
+import mock
+import pytest
+
+from pytas.export import export_ndjson, iter_records
+
+def project(id):
+    return {'id': id, 'title': 'Project %d' % id,
+            'allocations': [{'id': id * 10, 'projectId': id, 'status': 'Active'}]}
+
+@pytest.fixture
+def client():
+    client = mock.Mock()
+    client.projects_for_group.side_effect = lambda group: {'a': [project(1), project(2)], 'b': [project(2)]}[group]
+    client.projects_for_user.side_effect = lambda username: [project(3)]
+    client.get_project_users.side_effect = lambda id: [{'username': 'user%d' % id}]
+    return client
+
+def read_lines(data):
+    return [json.loads(line) for line in data.decode('utf-8').splitlines()]
+
+class TestExport:
+
+    def test_records(self, client):
+        records = list(iter_records(groups=['a', 'b'], usernames=['alice'], client=client, prefetch=2))
+        assert [(r['kind'], r['data']['id']) for r in records] == [
+            ('project', 1), ('allocation', 10), ('project', 2), ('allocation', 20),
+            ('project', 3), ('allocation', 30)]
+        assert records[0]['source'] == ['group', 'a']
+        assert 'allocations' not in records[0]['data']
+        assert records[1]['projectId'] == 1
+        assert not client.get_project_users.called
+
+    def test_export_gzip_with_users(self, client):
+        out = io.BytesIO()
+        count = export_ndjson(out, groups=['a'], client=client, include_users=True, gzip=True)
+        records = read_lines(gzip.decompress(out.getvalue()))
+        assert count == len(records) == 6
+        assert records[2] == {'kind': 'user', 'projectId': 1, 'data': {'username': 'user1'}}
+
+    def test_export_to_path(self, client, tmp_path):
+        path = str(tmp_path / 'export.ndjson.gz')
+        assert export_ndjson(path, usernames=['alice'], client=client) == 2
+        with gzip.open(path, 'rb') as f:
+            assert read_lines(f.read())[0]['data']['id'] == 3
+
+    def test_fetch_errors_raise(self, client):
+        client.projects_for_group.side_effect = Exception('boom')
+        with pytest.raises(Exception):
+            export_ndjson(io.BytesIO(), groups=['a'], client=client)
+
+    def test_members_fetched_once(self, client):
+        records = list(iter_records(groups=['a', 'b'], usernames=['alice'], client=client,
+                                    include_users=True))
+        assert [r['projectId'] for r in records if r['kind'] == 'user'] == [1, 2, 3]
+        assert sorted(c.args[0] for c in client.get_project_users.call_args_list) == [1, 2, 3]
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_fakeserver
+----------------------------------
+
+Tests for `pytas.fakeserver` module.
+"""
+
+import pytest
+import requests
+
+from pytas.fakeserver import FakeTAS, FakeTASServer
+from pytas.http import TASClient, JobsClient
+
+@pytest.fixture(scope='module')
+def server():
+    fake = FakeTAS(users=200, projects=50, institutions=10, groups=3, jobs_per_day=100, seed=1)
+    with FakeTASServer(fake) as server:
+        yield server
+
+class TestFakeServer:
+
+    def test_tas_reads(self, server):
+        client = TASClient(baseURL=server.url, credentials={'username': 'u', 'password': 'p'})
+        user = client.get_user(username='user7')
+        assert user['id'] == 7
+        assert client.get_user(email='user7@example.com')['username'] == 'user7'
+        assert len(client.institutions()) == 10
+        assert len(client.fields()) > 0
+        projects = client.projects_for_group('group1')
+        assert projects and all(p['id'] % 3 == 1 for p in projects)
+        project = client.project(projects[0]['id'])
+        assert project['allocations'] and project['pi']['id'] == project['piId']
+        assert client.authenticate('user7', 'password')
+
+    def test_writes_persist(self, server):
+        client = TASClient(baseURL=server.url, credentials={'username': 'u', 'password': 'p'})
+        project = client.create_project({'title': 'New', 'piId': 3, 'allocations': [{'resource': 'Chameleon'}]})
+        assert client.add_project_user(project['id'], 'user9')
+        usernames = [u['username'] for u in client.get_project_users(project['id'])]
+        assert sorted(usernames) == ['user3', 'user9']
+        alloc = client.project(project['id'])['allocations'][0]
+        assert alloc['status'] == 'Pending'
+        client.allocation_approval(alloc['id'], {'status': 'Approved'})
+        assert client.project(project['id'])['allocations'][0]['status'] == 'Approved'
+
+    def test_jobs_are_deterministic_and_filtered(self, server):
+        client = JobsClient(baseURL=server.url, credentials={'username': 'u', 'password': 'p'})
+        jobs = client.get_jobs('Chameleon', '2024-01-01', '2024-01-03')
+        assert len(jobs) == 200
+        assert jobs == client.get_jobs('Chameleon', '2024-01-01', '2024-01-03')
+        assert list(client.iter_jobs('Chameleon', '2024-01-01', '2024-01-03')) == jobs
+        username = jobs[0]['username']
+        mine = client.get_jobs('Chameleon', '2024-01-01', '2024-01-03', username=username)
+        assert mine and all(j['username'] == username for j in mine)
+
+    def test_error_injection(self):
+        fake = FakeTAS(users=10, projects=2, institutions=2, groups=1, jobs_per_day=0)
+        with FakeTASServer(fake, error_rate=1.0) as server:
+            r = requests.get(server.url + '/v1/users/1')
+            assert r.status_code == 503
+            assert r.headers['Retry-After'] == '1'
+        with FakeTASServer(fake, api_error_rate=1.0) as server:
+            with pytest.raises(Exception):
+                TASClient(baseURL=server.url, credentials={'username': 'u', 'password': 'p'}).get_user(id=1)
+
+    def test_serves_any_app(self):
+        class App(object):
+            def handle(self, method, path, query, body):
+                return 201, {'Content-Type': 'text/plain', 'X-Path': path}, b'hello'
+        with FakeTASServer(App()) as server:
+            r = requests.post(server.url + '/anything')
+        assert (r.status_code, r.text) == (201, 'hello')
+        assert r.headers['X-Path'] == '/anything'
+        assert r.headers['Content-Type'] == 'text/plain'
+
+    def test_returned_records_are_copies(self):
+        fake = FakeTAS(users=10, projects=2, institutions=2, groups=1, jobs_per_day=0)
+        status, headers, body = fake.handle('GET', '/v1/projects/1', {}, '')
+        body['result']['title'] = 'changed'
+        body['result']['allocations'][0]['status'] = 'changed'
+        body['result']['pi']['username'] = 'changed'
+        status, headers, body = fake.handle('GET', '/v1/projects/1', {}, '')
+        assert body['result']['title'] == 'Project 1'
+        assert body['result']['allocations'][0]['status'] != 'changed'
+        assert body['result']['pi']['username'] != 'changed'
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_institutions
+----------------------------------
+
+Tests for `pytas.institutions` module.
+"""
+
+import time
+
+import mock
+import pytest
+
+from pytas.institutions import InstitutionIndex
+
+INSTITUTIONS = [
+    {'id': 1, 'name': 'University of Texas at Austin', 'departments': [
+        {'id': 10, 'name': 'Computer Science', 'children': [{'id': 100, 'name': 'Systems Group'}]},
+        {'id': 11, 'name': 'Physics'}]},
+    {'id': 2, 'name': 'Universität Zürich', 'departments': [{'id': 20, 'name': 'Informatik'}]},
+    {'id': 3, 'name': 'Texas A&M University'},
+]
+
+class Clock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def client():
+    client = mock.Mock()
+    client.institutions.return_value = INSTITUTIONS
+    return client
+
+def names(entries):
+    return [e.name for e in entries]
+
+class TestInstitutionIndex:
+
+    def test_navigation(self, client):
+        index = InstitutionIndex(client=client)
+        assert len(index) == 7
+        assert index.get(100).name == 'Systems Group'
+        assert index.parent(100).id == 10
+        assert index.parent(10).id == 1
+        assert index.parent(1) is None
+        assert names(index.children(1)) == ['Computer Science', 'Physics']
+        assert names(index.institutions()) == ['Texas A&M University', 'Universität Zürich',
+                                               'University of Texas at Austin']
+        assert index.get(999) is None
+        client.institutions.assert_called_once_with()
+
+    def test_search(self, client):
+        index = InstitutionIndex(client=client)
+        assert names(index.search('univ')) == ['Universität Zürich', 'University of Texas at Austin',
+                                               'Texas A&M University']
+        assert names(index.search('TEXAS aus')) == ['University of Texas at Austin']
+        assert names(index.search('zurich')) == ['Universität Zürich']
+        assert names(index.search('univ', limit=1)) == ['Universität Zürich']
+        assert names(index.search('texas', institutions_only=True)) == ['Texas A&M University',
+                                                                        'University of Texas at Austin']
+        assert names(index.search('s', parent_id=10)) == ['Systems Group']
+        assert index.search('') == []
+        assert index.search('nothing') == []
+
+    def test_department_ids_do_not_collide(self):
+        from pytas.institutions import IndexEntry
+        client = mock.Mock()
+        client.institutions.return_value = [
+            {'id': 1, 'name': 'UT Austin', 'departments': [{'id': 2, 'name': 'Physics'},
+                                                           {'id': 3, 'name': 'Plasma Physics'}]},
+            {'id': 2, 'name': 'Rice University', 'departments': [{'id': 1, 'name': 'Physics'}]},
+        ]
+        index = InstitutionIndex(client=client)
+        assert len(index) == 5
+        assert index.get(2).name == 'Rice University'
+        assert index.get(2, IndexEntry.DEPARTMENT).name == 'Physics'
+        assert index.parent(1, IndexEntry.DEPARTMENT).name == 'Rice University'
+        assert names(index.children(1)) == ['Physics', 'Plasma Physics']
+        assert names(index.search('phys', parent_id=1)) == ['Physics', 'Plasma Physics']
+        assert names(index.search('phys', parent_id=1, limit=1)) == ['Physics']
+        assert names(index.search('physics', parent_id=2)) == ['Physics']
+        assert index.search('phys', parent_id=1, parent_kind=IndexEntry.DEPARTMENT) == []
+
+    def test_institutions_only_skips_departments(self):
+        class Recorder(dict):
+            def __getitem__(self, key):
+                visited.append(key)
+                return dict.__getitem__(self, key)
+        visited = []
+        client = mock.Mock()
+        client.institutions.return_value = [
+            {'id': i, 'name': 'University %d' % i, 'departments': [
+                {'id': i * 100 + d, 'name': 'Department of University Studies %d' % d} for d in range(20)]}
+            for i in range(5)]
+        index = InstitutionIndex(client=client)
+        snapshot = index._current()
+        snapshot.entries = Recorder(snapshot.entries)
+        snapshot.words = Recorder(snapshot.words)
+        assert len(index.search('university of', limit=100, institutions_only=True)) == 0
+        assert len(index.search('univ', limit=100, institutions_only=True)) == 5
+        assert visited and all(kind == 'institution' for kind, _ in visited)
+
+    def test_fetch_departments(self):
+        client = mock.Mock()
+        client.institutions.return_value = [{'id': 1, 'name': 'UT Austin'}]
+        client.get_departments.return_value = [{'id': 10, 'name': 'Physics'}]
+        index = InstitutionIndex(client=client, fetch_departments=True)
+        assert index.parent(10).name == 'UT Austin'
+        client.get_departments.assert_called_once_with(1)
+
+    def test_background_refresh(self, client):
+        clock = Clock()
+        index = InstitutionIndex(client=client, refresh_interval=60, timer=clock)
+        assert index.get(3) is not None
+        client.institutions.return_value = [{'id': 4, 'name': 'Rice University'}]
+        clock.now += 61
+        # the stale index keeps answering while the rebuild runs
+        assert index.get(3) is not None
+        for _ in range(100):
+            if index.get(4) is not None:
+                break
+            time.sleep(0.01)
+        assert names(index.search('rice')) == ['Rice University']
+        assert client.institutions.call_count == 2
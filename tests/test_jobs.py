@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_jobs
+----------------------------------
+
+Tests for `pytas.jobs` module and sharded job queries.
+"""
+
+import json
+import pytest
+import responses
+from datetime import date, timedelta
+
+from pytas.http import JobsClient
+from pytas.jobs import time_windows, merge_jobs
+
+JOBS_URL = 'https://example.com/api/v1/Jobs'
+
+class TestTimeWindows:
+
+    def test_date_strings(self):
+        assert time_windows('2016-01-01', '2016-01-20', timedelta(days=7)) == [
+            ('2016-01-01', '2016-01-08'),
+            ('2016-01-08', '2016-01-15'),
+            ('2016-01-15', '2016-01-20'),
+        ]
+
+    def test_single_window(self):
+        assert time_windows('2016-01-01T00:00:00Z', '2016-01-01T06:00:00Z', timedelta(days=1)) == [
+            ('2016-01-01T00:00:00Z', '2016-01-01T06:00:00Z'),
+        ]
+
+    def test_dates(self):
+        assert time_windows(date(2016, 1, 1), date(2016, 1, 3), timedelta(days=1)) == [
+            (date(2016, 1, 1), date(2016, 1, 2)),
+            (date(2016, 1, 2), date(2016, 1, 3)),
+        ]
+
+    def test_bad_date(self):
+        with pytest.raises(ValueError):
+            time_windows('January 1st', '2016-01-03')
+
+
+class TestMergeJobs:
+
+    def test_dedup_and_order(self):
+        merged = merge_jobs([
+            [{'jobId': 2, 'end': '2016-01-08T00:00:00'}, {'jobId': 1, 'end': '2016-01-02T00:00:00'}],
+            [{'jobId': 2, 'end': '2016-01-08T00:00:00'}, {'jobId': 3}],
+        ])
+        assert [j['jobId'] for j in merged] == [1, 2, 3]
+
+
+class TestShardedJobs:
+
+    @responses.activate
+    def test_get_jobs_sharded(self):
+        def callback(request):
+            start = request.params['start']
+            assert request.params['username'] == 'alice'
+            jobs = [
+                {'jobId': start, 'end': start + 'T12:00:00'},
+                {'jobId': 'boundary', 'end': '2016-01-08T00:00:00'},
+            ]
+            return 200, {}, json.dumps({'jobs': jobs})
+
+        responses.add_callback(responses.GET, JOBS_URL, callback=callback)
+
+        jobs = JobsClient().get_jobs_sharded('chameleon', '2016-01-01', '2016-01-15',
+                                             username='alice', window=timedelta(days=7))
+        assert len(responses.calls) == 2
+        assert [j['jobId'] for j in jobs] == ['2016-01-01', 'boundary', '2016-01-08']
+
+    @responses.activate
+    def test_get_jobs_sharded_error(self):
+        responses.add(responses.GET, JOBS_URL, json={'message': 'timeout'}, status=500)
+
+        with pytest.raises(Exception) as e:
+            JobsClient().get_jobs_sharded('chameleon', '2016-01-01', '2016-01-15')
+        assert 'timeout' in str(e.value)
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_jobstore
+----------------------------------
+
+Tests for `pytas.jobstore` module.
+"""
+
+from datetime import datetime
+
+import pytest
+import responses
+
+from pytas.http import JobsClient
+from pytas.jobstore import JobStore
+
+JOBS_URL = 'https://example.com/api/v1/Jobs'
+
+JOBS = [
+    {'jobId': 1, 'username': 'alice', 'allocationId': 10, 'queueName': 'batch', 'end': '2016-01-02T00:00:00'},
+    {'jobId': 2, 'username': 'bob', 'allocationId': 10, 'queueName': 'debug', 'end': '2016-01-03T00:00:00'},
+    {'jobId': 3, 'username': 'alice', 'allocationId': 11, 'queueName': 'batch', 'end': '2016-01-05T00:00:00'},
+]
+
+@pytest.fixture
+def store(tmpdir):
+    with JobStore(str(tmpdir.join('jobs.db'))) as s:
+        yield s
+
+class TestJobStore:
+
+    def test_query(self, store):
+        store.add_jobs('chameleon', JOBS)
+        assert [j['jobId'] for j in store.query(username='alice')] == [1, 3]
+        assert [j['jobId'] for j in store.query(allocation_id=10, queue='debug')] == [2]
+        assert [j['jobId'] for j in store.query('chameleon', start='2016-01-03T00:00:00')] == [2, 3]
+        assert store.query('other') == []
+
+    def test_upsert(self, store):
+        store.add_jobs('chameleon', JOBS)
+        store.add_jobs('chameleon', [dict(JOBS[0], queueName='long')])
+        assert store.count('chameleon') == 3
+        assert store.query(queue='long')[0]['jobId'] == 1
+
+    def test_persistent(self, tmpdir):
+        path = str(tmpdir.join('persist.db'))
+        with JobStore(path) as s:
+            s.add_jobs('chameleon', JOBS, watermark='2016-01-06')
+        with JobStore(path) as s:
+            assert s.count() == 3
+            assert s.get_watermark('chameleon') == '2016-01-06'
+
+
+    def test_watermark_only_advances_to_now(self, tmpdir):
+        with JobStore(str(tmpdir.join('clock.db')), clock=lambda: datetime(2016, 1, 10, 12, 30)) as s:
+            s.add_jobs('chameleon', [], watermark='2016-01-06')
+            s.add_jobs('chameleon', [], watermark='2016-01-04')
+            assert s.get_watermark('chameleon') == '2016-01-06'
+            s.add_jobs('chameleon', [], watermark='2016-02-01T00:00:00')
+            assert s.get_watermark('chameleon') == '2016-01-10T12:30:00'
+            s.set_watermark('chameleon', '2016-01-01')
+            assert s.get_watermark('chameleon') == '2016-01-01'
+
+
+class TestSyncJobs:
+
+    @responses.activate
+    def test_incremental_sync(self, store):
+        responses.add(responses.GET, JOBS_URL, json={'jobs': JOBS[:2]}, status=200)
+        responses.add(responses.GET, JOBS_URL, json={'jobs': JOBS[1:]}, status=200)
+        jobs = JobsClient()
+
+        with pytest.raises(Exception):
+            jobs.sync_jobs(store, 'chameleon', '2016-01-04')
+
+        assert jobs.sync_jobs(store, 'chameleon', '2016-01-04', start='2016-01-01') == 2
+        assert store.get_watermark('chameleon') == '2016-01-04'
+
+        jobs.sync_jobs(store, 'chameleon', '2016-01-06', start='2016-01-01')
+        assert responses.calls[1].request.params['start'] == '2016-01-04'
+        assert responses.calls[1].request.params['end'] == '2016-01-06'
+        assert store.count('chameleon') == 3
+        assert store.get_watermark('chameleon') == '2016-01-06'
+
+    @responses.activate
+    def test_filtered_sync_keeps_own_watermark(self, store):
+        responses.add(responses.GET, JOBS_URL, json={'jobs': JOBS[:1]}, status=200)
+        jobs = JobsClient()
+        jobs.sync_jobs(store, 'chameleon', '2016-01-06', start='2016-01-01', username='alice')
+        assert store.get_watermark('chameleon', username='alice') == '2016-01-06'
+        assert store.get_watermark('chameleon') is None
+        with pytest.raises(Exception):
+            jobs.sync_jobs(store, 'chameleon', '2016-01-06')
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_metrics
+----------------------------------
+
+Tests for `pytas.metrics` module.
+"""
+
+import pytest
+import responses
+
+from pytas.http import TASClient, JobsClient
+from pytas.metrics import Metrics
+
+class TestMetrics:
+
+    @responses.activate
+    def test_records_per_endpoint(self):
+        responses.add(responses.GET, 'https://example.com/api/v1/projects/123',
+            json={"status": "success", "result": {"id": 123}}, status=200)
+        responses.add(responses.GET, 'https://example.com/api/v1/projects/456', status=404)
+        responses.add(responses.GET, 'https://example.com/api/v1/Jobs', json={'jobs': []}, status=200)
+        events = []
+        metrics = Metrics(callback=events.append)
+        tas = TASClient(metrics=metrics)
+
+        tas.project(123)
+        with pytest.raises(Exception):
+            tas.project(456)
+        JobsClient(metrics=metrics).get_jobs('chameleon', '2016-01-01', '2016-01-02')
+
+        snapshot = metrics.snapshot()
+        assert snapshot['project']['requests'] == 2
+        assert snapshot['project']['statuses'] == {200: 1, 404: 1}
+        assert snapshot['project']['errors'] == {'HTTPError': 1}
+        assert snapshot['project']['size_sum'] > 0
+        assert snapshot['project']['latency_buckets'][-1] == (float('inf'), 2)
+        assert snapshot['get_jobs']['requests'] == 1
+        assert [e['endpoint'] for e in events] == ['project', 'project', 'project', 'get_jobs']
+
+        text = metrics.prometheus()
+        assert 'pytas_requests_total{endpoint="project",status="404"} 1' in text
+        assert 'pytas_errors_total{endpoint="project",error="HTTPError"} 1' in text
+        assert 'pytas_request_duration_seconds_count{endpoint="get_jobs"} 1' in text
+
+    @responses.activate
+    def test_nested_call_endpoint(self):
+        responses.add(responses.GET, 'https://example.com/api/v1/institutions/127',
+            json={"status": "success", "result": {"id": 127, "name": "TACC", "departments": []}},
+            status=200)
+        metrics = Metrics()
+        TASClient(metrics=metrics).get_department(1, 127)
+        assert list(metrics.snapshot()) == ['get_institution']
+
+    @responses.activate
+    def test_errors_counted_once(self):
+        import requests
+        responses.add(responses.GET, 'https://example.com/api/v1/projects/123',
+            body=requests.ConnectionError('down'))
+        responses.add(responses.GET, 'https://example.com/api/v1/institutions/127',
+            json={"status": "error", "result": None, "message": "nope"}, status=200)
+        events = []
+        metrics = Metrics(callback=events.append)
+        tas = TASClient(metrics=metrics)
+        with pytest.raises(requests.ConnectionError):
+            tas.project(123)
+        with pytest.raises(Exception):
+            tas.get_department(1, 127)
+
+        snapshot = metrics.snapshot()
+        assert snapshot['project']['errors'] == {'ConnectionError': 1}
+        assert snapshot['get_institution']['errors'] == {'Exception': 1}
+        assert 'get_department' not in snapshot
+        assert len([e for e in events if e['error'] is not None]) == 2
+
+    @responses.activate
+    def test_disabled(self):
+        responses.add(responses.GET, 'https://example.com/api/v1/projects/123',
+            json={"status": "success", "result": {"id": 123}}, status=200)
+        tas = TASClient()
+        assert tas.metrics is None
+        assert tas.project(123) == {'id': 123}
@@ -13,7 +13,7 @@ import pytest
 import json
 import mock
 
-from pytas.models import Project
+from pytas.models import Project, get_client, set_client, use_client
 
 class TestProjects:
 
@@ -90,3 +90,296 @@ class TestProjects:
         with pytest.raises(Exception) as e:
             p = Project(123)
             assert 'API Error' in str(e.value)
+
+
+class TestClientRegistry:
+
+    def teardown_method(self):
+        set_client(None)
+
+    def test_default_client_is_shared(self):
+        assert get_client() is get_client()
+
+    def test_set_client(self):
+        client = mock.Mock()
+        client.projects_for_group.return_value = []
+        set_client(client)
+        assert Project.list(group='foo') == []
+        client.projects_for_group.assert_called_once_with('foo')
+
+    def test_use_client_and_override(self):
+        default, scoped, override = mock.Mock(), mock.Mock(), mock.Mock()
+        for client in (default, scoped, override):
+            client.projects_for_user.return_value = []
+        set_client(default)
+        with use_client(scoped):
+            assert get_client() is scoped
+            Project.list(username='bar')
+            Project.list(username='bar', client=override)
+        assert get_client() is default
+        scoped.projects_for_user.assert_called_once_with('bar')
+        override.projects_for_user.assert_called_once_with('bar')
+        assert not default.projects_for_user.called
+
+    def test_listed_projects_keep_client(self):
+        default, override = mock.Mock(), mock.Mock()
+        override.projects_for_group.return_value = [{'id': 1}]
+        set_client(default)
+        project = Project.list(group='foo', client=override)[0]
+        project.add_user('alice')
+        override.add_project_user.assert_called_once_with(1, 'alice')
+        assert not default.add_project_user.called
+
+    def test_models_keep_client(self):
+        from pytas.models import Institution, User
+        default, override = mock.Mock(), mock.Mock()
+        set_client(default)
+        override.institutions.return_value = [{'id': 1, 'name': 'UT Austin'}]
+        override.get_institution.return_value = {'id': 1, 'name': 'UT Austin'}
+        override.get_departments.return_value = [{'id': 2, 'name': 'Physics'}]
+        override.get_user.return_value = {'id': 7, 'username': 'alice'}
+        override.projects_for_user.return_value = [{'id': 3}]
+
+        assert Institution.list(client=override)[0].departments[0].name == 'Physics'
+        assert Institution(1, client=override).departments[0].name == 'Physics'
+        assert override.get_departments.call_count == 2
+
+        user = User(username='alice', client=override)
+        assert [p.id for p in user.projects] == [3]
+        user.request_password_reset()
+        user.verify_user('123456')
+        override.request_password_reset.assert_called_once_with('alice', None)
+        override.verify_user.assert_called_once_with(7, '123456')
+        assert 'client' not in json.dumps(user.as_dict())
+        assert default.mock_calls == []
+
+
+class TestAllocation:
+
+    def test_compact_with_parsed_dates(self):
+        from datetime import datetime
+        from pytas.models import Allocation
+        a = Allocation(initial={
+            'id': 456,
+            'status': 'Active',
+            'start': '2014-01-21T06:00:00Z',
+            'end': '2015-01-20T06:00:00Z',
+            'unexpected': 'kept',
+        })
+        assert vars(a) == {'unexpected': 'kept'}
+        assert a.end == datetime(2015, 1, 20, 6, 0, 0)
+        assert a.unexpected == 'kept'
+        assert a.days_left < 0
+        assert not a.up_for_renewal
+        assert a.as_dict()['end'] == '2015-01-20T06:00:00Z'
+        assert json.loads(a.as_json())['start'] == '2014-01-21T06:00:00Z'
+
+    def test_timestamps_round_trip(self):
+        from datetime import datetime
+        from pytas.models import Allocation
+        a = Allocation(initial={'id': 1, 'start': '2014-01-21T06:00:00.123+05:00',
+                                'end': 'not a date'})
+        assert a.start == datetime(2014, 1, 21, 1, 0, 0, 123000)
+        assert a.end == 'not a date'
+        assert a.days_left is None
+        assert a.as_dict()['start'] == '2014-01-21T06:00:00.123+05:00'
+        assert a.as_dict()['end'] == 'not a date'
+        a.start = datetime(2014, 1, 21, 6, 0, 0, 500)
+        assert a.as_dict()['start'] == '2014-01-21T06:00:00.000500Z'
+
+    def test_ad_hoc_attributes(self):
+        from pytas.models import Allocation, User
+        for obj in (Project(initial={'id': 1}), Allocation(initial={'id': 1}),
+                    User(initial={'username': 'alice'})):
+            obj.note = 'kept'
+            assert obj.note == 'kept'
+
+    def test_missing_end(self):
+        from pytas.models import Allocation
+        a = Allocation(initial={'id': 1})
+        assert a.days_left is None
+        assert not a.up_for_renewal
+        with pytest.raises(AttributeError):
+            a.nonexistent
+
+
+class TestAllocationIndex:
+
+    def project(self):
+        from pytas.models import Allocation
+        p = Project(initial={'id': 1, 'pi': {'username': 'pi'}, 'allocations': []})
+        p.allocations = [
+            Allocation(initial={'id': 1, 'status': 'Active', 'resource': 'Chameleon'}),
+            Allocation(initial={'id': 2, 'status': 'Active', 'resource': 'Stampede3'}),
+            Allocation(initial={'id': 3, 'status': 'Waiting', 'resource': 'Chameleon'}),
+            Allocation(initial={'id': 4, 'status': 'Rejected', 'resource': 'Chameleon'}),
+        ]
+        return p
+
+    def test_buckets(self):
+        p = self.project()
+        assert [a.id for a in p.active_allocations] == [1]
+        assert p.pending_allocations == []
+        assert p.has_pending_allocations
+        assert p.has_rejected_allocations
+        assert not p.has_approved_allocations
+        assert [a.id for a in p.allocations_for('Active', 'Stampede3')] == [2]
+
+    def test_invalidated_on_assignment(self):
+        p = self.project()
+        assert p.has_active_allocations
+        p.allocations = []
+        assert not p.has_active_allocations
+
+    def test_add_and_remove_invalidate(self):
+        p = self.project()
+        assert [a.id for a in p.active_allocations] == [1]
+        added = p.add_allocation({'id': 5, 'status': 'Active', 'resource': 'Chameleon'})
+        assert [a.id for a in p.active_allocations] == [1, 5]
+        p.remove_allocation(added)
+        p.remove_allocation(p.allocations[0])
+        assert not p.has_active_allocations
+        with pytest.raises(ValueError):
+            p.remove_allocation(added)
+
+    def test_configurable_resource(self):
+        class StampedeProject(Project):
+            allocation_resource = 'Stampede3'
+
+        p = StampedeProject(initial={'id': 1, 'pi': {}, 'allocations': [
+            {'id': 2, 'status': 'Active', 'resource': 'Stampede3'},
+        ]})
+        assert [a.id for a in p.active_allocations] == [2]
+
+
+class TestLazyHydration:
+
+    def test_nested_objects_built_on_access(self):
+        from pytas.models import Allocation, User
+        with mock.patch('pytas.models.projects.Allocation.__init__', autospec=True,
+                        side_effect=Allocation.__init__) as alloc_init:
+            p = Project(initial={
+                'id': 1, 'title': 'Lorem', 'chargeCode': 'TEST-1',
+                'pi': {'username': 'piuser'},
+                'allocations': [{'id': 2, 'status': 'Active', 'resource': 'Chameleon'}],
+            })
+            assert p.title == 'Lorem'
+            assert not alloc_init.called
+
+            assert isinstance(p.pi, User)
+            assert p.pi.username == 'piuser'
+            assert [a.id for a in p.active_allocations] == [2]
+            assert p.allocations is p.allocations
+            assert alloc_init.call_count == 1
+
+    def test_missing_nested_data(self):
+        p = Project(initial={'id': 1})
+        assert p.pi is None
+        assert p.allocations == []
+
+
+class TestSyncUsers:
+
+    def test_sync_users(self):
+        client = mock.Mock()
+        client.get_project_users.return_value = [{'username': 'alice'}, {'username': 'bob'}]
+        client.add_project_user.return_value = True
+        client.del_project_user.side_effect = Exception('Failed to remove user from project')
+
+        p = Project(initial={'id': 123})
+        results = p.sync_users(['alice', 'carol', 'carol'], remove=True, client=client)
+
+        assert [r.item for r in results] == [('add', 'carol'), ('remove', 'bob')]
+        assert results[0].ok
+        assert 'Failed to remove' in str(results[1].error)
+        client.add_project_user.assert_called_once_with(123, 'carol')
+        client.del_project_user.assert_called_once_with(123, 'bob')
+
+    def test_sync_users_keep_extra(self):
+        client = mock.Mock()
+        client.get_project_users.return_value = [{'username': 'alice'}]
+
+        assert Project(initial={'id': 123}).sync_users([], client=client) == []
+        assert not client.del_project_user.called
+
+    def test_sync_users_keeps_pi(self):
+        client = mock.Mock()
+        client.get_project_users.return_value = [{'id': 1, 'username': 'pi'}, {'id': 2, 'username': 'bob'},
+                                                 {'id': 3, 'username': 'owner'}]
+        p = Project(initial={'id': 123, 'piId': 1, 'pi': {'id': 3, 'username': 'owner'}})
+        results = p.sync_users([], remove=True, client=client)
+        assert [r.item for r in results] == [('remove', 'bob')]
+
+
+class TestPrefetch:
+
+    def client(self):
+        client = mock.Mock()
+        client.projects_for_group.return_value = [{'id': 1}, {'id': 2}, {'id': 3}]
+        client.projects_for_user.return_value = [{'id': 1}]
+
+        def project_users(project_id):
+            if project_id == 3:
+                raise Exception('Failed to get project users')
+            return [{'username': 'user%d' % project_id}]
+        client.get_project_users.side_effect = project_users
+        return client
+
+    def test_prefetch_users(self):
+        client = self.client()
+        projects = Project.list(group='foo', prefetch=['users'], client=client)
+        assert client.get_project_users.call_count == 3
+
+        assert [u.username for u in projects[0].get_users()] == ['user1']
+        assert [u.username for u in projects[1].get_users(client=client)] == ['user2']
+        assert client.get_project_users.call_count == 3
+
+        # failed prefetch falls back to fetching on demand
+        with pytest.raises(Exception):
+            projects[2].get_users(client=client)
+        assert client.get_project_users.call_count == 4
+
+    def test_user_projects_prefetch(self):
+        from pytas.models import User
+        client = self.client()
+        projects = User(initial={'username': 'alice'}).get_projects(client=client, prefetch=['users'])
+        assert [u.username for u in projects[0].get_users()] == ['user1']
+        client.projects_for_user.assert_called_once_with('alice')
+
+    def test_unknown_prefetch(self):
+        with pytest.raises(ValueError):
+            Project.list(group='foo', prefetch=['owners'], client=self.client())
+
+
+class TestSerializers:
+
+    def test_generated_serializer(self):
+        from pytas.models import Allocation, User, dump_many
+        p = Project(initial={'id': 1, 'title': 'Test', 'gid': 5, 'allocations': [
+            {'id': 2, 'status': 'Active', 'start': '2014-01-21T06:00:00Z'}]})
+        data = p.as_dict()
+        assert list(data) == Project._fields
+        assert data['title'] == 'Test' and data['piId'] is None
+        assert data['allocations'][0]['start'] == '2014-01-21T06:00:00Z'
+        assert data['allocations'][0]['end'] is None
+        assert Allocation._get_serializer() is Allocation._get_serializer()
+        assert Allocation._get_serializer() is not Project._get_serializer()
+
+        u = User(initial={'username': 'alice'})
+        assert dump_many([p, u, p]) == [data, {'username': 'alice', 'id': None}, data]
+
+    def test_subclass_gets_own_serializer(self):
+        class Tagged(Project):
+            __slots__ = ('tag',)
+            _fields = Project._fields + ['tag']
+        Project(initial={'id': 1}).as_dict()
+        assert Tagged(initial={'id': 1, 'tag': 'x'}).as_dict()['tag'] == 'x'
+
+    def test_fields_that_are_not_identifiers(self):
+        from pytas.models.base import TASModel
+        class Odd(TASModel):
+            _fields = ['from', 'first-name', 'class', 'id']
+        o = Odd()
+        setattr(o, 'from', 'a')
+        setattr(o, 'first-name', 'b')
+        assert o.as_dict() == {'from': 'a', 'first-name': 'b', 'class': None, 'id': None}
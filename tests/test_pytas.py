@@ -144,3 +144,88 @@ class TestTAS:
     # def test_get_countries(self, tas):
     #     resp = tas.countries()
     #     assert resp is not None
+
+class TestSessionPool:
+
+    @responses.activate
+    def test_methods_share_session(self, tas):
+        responses.add(responses.GET, 'https://example.com/api/v1/users/username/mrhanlon',
+            json={"status": "success", "result": {"username": "mrhanlon"}, "message": ""},
+            status=200)
+        responses.add(responses.GET, 'https://example.com/api/v1/institutions/',
+            json={"status": "success", "result": [], "message": ""},
+            status=200)
+
+        session = tas.pool.session()
+        tas.get_user(username='mrhanlon')
+        tas.institutions()
+        assert tas.pool.session() is session
+        assert session.get_adapter('https://example.com')._pool_maxsize == 10
+
+    def test_per_thread_sessions(self):
+        import threading
+        tas = TASClient(per_thread=True)
+        sessions = []
+        t = threading.Thread(target=lambda: sessions.append(tas.pool.session()))
+        t.start()
+        t.join()
+        assert sessions[0] is not tas.pool.session()
+
+    def test_thread_sessions_released_on_exit(self):
+        import gc
+        import threading
+        import mock
+        tas = TASClient(per_thread=True)
+        for _ in range(3):
+            t = threading.Thread(target=tas.pool.session)
+            t.start()
+            t.join()
+        main = tas.pool.session()
+        with mock.patch('requests.Session.close') as close:
+            t = threading.Thread(target=tas.pool.session)
+            t.start()
+            t.join()
+            gc.collect()
+            assert close.call_count == 1
+        gc.collect()
+        assert list(tas.pool._sessions) == [main]
+
+    def test_close(self):
+        with TASClient(pool_maxsize=4) as tas:
+            tas.pool.session()
+        assert tas.pool.closed
+        with pytest.raises(Exception):
+            tas.pool.session()
+
+    def test_shared_pool_not_closed(self):
+        from pytas.http import SessionPool, JobsClient
+        pool = SessionPool()
+        with JobsClient(pool=pool) as jobs:
+            assert jobs.pool is pool
+        assert not pool.closed
+
+
+class TestBulkUsers:
+
+    @responses.activate
+    def test_get_users(self, tas):
+        for username in ('alice', 'bob'):
+            responses.add(responses.GET, 'https://example.com/api/v1/users/username/%s' % username,
+                json={"status": "success", "result": {"username": username}, "message": ""},
+                status=200)
+        responses.add(responses.GET, 'https://example.com/api/v1/users/username/nobody',
+            json={"status": "error", "result": None, "message": "User not found"},
+            status=200)
+        responses.add(responses.GET, 'https://example.com/api/v1/users/42',
+            json={"status": "success", "result": {"id": 42, "username": "carol"}, "message": ""},
+            status=200)
+
+        results = tas.get_users(ids=[42], usernames=['alice', 'nobody', 'bob'], max_workers=4)
+        assert [r.item for r in results] == [('id', 42), ('username', 'alice'),
+                                             ('username', 'nobody'), ('username', 'bob')]
+        assert [r.ok for r in results] == [True, True, False, True]
+        assert results[0].result['username'] == 'carol'
+        assert 'User not found' in str(results[2].error)
+
+    def test_get_users_empty(self, tas):
+        assert tas.get_users() == []
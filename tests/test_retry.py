@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_retry
+----------------------------------
+
+Tests for `pytas.retry` module.
+"""
+
+import pytest
+import requests
+import responses
+
+from pytas.http import TASClient, JobsClient
+from pytas.retry import RetryPolicy, CircuitBreaker, CircuitOpenError, parse_retry_after
+
+PROJECT_URL = 'https://example.com/api/v1/projects/123'
+
+class Clock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def sleeps():
+    return []
+
+@pytest.fixture
+def policy(sleeps):
+    return RetryPolicy(max_retries=2, backoff_factor=1, jitter=False, sleep=sleeps.append)
+
+def project_ok():
+    return dict(json={"status": "success", "result": {"id": 123}, "message": ""}, status=200)
+
+class TestRetryPolicy:
+
+    @responses.activate
+    def test_retries_with_backoff(self, policy, sleeps):
+        responses.add(responses.GET, PROJECT_URL, status=503)
+        responses.add(responses.GET, PROJECT_URL, status=502)
+        responses.add(responses.GET, PROJECT_URL, **project_ok())
+
+        assert TASClient(retry=policy).project(123) == {"id": 123}
+        assert sleeps == [1, 2]
+
+    @responses.activate
+    def test_honors_retry_after(self, policy, sleeps):
+        responses.add(responses.GET, PROJECT_URL, status=429, headers={'Retry-After': '7'})
+        responses.add(responses.GET, PROJECT_URL, **project_ok())
+
+        TASClient(retry=policy).project(123)
+        assert sleeps == [7]
+
+    @responses.activate
+    def test_exhausted_raises_http_error(self, policy, sleeps):
+        responses.add(responses.GET, PROJECT_URL, body='<html>down</html>', status=503)
+
+        with pytest.raises(requests.HTTPError):
+            TASClient(retry=policy).project(123)
+        assert len(responses.calls) == 3
+
+    @responses.activate
+    def test_writes_not_retried_by_default(self, policy, sleeps):
+        url = 'https://example.com/api/v1/projects/123/users/alice'
+        responses.add(responses.DELETE, url, body=requests.ReadTimeout('timed out'))
+        responses.add(responses.DELETE, url, json={"status": "success", "result": True}, status=200)
+
+        with pytest.raises(requests.ReadTimeout):
+            TASClient(retry=policy).del_project_user(123, 'alice')
+        assert len(responses.calls) == 1 and sleeps == []
+
+        responses.reset()
+        responses.add(responses.DELETE, url, body=requests.ReadTimeout('timed out'))
+        responses.add(responses.DELETE, url, json={"status": "success", "result": True}, status=200)
+        writes = RetryPolicy(max_retries=2, jitter=False, sleep=sleeps.append,
+                             methods=('GET', 'DELETE'))
+        assert TASClient(retry=writes).del_project_user(123, 'alice')
+        assert len(responses.calls) == 2 and len(sleeps) == 1
+
+    @responses.activate
+    def test_post_not_retried(self, policy, sleeps):
+        responses.add(responses.POST, 'https://example.com/api/v1/projects',
+            json={"status": "error", "message": "Unavailable"}, status=503)
+
+        with pytest.raises(Exception):
+            TASClient(retry=policy).create_project({})
+        assert len(responses.calls) == 1
+        assert sleeps == []
+
+    @responses.activate
+    def test_connection_error(self, policy, sleeps):
+        responses.add(responses.GET, PROJECT_URL, body=requests.ConnectionError('refused'))
+        responses.add(responses.GET, PROJECT_URL, **project_ok())
+
+        assert TASClient(retry=policy).project(123) == {"id": 123}
+        assert sleeps == [1]
+
+    def test_jitter(self):
+        policy = RetryPolicy(backoff_factor=1, max_backoff=4)
+        assert all(0 <= policy.backoff(5) <= 4 for _ in range(20))
+
+    def test_parse_retry_after(self):
+        assert parse_retry_after('3') == 3
+        assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0
+        assert parse_retry_after('soon') is None
+
+
+class TestCircuitBreaker:
+
+    @responses.activate
+    def test_opens_and_recovers(self):
+        clock = Clock()
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, timer=clock)
+        tas = TASClient(breaker=breaker)
+        jobs = JobsClient(breaker=breaker)
+        responses.add(responses.GET, PROJECT_URL, status=500)
+        responses.add(responses.GET, PROJECT_URL, status=500)
+        responses.add(responses.GET, PROJECT_URL, **project_ok())
+
+        for _ in range(2):
+            with pytest.raises(requests.HTTPError):
+                tas.project(123)
+        assert breaker.state == CircuitBreaker.OPEN
+
+        with pytest.raises(CircuitOpenError):
+            jobs.get_jobs('chameleon', '2016-01-01', '2016-01-02')
+        assert len(responses.calls) == 2
+
+        clock.now += 10
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert tas.project(123) == {"id": 123}
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_failed_probe_reopens(self):
+        clock = Clock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, timer=clock)
+        breaker.record_failure()
+        clock.now += 10
+        breaker.before_request()
+        with pytest.raises(CircuitOpenError):
+            breaker.before_request()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+
+    def test_unexpected_error_ends_probe(self):
+        from pytas.retry import send
+        clock = Clock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, timer=clock)
+        breaker.record_failure()
+        clock.now += 10
+
+        def request():
+            raise ValueError('bad request')
+        with pytest.raises(ValueError):
+            send(request, 'GET', breaker=breaker)
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        breaker.before_request()
+
+    def test_discarded_response_closed(self, policy):
+        import mock
+        from pytas.retry import send
+        failed, ok = mock.Mock(status_code=503, headers={}), mock.Mock(status_code=200)
+        assert send(mock.Mock(side_effect=[failed, ok]), 'GET', policy) is ok
+        failed.close.assert_called_once_with()
+        assert not ok.close.called
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_singleflight
+----------------------------------
+
+Tests for `pytas.singleflight` module.
+"""
+
+import threading
+import time
+import responses
+
+from pytas.http import TASClient
+from pytas.singleflight import SingleFlight
+
+PROJECT_URL = 'https://example.com/api/v1/projects/123'
+
+def run_threads(n, target):
+    results = [None] * n
+    errors = [None] * n
+
+    def run(i):
+        try:
+            results[i] = target()
+        except Exception as e:
+            errors[i] = e
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, errors
+
+class TestSingleFlight:
+
+    def test_concurrent_calls_share_result(self):
+        flight = SingleFlight()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            time.sleep(0.1)
+            return {'value': [1, 2]}
+
+        results, errors = run_threads(8, lambda: flight.do('key', slow))
+        assert len(calls) == 1
+        assert errors == [None] * 8
+        assert all(r == {'value': [1, 2]} for r in results)
+        assert len(set(id(r) for r in results)) == 8
+        assert flight.in_flight() == 0
+
+    def test_error_shared(self):
+        flight = SingleFlight()
+
+        def fail():
+            time.sleep(0.1)
+            raise Exception('API Error')
+
+        results, errors = run_threads(4, lambda: flight.do('key', fail))
+        assert all('API Error' in str(e) for e in errors)
+
+    @responses.activate
+    def test_client_coalesces_reads(self):
+        def callback(request):
+            time.sleep(0.1)
+            return 200, {}, '{"status": "success", "result": {"id": 123}}'
+        responses.add_callback(responses.GET, PROJECT_URL, callback=callback)
+
+        tas = TASClient(coalesce=True)
+        results, errors = run_threads(6, lambda: tas.project(123))
+        assert results == [{'id': 123}] * 6
+        assert len(responses.calls) == 1
+
+        tas.project(123)
+        assert len(responses.calls) == 2
+
+    @responses.activate
+    def test_disabled_by_default(self):
+        responses.add(responses.GET, PROJECT_URL,
+            json={"status": "success", "result": {"id": 123}}, status=200)
+        tas = TASClient()
+        assert tas.singleflight is None
+        assert tas.project(123) == {'id': 123}
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_streaming
+----------------------------------
+
+Tests for `pytas.streaming` module and `JobsClient.iter_jobs`.
+"""
+
+import json
+import pytest
+import responses
+
+from pytas.http import JobsClient
+from pytas.streaming import iter_json_array
+
+JOBS_URL = 'https://example.com/api/v1/Jobs'
+
+def chunked(doc, size):
+    data = doc.encode('utf-8')
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+class TestIterJsonArray:
+
+    def test_single_byte_chunks(self):
+        doc = json.dumps({
+            'status': 'success',
+            'meta': {'nested': [1, 2, {'jobs': 'not this one'}]},
+            'jobs': [{'jobId': 1, 'su': 12345, 'name': u'café'}, 67890, 'x', None],
+            'tail': True,
+        })
+        assert list(iter_json_array(chunked(doc, 1), 'jobs')) == \
+            [{'jobId': 1, 'su': 12345, 'name': u'café'}, 67890, 'x', None]
+
+    def test_empty_and_null(self):
+        assert list(iter_json_array(chunked('{"jobs": []}', 3), 'jobs')) == []
+        assert list(iter_json_array(chunked('{"jobs": null}', 3), 'jobs')) == []
+
+    def test_missing_key(self):
+        with pytest.raises(ValueError):
+            list(iter_json_array(chunked('{"other": [1]}', 4), 'jobs'))
+
+    def test_truncated(self):
+        with pytest.raises(ValueError):
+            list(iter_json_array(chunked('{"jobs": [{"jobId": 1}, {"jobId"', 4), 'jobs'))
+
+
+class TestIterJobs:
+
+    @responses.activate
+    def test_iter_jobs(self):
+        jobs = [{'jobId': i} for i in range(100)]
+        responses.add(responses.GET, JOBS_URL, json={'jobs': jobs}, status=200)
+
+        it = JobsClient().iter_jobs('chameleon', '2016-01-01', '2016-02-01', chunk_size=7)
+        assert list(it) == jobs
+        assert responses.calls[0].request.params['resource'] == 'chameleon'
+
+    @responses.activate
+    def test_iter_jobs_error(self):
+        responses.add(responses.GET, JOBS_URL, json={'message': 'bad resource'}, status=400)
+
+        with pytest.raises(Exception) as e:
+            JobsClient().iter_jobs('nope', '2016-01-01', '2016-02-01')
+        assert 'bad resource' in str(e.value)
+
+    def test_iter_jobs_requires_resource(self):
+        with pytest.raises(Exception):
+            JobsClient().iter_jobs(start='2016-01-01', end='2016-02-01')
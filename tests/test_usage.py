@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_usage
+----------------------------------
+
+Tests for `pytas.usage` module.
+"""
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from pytas.usage import UsageFrame
+
+JOBS = [
+    {'jobId': 1, 'username': 'alice', 'allocationId': 10, 'queueName': 'batch', 'su': 1.5, 'end': '2016-01-02T01:00:00Z'},
+    {'jobId': 2, 'username': 'bob', 'allocationId': 10, 'queueName': 'debug', 'su': 2, 'end': '2016-01-02T05:00:00Z'},
+    {'jobId': 3, 'username': 'alice', 'allocationId': 11, 'queueName': 'batch', 'su': 4, 'end': '2016-01-03T00:00:00Z'},
+    {'jobId': 4, 'username': None, 'allocationId': 11, 'queueName': 'batch', 'su': None, 'end': None},
+]
+
+@pytest.fixture
+def frame():
+    f = UsageFrame(JOBS[:2])
+    f.add(JOBS[2:])
+    return f
+
+class TestUsageFrame:
+
+    def test_sums_and_counts(self, frame):
+        assert len(frame) == 4
+        assert frame.total() == 7.5
+        assert frame.sum_by('username') == {'alice': 5.5, 'bob': 2.0, None: 0.0}
+        assert frame.sum_by('allocation') == {'10': 3.5, '11': 4.0}
+        assert frame.count_by('queue') == {'batch': 3, 'debug': 1}
+
+    def test_histogram(self, frame):
+        assert frame.histogram() == {'2016-01-02': 3.5, '2016-01-03': 4.0}
+        assert frame.histogram('M', counts=True) == {'2016-01': 3}
+        assert frame.histogram(by='username') == {
+            'alice': {'2016-01-02': 1.5, '2016-01-03': 4.0},
+            'bob': {'2016-01-02': 2.0, '2016-01-03': 0.0},
+            None: {'2016-01-02': 0.0, '2016-01-03': 0.0},
+        }
+
+    def test_empty(self):
+        frame = UsageFrame()
+        assert frame.total() == 0
+        assert frame.sum_by('username') == {}
+        assert frame.histogram() == {}
+
+    def test_bad_group(self, frame):
+        with pytest.raises(ValueError):
+            frame.sum_by('resource')
+        with pytest.raises(ValueError):
+            frame.histogram('fortnight')
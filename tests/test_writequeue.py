@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_writequeue
+----------------------------------
+
+Tests for `pytas.writequeue` module.
+"""
+
+import threading
+import time
+
+import mock
+import pytest
+
+from pytas.writequeue import AllocationWriteQueue
+
+class TestAllocationWriteQueue:
+
+    def test_flush_reports_each_write(self):
+        client = mock.Mock()
+        client.allocation_approval.side_effect = lambda id, data: dict(data, id=id)
+        client.edit_allocation.side_effect = Exception('boom')
+        queue = AllocationWriteQueue(client=client, max_workers=4)
+        futures = [queue.approve(i, {'status': 'Approved'}) for i in range(5)]
+        failed = queue.edit({'id': 9, 'computeAllocated': 1})
+        results = queue.flush()
+        assert [r.item for r in results] == [('approve', i) for i in range(5)] + [('edit', 9)]
+        assert [r.result['id'] for r in results[:5]] == list(range(5))
+        assert not results[5].ok and str(results[5].error) == 'boom'
+        assert futures[2].result() == {'id': 2, 'status': 'Approved'}
+        with pytest.raises(Exception):
+            failed.result()
+        assert queue.flush() == []
+        queue.close()
+
+    def test_writes_for_an_allocation_keep_order(self):
+        calls = []
+        def edit(data):
+            # the first write is slowest; it must still land first
+            time.sleep(0.05 if data['n'] == 0 else 0)
+            calls.append(data['n'])
+        client = mock.Mock()
+        client.edit_allocation.side_effect = edit
+        with AllocationWriteQueue(client=client, max_workers=4) as queue:
+            for n in range(3):
+                queue.edit({'id': 1, 'n': n})
+        assert calls == [0, 1, 2]
+        with pytest.raises(Exception):
+            queue.edit({'id': 1, 'n': 3})
+
+    def test_bounded_parallelism(self):
+        active, peak = [0], [0]
+        lock = threading.Lock()
+        def approve(id, data):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.01)
+            with lock:
+                active[0] -= 1
+        client = mock.Mock()
+        client.allocation_approval.side_effect = approve
+        with AllocationWriteQueue(client=client, max_workers=3) as queue:
+            for i in range(12):
+                queue.approve(i, {})
+        assert peak[0] <= 3
+        assert client.allocation_approval.call_count == 12
+
+    def test_busy_allocation_does_not_hold_workers(self):
+        release = threading.Event()
+        client = mock.Mock()
+        client.edit_allocation.side_effect = lambda data: release.wait(5)
+        client.allocation_approval.return_value = 'ok'
+        with AllocationWriteQueue(client=client, max_workers=2) as queue:
+            edits = [queue.edit({'id': 1}), queue.edit({'id': '1'}), queue.edit({'id': 1})]
+            assert queue.approve(2, {}).result(timeout=1) == 'ok'
+            assert not any(f.done() for f in edits[1:])
+            release.set()
+
+    def test_client_resolved_per_write(self):
+        from pytas.models import use_client
+        scoped = mock.Mock()
+        queue = AllocationWriteQueue()
+        with use_client(scoped):
+            queue.approve(1, {})
+        queue.close()
+        scoped.allocation_approval.assert_called_once_with(1, {})